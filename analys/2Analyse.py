@@ -6,39 +6,41 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import librosa.display
 
+from cache import FeatureCache
+from features import BASIC_FEATURES, HOP_LENGTH, FeatureContext, cached_features
+from render import cached_spectrogram_image, render_spectrograms, select_for_render
+
 # Функция для анализа аудиофайла
-def analyze_audio_file(audio_file):
+def analyze_audio_file(audio_file, context=None, cache=None):
     try:
-        y, sr = librosa.load(audio_file, sr=None)
-        duration = librosa.get_duration(y=y, sr=sr)
-        rms = np.mean(librosa.feature.rms(y=y))  # Энергия RMS
-        spectral_centroid = np.mean(librosa.feature.spectral_centroid(y=y, sr=sr))  # Средний спектральный центроид
-        spectral_bandwidth = np.mean(librosa.feature.spectral_bandwidth(y=y, sr=sr))  # Ширина спектра
-        max_amplitude = np.max(np.abs(y))  # Максимальная амплитуда
-        return {
-            'File': audio_file,
-            'Sample Rate (Hz)': sr,
-            'Duration (s)': duration,
-            'RMS Energy': rms,
-            'Spectral Centroid (Hz)': spectral_centroid,
-            'Spectral Bandwidth (Hz)': spectral_bandwidth,
-            'Max Amplitude': max_amplitude
-        }
+        return cached_features(audio_file, BASIC_FEATURES, cache, context)
     except Exception as e:
         print(f"Error processing {audio_file}: {e}")
         return None
 
-# Функция для построения спектрограммы
-def plot_spectrogram(audio_file, output_dir):
+# Путь к файлу спектрограммы для аудиофайла
+def spectrogram_path_for(audio_file, output_dir):
+    return os.path.join(output_dir, f'spectrogram_{os.path.basename(audio_file)}.png')
+
+# Спектрограмма уже построена и не старше аудиофайла
+def spectrogram_is_fresh(audio_file, output_dir):
+    spectrogram_path = spectrogram_path_for(audio_file, output_dir)
+    return os.path.exists(spectrogram_path) and os.path.getmtime(spectrogram_path) >= os.path.getmtime(audio_file)
+
+# Функция для построения подписанной спектрограммы одного файла (оси, шкала дБ)
+# Для папок целиком используется пакетная отрисовка render_spectrograms (render.py)
+def plot_spectrogram(audio_file, output_dir, context=None):
     try:
-        y, sr = librosa.load(audio_file, sr=None)
+        # Используем уже посчитанный STFT из контекста анализа, если он есть
+        if context is None:
+            context = FeatureContext(audio_file)
+        D = context.get('spectrogram_db')
         plt.figure(figsize=(10, 4))
-        D = librosa.amplitude_to_db(np.abs(librosa.stft(y)), ref=np.max)
-        librosa.display.specshow(D, sr=sr, x_axis='time', y_axis='log')
+        librosa.display.specshow(D, sr=context.sr, hop_length=HOP_LENGTH, x_axis='time', y_axis='log')
         plt.colorbar(format='%+2.0f dB')
         plt.title(f'Spectrogram for {os.path.basename(audio_file)}')
         plt.tight_layout()
-        spectrogram_path = os.path.join(output_dir, f'spectrogram_{os.path.basename(audio_file)}.png')
+        spectrogram_path = spectrogram_path_for(audio_file, output_dir)
         plt.savefig(spectrogram_path)
         plt.close()
         print(f"Spectrogram saved at {spectrogram_path}")
@@ -46,16 +48,42 @@ def plot_spectrogram(audio_file, output_dir):
         print(f"Error creating spectrogram for {audio_file}: {e}")
 
 # Функция для анализа всех файлов в папке
-def analyze_audio_folder(folder_path, output_dir):
+# every / outlier_z - выборочная отрисовка спектрограмм (см. render.select_for_render)
+# Изображения строятся только для выбранных файлов; без поиска выбросов выбор известен
+# сразу (каждый every-й файл), и с кэшем изображение кладётся в кэш, пока STFT в памяти
+def analyze_audio_folder(folder_path, output_dir, cache=None, every=None, outlier_z=None, workers=None):
     results = []
+    prefill = cache is not None and outlier_z is None
+    # Актуальность спектрограмм, уже проверенная при анализе: файл -> True/False
+    fresh = {}
     for root, dirs, files in os.walk(folder_path):
         for file in files:
             if file.endswith('.wav') or file.endswith('.mp3'):
                 audio_file = os.path.join(root, file)
-                analysis_result = analyze_audio_file(audio_file)
+                # Один контекст на файл: одно декодирование и один STFT
+                context = FeatureContext(audio_file)
+                analysis_result = analyze_audio_file(audio_file, context, cache)
                 if analysis_result:
+                    selected = every is None or len(results) % every == 0
                     results.append(analysis_result)
-                    plot_spectrogram(audio_file, output_dir)  # Сохраняем спектрограмму для каждого файла
+                    # Пока STFT в памяти, кладём изображение выбранной спектрограммы в кэш для отрисовки
+                    if prefill and selected:
+                        fresh[audio_file] = spectrogram_is_fresh(audio_file, output_dir)
+                        if not fresh[audio_file]:
+                            try:
+                                cached_spectrogram_image(audio_file, cache, context)
+                            except Exception as e:
+                                print(f"Error creating spectrogram for {audio_file}: {e}")
+
+    # Отрисовка выбранных спектрограмм пакетом в пуле процессов
+    jobs = []
+    for audio_file in select_for_render(results, every, outlier_z):
+        # При повторном запуске с кэшем не перерисовываем актуальные спектрограммы
+        if cache is not None and audio_file not in fresh:
+            fresh[audio_file] = spectrogram_is_fresh(audio_file, output_dir)
+        if cache is None or not fresh[audio_file]:
+            jobs.append((audio_file, spectrogram_path_for(audio_file, output_dir)))
+    render_spectrograms(jobs, cache_dir=cache.cache_dir if cache is not None else None, workers=workers)
     return results
 
 # Сохранение результатов в CSV
@@ -65,21 +93,28 @@ def save_results_to_csv(results, output_file):
     print(f"Results saved to {output_file}")
 
 # Основная функция для анализа команд и шумов
-def main():
-    # Путь к файлам команд и шумов (замените путь на актуальный)
-    base_dir = '/Users/daniil/Хакатоны/ЦП СВФО/1/data/ржд 1/ESC_DATASET_v1.2'
-    output_dir = '/Users/daniil/Хакатоны/ЦП СВФО/spectograms'
+# base_dir - путь к файлам команд и шумов, output_dir - папка для спектрограмм,
+# cache_dir - кэш признаков между запусками (None - без кэша)
+def main(base_dir='/Users/daniil/Хакатоны/ЦП СВФО/1/data/ржд 1/ESC_DATASET_v1.2',
+         output_dir='/Users/daniil/Хакатоны/ЦП СВФО/spectograms',
+         cache_dir='/Users/daniil/Хакатоны/ЦП СВФО/feature_cache',
+         every=None, outlier_z=None, workers=None):
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
+    cache = FeatureCache(cache_dir) if cache_dir else None
     
     # Анализ команд (все папки команд)
     command_folders = ['hr_bot_clear', 'hr_bot_noise', 'hr_bot_synt', 'luga']
     for folder in command_folders:
         folder_path = os.path.join(base_dir, folder)
         print(f"Analyzing folder: {folder}")
-        results = analyze_audio_folder(folder_path, output_dir)
+        results = analyze_audio_folder(folder_path, output_dir, cache, every, outlier_z, workers)
         save_results_to_csv(results, f'{folder}_audio_analysis.csv')
 
+    if cache is not None:
+        cache.report()
+        cache.close()
+
 if __name__ == "__main__":
     main()
 
@@ -1,5 +1,4 @@
 import os
-import json
 import librosa
 import librosa.display
 import matplotlib.pyplot as plt
@@ -7,37 +6,48 @@ import numpy as np
 import pandas as pd
 import seaborn as sns
 
+# Хранилище аннотаций, опись файлов и загрузчик аудио общие с подготовкой датасета (dataset_Coqui)
+import coqui_path  # noqa: F401
+from annotations import SNAPSHOT_NAME, load_annotations
+from audio_io import load_audio
+from inventory import PROBE_WORKERS, AudioInventory
+
 # Проверка наличия аудиофайлов и генерация отчета
-def check_audio_files(json_file, audio_dir):
-    with open(json_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
+# Записи набора берутся из хранилища аннотаций, json_file - только префикс имён отчётов.
+# Папка сканируется один раз, длительности читаются из заголовков файлов (inventory.py)
+def check_audio_files(json_file, audio_dir, store, dataset, workers=PROBE_WORKERS):
     report = []
     total_duration = 0
     durations = []
     empty_texts = []
     missing_files = []
+
+    inventory = AudioInventory(audio_dir, workers=workers)
+    entries = list(store.records(dataset))
+    headers = inventory.probe([entry['audio_filepath'] for entry in entries])
     
-    for entry in data:
-        audio_path = os.path.join(audio_dir, entry['audio_filepath'])
+    for entry in entries:
+        header = headers.get(inventory.relative(entry['audio_filepath']))
         row = {
             'audio_filepath': entry['audio_filepath'],
             'text': entry['text'],
             'label': entry['label'],
-            'attribute': entry.get('attribute', None),
-            'exists': os.path.exists(audio_path),
-            'duration': None
+            'attribute': entry['attribute'],
+            'speaker': entry['speaker'],
+            'exists': entry['audio_filepath'] in inventory,
+            'duration': None,
+            'sample_rate': None,
+            'channels': None,
         }
         
-        if not os.path.exists(audio_path):
-            missing_files.append(audio_path)
-        else:
-            # Рассчет продолжительности аудиофайлов
-            y, sr = librosa.load(audio_path, sr=None)
-            duration = librosa.get_duration(y=y, sr=sr)
-            durations.append(duration)
-            row['duration'] = duration
-            total_duration += duration
+        if not row['exists']:
+            missing_files.append(os.path.join(audio_dir, entry['audio_filepath']))
+        elif header is not None:
+            durations.append(header['duration'])
+            row['duration'] = header['duration']
+            row['sample_rate'] = header['sample_rate']
+            row['channels'] = header['channels']
+            total_duration += header['duration']
         
         if not entry['text'].strip():
             empty_texts.append(entry['id'])
@@ -55,16 +65,16 @@ def check_audio_files(json_file, audio_dir):
     return df_report, durations
 
 # Анализ метаданных JSON и визуализация
-def analyze_json_metadata(json_file):
-    with open(json_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    classes = [entry['label'] for entry in data]
-    attributes = [entry['attribute'] for entry in data if 'attribute' in entry]
-    texts = [entry['text'] for entry in data]
+# Распределения считаются по колонкам хранилища аннотаций без разбора JSON
+def analyze_json_metadata(json_file, store, dataset):
+    rows = store.select(dataset=dataset)
+    classes = store.labels[rows].tolist()
+    attributes = store.attributes[rows].tolist()
+    texts = store.texts[rows].tolist()
     
     # Визуализация распределения классов
-    unique_classes, class_counts = np.unique(classes, return_counts=True)
+    class_counts_by_label = store.counts('label', rows)
+    unique_classes, class_counts = list(class_counts_by_label), list(class_counts_by_label.values())
     class_dist = pd.DataFrame({'Class': unique_classes, 'Count': class_counts})
     
 
@@ -81,7 +91,8 @@ def analyze_json_metadata(json_file):
 
     # Визуализация распределения атрибутов (если есть)
     if attributes:
-        unique_attributes, attr_counts = np.unique(attributes, return_counts=True)
+        attr_counts_by_value = store.counts('attribute', rows)
+        unique_attributes, attr_counts = list(attr_counts_by_value), list(attr_counts_by_value.values())
         attr_dist = pd.DataFrame({'Attribute': unique_attributes, 'Count': attr_counts})
         
         plt.figure(figsize=(10, 6))
@@ -110,7 +121,8 @@ def analyze_json_metadata(json_file):
 
 # Построение и сохранение спектрограммы
 def plot_spectrogram(audio_file, save_path):
-    y, sr = librosa.load(audio_file)
+    # Частота как у librosa.load по умолчанию
+    y, sr = load_audio(audio_file, sr=22050, writable=False)
     plt.figure(figsize=(10, 4))
     D = librosa.amplitude_to_db(librosa.stft(y), ref=np.max)
     librosa.display.specshow(D, sr=sr, x_axis='time', y_axis='log')
@@ -121,14 +133,14 @@ def plot_spectrogram(audio_file, save_path):
     plt.close()
 
 # Основной процесс анализа каждого набора данных
-def analyze_dataset(json_file, audio_dir, analyze_spectrogram=False):
+def analyze_dataset(json_file, audio_dir, store, dataset, analyze_spectrogram=False, workers=PROBE_WORKERS):
     print(f'Analyzing dataset: {json_file}')
     
     # 1. Проверка аудиофайлов и расчет их продолжительности
-    df_report, durations = check_audio_files(json_file, audio_dir)
+    df_report, durations = check_audio_files(json_file, audio_dir, store, dataset, workers)
     
     # 2. Анализ метаданных JSON
-    classes, text_lengths = analyze_json_metadata(json_file)
+    classes, text_lengths = analyze_json_metadata(json_file, store, dataset)
     
     # Визуализация распределений
     plt.figure(figsize=(10, 5))
@@ -159,8 +171,15 @@ def analyze_dataset(json_file, audio_dir, analyze_spectrogram=False):
             plot_spectrogram(audio_path, save_path)
 
 # Основной процесс для всех наборов данных
-def main():
-    base_dir = '/Users/daniil/Хакатоны/ЦП СВФО/1/data/ржд 1/ESC_DATASET_v1.2'
+# workers - потоки чтения заголовков аудиофайлов (None - PROBE_WORKERS)
+# cache_dir - папка для снимка аннотаций (None - JSON разбирается при каждом запуске)
+def main(base_dir='/Users/daniil/Хакатоны/ЦП СВФО/1/data/ржд 1/ESC_DATASET_v1.2', workers=None, cache_dir=None):
+    # Аннотации и спикеры всех наборов читаются один раз (из снимка, если JSON не менялись)
+    snapshot_path = None
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        snapshot_path = os.path.join(cache_dir, SNAPSHOT_NAME)
+    store = load_annotations(os.path.join(base_dir, 'annotation'), snapshot_path=snapshot_path)
     
     datasets = {
         'hr_bot_clear': 'annotation/hr_bot_clear.json',
@@ -173,7 +192,8 @@ def main():
         print(f'Processing dataset: {dataset_name}')
         audio_dir = os.path.join(base_dir, dataset_name)
         json_path = os.path.join(base_dir, json_file)
-        analyze_dataset(json_path, audio_dir, analyze_spectrogram=(dataset_name == 'hr_bot_noise'))
+        analyze_dataset(json_path, audio_dir, store, dataset_name, analyze_spectrogram=(dataset_name == 'hr_bot_noise'),
+                        workers=workers or PROBE_WORKERS)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import time
+
+# Размер блока чтения при хешировании содержимого файла
+HASH_CHUNK_SIZE = 1024 * 1024
+# Ожидание блокировки базы другим процессом (например, обработчиками отрисовки), секунды
+LOCK_TIMEOUT = 30.0
+
+
+# Хеш содержимого файла (читаем блоками, чтобы не держать файл в памяти)
+def file_digest(path):
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    """
+    Дисковый кэш результатов анализа аудиофайлов.
+
+    Ключ записи - хеш содержимого файла + версия набора признаков + параметры,
+    поэтому переименование или копирование файла не приводит к пересчёту.
+    Чтобы не хешировать файл при каждом запуске, для пути запоминается
+    (размер, mtime) -> хеш. Общий размер записей ограничен max_bytes,
+    при превышении удаляются давно не использованные записи (LRU).
+
+    :param cache_dir: Папка для файла кэша.
+    :param max_bytes: Максимальный суммарный размер сохранённых значений.
+    :param fast_path: Доверять совпадению размера и mtime вместо повторного хеширования.
+
+    Базу одновременно открывают несколько процессов (пул render.py), поэтому
+    она работает в режиме WAL (чтение не ждёт записи), а запись ждёт
+    освобождения блокировки до LOCK_TIMEOUT секунд.
+    """
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 ** 2, fast_path=True):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.fast_path = fast_path
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.db = sqlite3.connect(os.path.join(cache_dir, 'features.sqlite'), timeout=LOCK_TIMEOUT)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        with self.db:
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS files '
+                '(path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT)'
+            )
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS entries '
+                '(key TEXT PRIMARY KEY, value BLOB, size INTEGER, last_access REAL)'
+            )
+            self.db.execute('CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access)')
+        self.total_bytes = self._stored_bytes()
+
+    # Суммарный размер записей в базе (вместе с записанными другими процессами)
+    def _stored_bytes(self):
+        return self.db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    # Хеш содержимого с быстрой проверкой по размеру и времени изменения
+    def content_digest(self, path):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        if self.fast_path:
+            row = self.db.execute(
+                'SELECT digest FROM files WHERE path = ? AND size = ? AND mtime_ns = ?',
+                (path, stat.st_size, stat.st_mtime_ns),
+            ).fetchone()
+            if row is not None:
+                return row[0]
+        digest = file_digest(path)
+        with self.db:
+            self.db.execute(
+                'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)',
+                (path, stat.st_size, stat.st_mtime_ns, digest),
+            )
+        return digest
+
+    # Ключ записи: содержимое файла + версия признаков + параметры
+    def make_key(self, path, version, params):
+        payload = json.dumps(
+            {'content': self.content_digest(path), 'version': version, 'params': params},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def get_or_compute(self, path, version, params, compute):
+        """
+        Возвращает значение из кэша или вычисляет его через compute() и сохраняет.
+
+        Значение None (ошибка обработки) не кэшируется.
+        """
+        key = self.make_key(path, version, params)
+        row = self.db.execute('SELECT value FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is not None:
+            self.hits += 1
+            with self.db:
+                self.db.execute('UPDATE entries SET last_access = ? WHERE key = ?', (time.time(), key))
+            return pickle.loads(row[0])
+
+        self.misses += 1
+        value = compute()
+        if value is not None:
+            self._put(key, value)
+        return value
+
+    def _put(self, key, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self.db:
+            self.db.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)',
+                (key, blob, len(blob), time.time()),
+            )
+            # В базу пишут и другие процессы (обработчики render.py), поэтому размер
+            # пересчитывается в той же транзакции записи, а не ведётся счётчиком процесса
+            self.total_bytes = self._stored_bytes()
+            self._evict()
+
+    # Удаление давно не использованных записей при превышении лимита (внутри транзакции записи)
+    def _evict(self):
+        if self.total_bytes <= self.max_bytes:
+            return
+        rows = self.db.execute('SELECT key, size FROM entries ORDER BY last_access').fetchall()
+        for key, size in rows:
+            if self.total_bytes <= self.max_bytes:
+                break
+            self.db.execute('DELETE FROM entries WHERE key = ?', (key,))
+            self.total_bytes -= size
+            self.evictions += 1
+
+    # Вывод счётчиков попаданий и промахов
+    def report(self):
+        self.total_bytes = self._stored_bytes()
+        total = self.hits + self.misses
+        hit_rate = 100.0 * self.hits / total if total else 0.0
+        print(
+            f"Feature cache: {self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate), "
+            f"{self.evictions} evicted, {self.total_bytes / 1024 ** 2:.2f} MB stored"
+        )
+
+    def close(self):
+        self.db.close()
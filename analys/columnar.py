@@ -0,0 +1,167 @@
+import os
+import shutil
+
+import numpy as np
+
+# pyarrow необязателен: без него результаты пишутся частями в NPZ
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+# Тип колонки по первому значению: вектор, целое, вещественное или строка
+def _column_kind(value):
+    if isinstance(value, np.ndarray):
+        return 'vector', value.size
+    if isinstance(value, (bool, int, np.integer)):
+        return 'int', None
+    if isinstance(value, (float, np.floating)):
+        return 'float', None
+    return 'str', None
+
+
+# Набор строк -> словарь колонок numpy (векторы - двумерный float32)
+def _rows_to_columns(rows, kinds):
+    columns = {}
+    for name, (kind, width) in kinds.items():
+        values = [row[name] for row in rows]
+        if kind == 'vector':
+            columns[name] = np.stack(values).astype(np.float32, copy=False).reshape(len(values), width)
+        elif kind == 'int':
+            columns[name] = np.asarray(values, dtype=np.int64)
+        elif kind == 'float':
+            columns[name] = np.asarray(values, dtype=np.float64)
+        else:
+            columns[name] = np.asarray([str(v) for v in values])
+    return columns
+
+
+# Путь к результатам: Parquet при наличии pyarrow, иначе папка с частями NPZ
+def results_path(name):
+    return f'{name}.parquet' if pq is not None else f'{name}_npz'
+
+
+class ColumnarWriter:
+    """
+    Потоковая запись результатов анализа в колоночном формате.
+
+    Строки копятся в буфере размером row_group_size и сбрасываются на диск
+    отдельной группой строк, поэтому память не растёт с размером папки.
+    Векторные значения (MFCC) хранятся как float32 фиксированной ширины,
+    а не строкой с распечаткой numpy.
+
+    Запись идёт во временный путь рядом с результатом ({output_path}.tmp),
+    который заменяет прежний результат в close(): части NPZ предыдущего
+    запуска не смешиваются с новыми, даже если новых частей меньше.
+
+    :param output_path: Путь к файлу .parquet; для формата NPZ - папка с частями.
+    :param row_group_size: Количество строк в одной группе.
+    :param fmt: 'parquet', 'npz' или None (parquet, если установлен pyarrow).
+    """
+
+    def __init__(self, output_path, row_group_size=1024, fmt=None):
+        if fmt is None:
+            fmt = 'parquet' if pq is not None else 'npz'
+        if fmt == 'parquet' and pq is None:
+            raise ImportError("Для записи в Parquet нужен pyarrow (pip install pyarrow)")
+        self.output_path = output_path
+        self.row_group_size = row_group_size
+        self.fmt = fmt
+        self.rows_written = 0
+        self._buffer = []
+        self._kinds = None
+        self._parquet = None
+        self._part = 0
+        self._tmp_path = output_path + '.tmp'
+        # Остатки прерванного запуска
+        _remove(self._tmp_path)
+        if fmt == 'npz':
+            os.makedirs(self._tmp_path)
+
+    def write(self, row):
+        if self._kinds is None:
+            self._kinds = {name: _column_kind(value) for name, value in row.items()}
+        self._buffer.append(row)
+        if len(self._buffer) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        columns = _rows_to_columns(self._buffer, self._kinds)
+        if self.fmt == 'parquet':
+            self._write_parquet(columns)
+        else:
+            part_file = os.path.join(self._tmp_path, f'part-{self._part:05d}.npz')
+            np.savez(part_file, **columns)
+            self._part += 1
+        self.rows_written += len(self._buffer)
+        self._buffer = []
+
+    def _write_parquet(self, columns):
+        arrays = {}
+        for name, values in columns.items():
+            if values.ndim == 2:
+                arrays[name] = pa.FixedSizeListArray.from_arrays(pa.array(values.ravel()), values.shape[1])
+            else:
+                arrays[name] = pa.array(values)
+        table = pa.table(arrays)
+        if self._parquet is None:
+            self._parquet = pq.ParquetWriter(self._tmp_path, table.schema)
+        self._parquet.write_table(table)
+
+    def close(self):
+        if self._tmp_path is None:
+            return
+        self.flush()
+        if self._parquet is not None:
+            self._parquet.close()
+            self._parquet = None
+        # Прежний результат заменяется целиком: непустую папку NPZ os.replace не заменяет,
+        # а Parquet без строк не создаётся
+        if self.fmt == 'npz' or not os.path.exists(self._tmp_path):
+            _remove(self.output_path)
+        if os.path.exists(self._tmp_path):
+            os.replace(self._tmp_path, self.output_path)
+        self._tmp_path = None
+        print(f"Results saved to {self.output_path} ({self.rows_written} rows)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# Удаление файла или папки результатов, если они есть
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+# Загрузка результатов: словарь колонок numpy без разбора строк
+def load_results(path):
+    if os.path.isdir(path):
+        parts = sorted(name for name in os.listdir(path) if name.endswith('.npz'))
+        chunks = [np.load(os.path.join(path, name)) for name in parts]
+        if not chunks:
+            return {}
+        return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0].files}
+
+    if pq is None:
+        raise ImportError("Для чтения Parquet нужен pyarrow (pip install pyarrow)")
+    table = pq.read_table(path)
+    columns = {}
+    for name in table.column_names:
+        column = table.column(name).combine_chunks()
+        if pa.types.is_fixed_size_list(column.type):
+            width = column.type.list_size
+            columns[name] = column.flatten().to_numpy().reshape(-1, width)
+        else:
+            columns[name] = column.to_numpy(zero_copy_only=False)
+    return columns
@@ -0,0 +1,200 @@
+import librosa
+import numpy as np
+
+# Общий загрузчик аудио: MP3 и WAV декодируются сразу в память (dataset_Coqui/audio_io.py)
+import coqui_path  # noqa: F401
+from audio_io import load_audio
+
+# Параметры STFT (совпадают со значениями librosa по умолчанию)
+N_FFT = 2048
+HOP_LENGTH = 512
+
+# Версия набора признаков: увеличивать при изменении формул или параметров,
+# чтобы дисковый кэш (cache.py) не отдавал устаревшие значения
+FEATURES_VERSION = 2
+
+# Реестр промежуточных величин и признаков: имя -> (зависимости, функция)
+_INTERMEDIATES = {}
+_FEATURES = {}
+
+
+# Декоратор для регистрации промежуточной величины (STFT, мел-спектр и т.д.)
+def intermediate(name, deps=()):
+    def decorator(func):
+        _INTERMEDIATES[name] = (tuple(deps), func)
+        return func
+    return decorator
+
+
+# Декоратор для регистрации признака, который попадает в итоговую таблицу
+def feature(name, deps=()):
+    def decorator(func):
+        _FEATURES[name] = (tuple(deps), func)
+        return func
+    return decorator
+
+
+class FeatureContext:
+    """
+    Вычислительный контекст одного аудиофайла.
+
+    Файл декодируется один раз, каждая промежуточная величина считается
+    один раз по первому требованию и переиспользуется всеми признаками
+    и построителем спектрограмм.
+
+    :param audio_file: Путь к аудиофайлу.
+    :param sr: Частота дискретизации при загрузке (None - исходная).
+    :param y: Уже загруженный сигнал (если есть), тогда файл не читается.
+    """
+
+    def __init__(self, audio_file, sr=None, y=None):
+        self.audio_file = audio_file
+        self.sr = sr
+        self._values = {}
+        if y is not None:
+            self._values['y'] = y
+
+    def get(self, name):
+        if name in self._values:
+            return self._values[name]
+        if name == 'y':
+            # Признаки не меняют сигнал на месте: общий буфер кэша без копирования
+            y, self.sr = load_audio(self.audio_file, sr=self.sr, writable=False)
+            value = y
+        else:
+            deps, func = _INTERMEDIATES[name]
+            value = func(*[self.get(dep) for dep in deps], sr=self.sr)
+        self._values[name] = value
+        return value
+
+
+# Модуль сигнала
+@intermediate('abs_y', deps=('y',))
+def _abs_y(y, sr):
+    return np.abs(y)
+
+
+# Амплитудный спектр |STFT|
+@intermediate('stft_mag', deps=('y',))
+def _stft_mag(y, sr):
+    return np.abs(librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH))
+
+
+# Энергетический спектр |STFT|^2
+@intermediate('power', deps=('stft_mag',))
+def _power(stft_mag, sr):
+    return stft_mag ** 2
+
+
+# Мел-спектр мощности
+@intermediate('mel_power', deps=('power',))
+def _mel_power(power, sr):
+    return librosa.feature.melspectrogram(S=power, sr=sr)
+
+
+# Лог-мел спектр (дБ)
+@intermediate('log_mel', deps=('mel_power',))
+def _log_mel(mel_power, sr):
+    return librosa.power_to_db(mel_power)
+
+
+# Спектрограмма в дБ для визуализации
+@intermediate('spectrogram_db', deps=('stft_mag',))
+def _spectrogram_db(stft_mag, sr):
+    return librosa.amplitude_to_db(stft_mag, ref=np.max)
+
+
+# Частота дискретизации
+@feature('Sample Rate (Hz)', deps=('y',))
+def _sample_rate(y, sr):
+    return sr
+
+
+# Длительность
+@feature('Duration (s)', deps=('y',))
+def _duration(y, sr):
+    return librosa.get_duration(y=y, sr=sr)
+
+
+# Энергия RMS по кадрам сигнала во временной области (без окна STFT, как rms(y=y))
+@feature('RMS Energy', deps=('y',))
+def _rms(y, sr):
+    return np.mean(librosa.feature.rms(y=y, frame_length=N_FFT, hop_length=HOP_LENGTH))
+
+
+# Средний спектральный центроид
+@feature('Spectral Centroid (Hz)', deps=('stft_mag',))
+def _spectral_centroid(stft_mag, sr):
+    return np.mean(librosa.feature.spectral_centroid(S=stft_mag, sr=sr))
+
+
+# Ширина спектра
+@feature('Spectral Bandwidth (Hz)', deps=('stft_mag',))
+def _spectral_bandwidth(stft_mag, sr):
+    return np.mean(librosa.feature.spectral_bandwidth(S=stft_mag, sr=sr))
+
+
+# Максимальная амплитуда
+@feature('Max Amplitude', deps=('abs_y',))
+def _max_amplitude(abs_y, sr):
+    return np.max(abs_y)
+
+
+# Частота пересечения нуля
+@feature('Zero-Crossing Rate', deps=('y',))
+def _zcr(y, sr):
+    return np.mean(librosa.feature.zero_crossing_rate(y, frame_length=N_FFT, hop_length=HOP_LENGTH))
+
+
+# Спектральная энтропия (формула из 3analyse.py сохранена без изменений)
+@feature('Spectral Entropy', deps=('y',))
+def _spectral_entropy(y, sr):
+    db_squared = np.square(librosa.amplitude_to_db(y))
+    return -np.sum(db_squared * np.log(db_squared))
+
+
+# Мел-частотные кепстральные коэффициенты (MFCC), среднее по кадрам
+@feature('MFCC', deps=('log_mel',))
+def _mfcc(log_mel, sr):
+    return np.mean(librosa.feature.mfcc(S=log_mel, sr=sr), axis=1)
+
+
+# Наборы признаков для скриптов анализа
+BASIC_FEATURES = [
+    'Sample Rate (Hz)',
+    'Duration (s)',
+    'RMS Energy',
+    'Spectral Centroid (Hz)',
+    'Spectral Bandwidth (Hz)',
+    'Max Amplitude',
+]
+EXTENDED_FEATURES = BASIC_FEATURES + [
+    'Zero-Crossing Rate',
+    'Spectral Entropy',
+    'MFCC',
+]
+
+
+# Вычисление набора признаков для одного файла через общий контекст
+def extract_features(context, feature_names):
+    result = {'File': context.audio_file}
+    for name in feature_names:
+        deps, func = _FEATURES[name]
+        result[name] = func(*[context.get(dep) for dep in deps], sr=context.sr)
+    return result
+
+
+# Признаки файла с учётом дискового кэша (см. cache.py)
+def cached_features(audio_file, feature_names, cache=None, context=None):
+    if context is None:
+        context = FeatureContext(audio_file)
+    if cache is None:
+        return extract_features(context, feature_names)
+    result = cache.get_or_compute(
+        audio_file,
+        FEATURES_VERSION,
+        {'features': feature_names, 'sr': context.sr},
+        lambda: extract_features(context, feature_names),
+    )
+    # Кэш адресуется содержимым, поэтому путь подставляем текущий
+    return dict(result, File=audio_file)
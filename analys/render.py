@@ -0,0 +1,174 @@
+import os
+import struct
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+from features import FEATURES_VERSION, FeatureContext
+
+# Размер изображения спектрограммы: строки (частоты) и максимум столбцов (кадров)
+IMAGE_HEIGHT = 256
+MAX_IMAGE_WIDTH = 1024
+# Динамический диапазон в дБ (как у librosa.amplitude_to_db по умолчанию)
+TOP_DB = 80.0
+
+
+# Таблица цветов: 256 значений яркости -> RGB (та же палитра, что у librosa.display для дБ)
+@lru_cache(maxsize=None)
+def colormap_lut(name='magma'):
+    from matplotlib import colormaps  # только палитра, без pyplot
+    return (colormaps[name](np.linspace(0.0, 1.0, 256))[:, :3] * 255).round().astype(np.uint8)
+
+
+# Номера частотных полос для строк изображения в логарифмическом масштабе (сверху - высокие)
+@lru_cache(maxsize=32)
+def _log_rows(n_bins, height):
+    rows = np.geomspace(1, n_bins - 1, height).round().astype(np.intp)
+    return rows[::-1].copy()
+
+
+def spectrogram_image(spectrogram_db, height=IMAGE_HEIGHT, max_width=MAX_IMAGE_WIDTH, top_db=TOP_DB):
+    """
+    Переводит спектрограмму в дБ (ref=max) в изображение uint8 [строки, столбцы].
+
+    Частоты приводятся к логарифмической оси (как y_axis='log' в specshow),
+    длинные записи сжимаются по времени максимумом по группам кадров,
+    чтобы не терять короткие события.
+    """
+    image = spectrogram_db[_log_rows(spectrogram_db.shape[0], height)]
+    if image.shape[1] > max_width:
+        edges = np.linspace(0, image.shape[1], max_width, endpoint=False).astype(np.intp)
+        image = np.maximum.reduceat(image, edges, axis=1)
+    image = (np.clip(image, -top_db, 0.0) + top_db) * (255.0 / top_db)
+    return image.round().astype(np.uint8)
+
+
+# Изображение спектрограммы с учётом дискового кэша (см. cache.py)
+def cached_spectrogram_image(audio_file, cache=None, context=None):
+    if context is None:
+        context = FeatureContext(audio_file)
+    compute = lambda: spectrogram_image(context.get('spectrogram_db'))
+    if cache is None:
+        return compute()
+    return cache.get_or_compute(
+        audio_file,
+        FEATURES_VERSION,
+        {'spectrogram_image': [IMAGE_HEIGHT, MAX_IMAGE_WIDTH, TOP_DB], 'sr': context.sr},
+        compute,
+    )
+
+
+# Блок PNG: длина, тип, данные, CRC
+def _png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+
+def write_png(path, rgb, compress_level=3):
+    """Запись RGB-изображения uint8 [строки, столбцы, 3] в PNG (zlib, без фильтров строк)."""
+    height, width, _ = rgb.shape
+    # Каждая строка начинается с байта типа фильтра (0 - без фильтра)
+    raw = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    raw[:, 1:] = rgb.reshape(height, width * 3)
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(_png_chunk(b'IHDR', header))
+        f.write(_png_chunk(b'IDAT', zlib.compress(raw.tobytes(), compress_level)))
+        f.write(_png_chunk(b'IEND', b''))
+
+
+# Изображение uint8 -> PNG через таблицу цветов
+def render_png(image, path, cmap='magma'):
+    write_png(path, colormap_lut(cmap)[image])
+
+
+# Кэш признаков процесса-обработчика (открывается один раз в _init_worker)
+_worker_state = {'cache': None, 'cmap': 'magma'}
+
+
+def _init_worker(cache_dir, cmap):
+    if cache_dir is not None:
+        from cache import FeatureCache
+        _worker_state['cache'] = FeatureCache(cache_dir)
+    _worker_state['cmap'] = cmap
+    colormap_lut(cmap)
+
+
+def _render_job(job):
+    audio_file, output_path = job
+    try:
+        image = cached_spectrogram_image(audio_file, _worker_state['cache'])
+        render_png(image, output_path, _worker_state['cmap'])
+        return job, None
+    except Exception as e:
+        return job, str(e)
+
+
+def render_spectrograms(jobs, cache_dir=None, workers=None, chunksize=None, cmap='magma'):
+    """
+    Пакетная отрисовка спектрограмм в PNG в пуле процессов.
+
+    Если изображение спектрограммы уже есть в кэше признаков (его кладёт
+    туда анализ, см. 2Analyse.analyze_audio_folder), файл не декодируется;
+    иначе спектрограмма считается в обработчике. Картинка получается из
+    таблицы цветов индексированием numpy, без фигур matplotlib.
+
+    :param jobs: Список пар (аудиофайл, путь к PNG).
+    :param cache_dir: Папка кэша признаков (None - без кэша).
+    :param workers: Количество процессов (по умолчанию - по числу ядер).
+    :return: Список (job, ошибка или None) в исходном порядке.
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return []
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if chunksize is None:
+        chunksize = max(1, len(jobs) // (workers * 4))
+
+    start_time = time.time()
+    if workers == 1:
+        _init_worker(cache_dir, cmap)
+        results = [_render_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cache_dir, cmap)) as executor:
+            results = list(executor.map(_render_job, jobs, chunksize=chunksize))
+    elapsed = max(time.time() - start_time, 1e-9)
+
+    for (audio_file, _), error in results:
+        if error is not None:
+            print(f"Error creating spectrogram for {audio_file}: {error}")
+    print(f"Rendered {len(jobs)} spectrograms in {elapsed:.2f} s ({len(jobs) / elapsed:.1f} files/s, {workers} workers)")
+    return results
+
+
+def select_for_render(results, every=None, outlier_z=None, columns=None):
+    """
+    Выбор файлов для отрисовки по результатам анализа.
+
+    :param results: Список словарей признаков (с ключом 'File').
+    :param every: Рисовать каждый N-й файл.
+    :param outlier_z: Рисовать файлы, у которых хотя бы один признак отклоняется
+                      от медианы больше чем на outlier_z робастных стандартных отклонений (MAD).
+    :param columns: Признаки для поиска выбросов (по умолчанию - все числовые).
+    :return: Список путей; без every и outlier_z - все файлы.
+    """
+    if every is None and outlier_z is None:
+        return [result['File'] for result in results]
+    selected = np.zeros(len(results), dtype=bool)
+    if every is not None:
+        selected[::every] = True
+    if outlier_z is not None and results:
+        if columns is None:
+            columns = [
+                name for name, value in results[0].items()
+                if isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool)
+            ]
+        values = np.asarray([[result[name] for name in columns] for result in results], dtype=np.float64)
+        median = np.median(values, axis=0)
+        mad = np.median(np.abs(values - median), axis=0) * 1.4826
+        z = np.abs(values - median) / np.where(mad > 0, mad, np.inf)
+        selected |= (z > outlier_z).any(axis=1)
+    return [result['File'] for result, keep in zip(results, selected) if keep]
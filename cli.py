@@ -0,0 +1,255 @@
+"""
+Единая точка входа для инструментов репозитория.
+
+    python cli.py convert --dataset-dir ESC_DATASET_v1.2 --output-root dataset
+    python cli.py analyze --mode basic --base-dir ESC_DATASET_v1.2 --output-dir spectograms
+    python cli.py denoise --method treshold --src luga/02_11_2023 --dst cleaned
+    python cli.py profiles --noise-dir ESC_DATASET_v1.2/luga/noise --output noise_profiles.npz
+    python cli.py split --csv luga.csv --out-dir splits
+    python cli.py submit --src audio --dst submission
+
+Пути берутся из аргументов или из JSON-конфига (--config), в котором для
+каждой подкоманды задаётся словарь значений по умолчанию, например
+{"denoise": {"method": "main", "workers": 4}}. Аргументы командной строки
+имеют приоритет над конфигом.
+
+Модули с тяжёлыми зависимостями (librosa, noisereduce, модель)
+импортируются только внутри выбранной подкоманды, поэтому --help и разбор
+аргументов не загружают их.
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Папки инструментов: модули в них импортируют друг друга по короткому имени
+TOOL_DIRS = {
+    'analys': os.path.join(ROOT, 'analys'),
+    'dataset': os.path.join(ROOT, 'dataset_Coqui'),
+    'noise_filter': os.path.join(ROOT, 'noise_filter'),
+    'submission': os.path.join(ROOT, 'data', 'ржд 1', 'example'),
+}
+
+
+# Импорт модуля инструмента по имени (добавляет его папку в sys.path)
+def load_tool(tool, module_name):
+    tool_dir = TOOL_DIRS[tool]
+    if tool_dir not in sys.path:
+        sys.path.insert(0, tool_dir)
+    return importlib.import_module(module_name)
+
+
+def run_convert(args):
+    dataset = load_tool('dataset', 'dataset')
+    if args.dataset_dir:
+        dataset.main(
+            args.dataset_dir,
+            args.output_root,
+            csv_dir=args.csv_dir,
+            dry_run=args.dry_run,
+            workers=args.workers,
+            quality=args.quality,
+        )
+    else:
+        dataset.convert_to_wav(
+            args.src,
+            args.dst,
+            target_sr=args.sr,
+            dry_run=args.dry_run,
+            workers=args.workers,
+            quality=args.quality,
+        )
+
+
+# Режимы анализа: отчёт по аннотациям (Analys.py), базовые признаки со
+# спектрограммами (2Analyse.py), расширенные признаки (3analyse.py)
+ANALYZE_MODULES = {'report': 'Analys', 'basic': '2Analyse', 'extended': '3analyse'}
+
+
+def run_analyze(args):
+    module = load_tool('analys', ANALYZE_MODULES[args.mode])
+    cache_dir = None if args.no_cache else args.cache_dir
+    if args.mode == 'report':
+        module.main(args.base_dir, workers=args.workers, cache_dir=cache_dir)
+    elif args.mode == 'basic':
+        module.main(
+            args.base_dir,
+            args.output_dir,
+            cache_dir=cache_dir,
+            every=args.render_every,
+            outlier_z=args.render_outliers,
+            workers=args.workers,
+        )
+    else:
+        module.main(args.base_dir, args.output_dir, cache_dir=cache_dir)
+
+
+def run_denoise(args):
+    if args.method == 'gated':
+        module = load_tool('noise_filter', 'noise_filter')
+        module.main(args.src, args.dst, mode='gated')
+    elif args.method == 'stream':
+        module = load_tool('noise_filter', 'streaming')
+        module.stream_file(args.src, args.dst, frame_ms=args.frame_ms)
+    elif args.method == 'main':
+        module = load_tool('noise_filter', 'main')
+        module.main(args.src, args.dst, workers=args.workers, block_seconds=args.block_seconds, trace_path=args.trace,
+                    profiles_path=args.noise_profiles, readers=args.readers, queue_depth=args.queue_depth)
+    else:
+        module = load_tool('noise_filter', 'treshold')
+        module.main(args.src, args.dst, workers=args.workers, trace_path=args.trace,
+                    profiles_path=args.noise_profiles, readers=args.readers, queue_depth=args.queue_depth,
+                    trim=args.trim, threshold=args.threshold)
+
+
+def run_profiles(args):
+    noise_profiles = load_tool('noise_filter', 'noise_profiles')
+    noise_profiles.build_profile_library(args.noise_dir, args.output, n_clusters=args.clusters, sample_rate=args.sr)
+
+
+def run_split(args):
+    dataset = load_tool('dataset', 'dataset')
+    os.makedirs(args.out_dir, exist_ok=True)
+    train_csv, dev_csv, test_csv = (os.path.join(args.out_dir, f'{split}.csv') for split in ('train', 'dev', 'test'))
+    store = None
+    if args.group_by == 'speaker':
+        annotations = load_tool('dataset', 'annotations')
+        store = annotations.load_annotations(
+            args.annotations_dir, snapshot_path=os.path.join(args.out_dir, annotations.SNAPSHOT_NAME)
+        )
+    dataset.split_data(args.csv, train_csv, dev_csv, test_csv, test_size=args.test_size, dev_size=args.dev_size,
+                       group_by=args.group_by, store=store)
+
+
+def run_submit(args):
+    get_submission = load_tool('submission', 'get_submission')
+    get_submission.write_submission(
+        args.src,
+        args.dst,
+        batch_size=args.batch_size,
+        prefetch_batches=args.prefetch,
+        num_workers=args.num_workers,
+    )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Инструменты подготовки данных, анализа и шумоподавления")
+    parser.add_argument('--config', help="JSON-файл со значениями по умолчанию для подкоманд")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert = subparsers.add_parser('convert', help="Конвертация аудио в WAV (dataset_Coqui)")
+    convert.add_argument('--src', help="Папка с исходными файлами")
+    convert.add_argument('--dst', help="Папка для сконвертированных файлов")
+    convert.add_argument('--dataset-dir', help="Папка ESC_DATASET_v1.2: полная подготовка датасета вместо --src/--dst")
+    convert.add_argument('--output-root', default='dataset', help="Папка результатов полной подготовки")
+    convert.add_argument('--csv-dir', default='.', help="Папка для CSV и упакованных выборок")
+    convert.add_argument('--sr', type=int, default=16000, help="Целевая частота дискретизации")
+    convert.add_argument('--workers', type=int, help="Количество процессов")
+    convert.add_argument('--quality', choices=['fast', 'balanced', 'quality'], default='balanced')
+    convert.add_argument('--dry-run', action='store_true', help="Только вывести сводку предстоящей работы")
+    convert.set_defaults(handler=run_convert)
+
+    analyze = subparsers.add_parser('analyze', help="Анализ аудио и аннотаций (analys)")
+    analyze.add_argument('--mode', choices=sorted(ANALYZE_MODULES), default='basic')
+    analyze.add_argument('--base-dir', help="Папка ESC_DATASET_v1.2")
+    analyze.add_argument('--output-dir', default='spectograms', help="Папка для спектрограмм")
+    analyze.add_argument('--cache-dir', default='feature_cache', help="Папка кэша признаков (для report - снимка аннотаций)")
+    analyze.add_argument('--no-cache', action='store_true', help="Не использовать кэш признаков")
+    analyze.add_argument('--render-every', type=int, help="Рисовать спектрограмму каждого N-го файла (только basic)")
+    analyze.add_argument('--render-outliers', type=float, metavar='Z',
+                         help="Рисовать спектрограммы файлов-выбросов по признакам (только basic)")
+    analyze.add_argument('--workers', type=int, help="Процессы отрисовки (basic) или потоки чтения заголовков (report)")
+    analyze.set_defaults(handler=run_analyze)
+
+    denoise = subparsers.add_parser('denoise', help="Шумоподавление (noise_filter)")
+    denoise.add_argument('--method', choices=['main', 'treshold', 'gated', 'stream'], default='main',
+                         help="main/treshold - папка целиком, gated/stream - один файл")
+    denoise.add_argument('--src', help="Входная папка (или файл для gated/stream)")
+    denoise.add_argument('--dst', help="Выходная папка (или файл для gated/stream)")
+    denoise.add_argument('--workers', type=int, help="Количество процессов (по умолчанию 1 - последовательно)")
+    denoise.add_argument('--block-seconds', type=float, help="Поблочная обработка длинных файлов (только main)")
+    denoise.add_argument('--frame-ms', type=float, default=10.0, help="Длина кадра потоковой обработки, мс (только stream)")
+    denoise.add_argument('--trace', help="Журнал замеров этапов JSON-lines со сводкой в конце (main/treshold)")
+    denoise.add_argument('--noise-profiles', help="Библиотека профилей шума .npz вместо первой секунды файла (main/treshold)")
+    denoise.add_argument('--readers', type=int, default=2, help="Потоки чтения конвейера (main/treshold)")
+    denoise.add_argument('--queue-depth', type=int, default=4,
+                         help="Глубина очередей между чтением, обработкой и записью (main/treshold)")
+    denoise.add_argument('--trim', choices=['envelope', 'speech'], default='envelope',
+                         help="Обрезка по огибающей или по речевым участкам (только treshold, по умолчанию envelope)")
+    denoise.add_argument('--threshold', type=float, default=0.2,
+                         help="Порог нормированной огибающей для --trim envelope (по умолчанию 0.2)")
+    denoise.set_defaults(handler=run_denoise)
+
+    profiles = subparsers.add_parser('profiles', help="Библиотека профилей шума по записям luga/noise")
+    profiles.add_argument('--noise-dir', help="Папка с записями шума")
+    profiles.add_argument('--output', default='noise_profiles.npz', help="Файл библиотеки")
+    profiles.add_argument('--clusters', type=int, default=8, help="Количество профилей")
+    profiles.add_argument('--sr', type=int, default=16000, help="Частота дискретизации профилей")
+    profiles.set_defaults(handler=run_profiles)
+
+    split = subparsers.add_parser('split', help="Разбиение CSV на train/dev/test")
+    split.add_argument('--csv', help="CSV со строками (путь к WAV, текст)")
+    split.add_argument('--out-dir', default='.', help="Папка для train.csv, dev.csv, test.csv")
+    split.add_argument('--test-size', type=float, default=0.2)
+    split.add_argument('--dev-size', type=float, default=0.1)
+    split.add_argument('--group-by', choices=['speaker', 'date'],
+                       help="Записи одного спикера или одной даты записи попадают в одну выборку")
+    split.add_argument('--annotations-dir', help="Папка annotation ESC_DATASET_v1.2 (нужна для --group-by speaker)")
+    split.set_defaults(handler=run_split)
+
+    submit = subparsers.add_parser('submit', help="Предсказания модели в submission.json")
+    submit.add_argument('--src', help="Папка с аудиофайлами")
+    submit.add_argument('--dst', help="Папка для submission.json")
+    submit.add_argument('--batch-size', type=int, default=16)
+    submit.add_argument('--prefetch', type=int, default=2)
+    submit.add_argument('--num-workers', type=int, default=4)
+    submit.set_defaults(handler=run_submit)
+
+    return parser, subparsers.choices
+
+
+# Значения из конфига становятся значениями по умолчанию подкоманд
+def apply_config(config_path, subcommands):
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    for name, defaults in config.items():
+        if name not in subcommands:
+            raise SystemExit(f"Неизвестная подкоманда в конфиге {config_path}: {name}")
+        subcommands[name].set_defaults(**{key.replace('-', '_'): value for key, value in defaults.items()})
+
+
+# Обязательные пути подкоманд: могут прийти как из аргументов, так и из конфига
+REQUIRED = {
+    'analyze': ['base_dir'],
+    'denoise': ['src', 'dst'],
+    'profiles': ['noise_dir'],
+    'split': ['csv'],
+    'submit': ['src', 'dst'],
+}
+
+
+def main(argv=None):
+    parser, subcommands = build_parser()
+    # Конфиг читается до основного разбора, чтобы аргументы могли его переопределить
+    pre_args, _ = parser.parse_known_args(argv)
+    if pre_args.config:
+        apply_config(pre_args.config, subcommands)
+    args = parser.parse_args(argv)
+
+    missing = [name for name in REQUIRED.get(args.command, []) if getattr(args, name) is None]
+    if args.command == 'split' and args.group_by == 'speaker' and args.annotations_dir is None:
+        missing.append('annotations_dir')
+    if args.command == 'convert' and not args.dataset_dir and (args.src is None or args.dst is None):
+        missing = ['src', 'dst']
+    if missing:
+        subcommands[args.command].error(
+            "не заданы пути: " + ", ".join('--' + name.replace('_', '-') for name in missing)
+        )
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,11 @@ from __future__ import annotations
 import os
 import argparse
 import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+
+import librosa
 
 from src.model import YourModelClass
 
@@ -14,15 +19,42 @@ class Predictor:
     or modify existing ones, but the output submission
     structure must be identical to the one presented.
 
+    If the model implements ``predict_batch(waveforms, sample_rate)``,
+    audio is decoded and resampled ahead of time by the runner and passed
+    to the model in batches. Otherwise ``predict(audio_path)`` is called
+    for each file and decoding is left to the model.
+
     Examples:
         >>> python -m get_submission --src input_dir --dst output_dir
     """
 
-    def __init__(self):
+    def __init__(self, sample_rate: int = 16000):
         self.model = YourModelClass()
+        self.sample_rate = sample_rate
+        self.batched = hasattr(self.model, "predict_batch")
+
+    def load(self, audio_path: str):
+        """Decode and resample one file (runs in the prefetch threads)."""
+        if not self.batched:
+            return None
+        waveform, _ = librosa.load(audio_path, sr=self.sample_rate, mono=True)
+        return waveform
+
+    def predict_batch(self, audio_paths: list[str], waveforms: list) -> list[dict]:
+        if self.batched:
+            predictions = self.model.predict_batch(waveforms, sample_rate=self.sample_rate)
+        else:
+            predictions = [self.model.predict(audio_path) for audio_path in audio_paths]
+        return [
+            self._format(audio_path, prediction)
+            for audio_path, prediction in zip(audio_paths, predictions)
+        ]
 
     def __call__(self, audio_path: str):
-        prediction = self.model.predict(audio_path)
+        return self.predict_batch([audio_path], [self.load(audio_path)])[0]
+
+    @staticmethod
+    def _format(audio_path: str, prediction: dict) -> dict:
         result = {
             "audio": os.path.basename(audio_path),          # Audio file base name
             "text": prediction.get("text", -1),             # Predicted text
@@ -32,6 +64,113 @@ class Predictor:
         return result
 
 
+def iter_prefetched_batches(
+    predictor: Predictor,
+    audio_paths: list[str],
+    batch_size: int = 16,
+    prefetch_batches: int = 2,
+    num_workers: int = 4,
+) -> Iterator[tuple[list[str], list]]:
+    """Yield (paths, waveforms) batches in input order.
+
+    Files are decoded by a thread pool up to ``prefetch_batches`` batches
+    ahead of the model, so decoding overlaps with inference while memory
+    stays bounded by the prefetch depth.
+    """
+    max_pending = batch_size * max(prefetch_batches, 1)
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        pending = deque()
+        paths = iter(audio_paths)
+        batch_paths, batch_waveforms = [], []
+        while True:
+            while len(pending) < max_pending:
+                audio_path = next(paths, None)
+                if audio_path is None:
+                    break
+                pending.append((audio_path, executor.submit(predictor.load, audio_path)))
+            if not pending:
+                break
+            audio_path, future = pending.popleft()
+            batch_paths.append(audio_path)
+            batch_waveforms.append(future.result())
+            if len(batch_paths) == batch_size:
+                yield batch_paths, batch_waveforms
+                batch_paths, batch_waveforms = [], []
+        if batch_paths:
+            yield batch_paths, batch_waveforms
+
+
+class JsonArrayWriter:
+    """Write a JSON array one element at a time instead of holding all results.
+
+    Elements go to a temporary file next to ``path`` that replaces ``path`` only
+    after a successful ``close``, so an interrupted run never leaves a truncated
+    or falsely complete submission behind.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.file = open(self.tmp_path, "w", encoding="utf-8")
+        self.file.write("[")
+        self.count = 0
+
+    def write(self, item: dict):
+        if self.count:
+            self.file.write(", ")
+        json.dump(item, self.file)
+        self.count += 1
+
+    def close(self):
+        self.file.write("]")
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        """Drop the partial output and keep any previous ``path`` untouched."""
+        self.file.close()
+        os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_submission(
+    src: str,
+    dst: str,
+    batch_size: int = 16,
+    prefetch_batches: int = 2,
+    num_workers: int = 4,
+) -> int:
+    """Run the predictor over every file in ``src`` and write ``dst/submission.json``.
+
+    Returns the number of written predictions.
+    """
+    predictor = Predictor()
+
+    # Sorted listing keeps the submission order deterministic
+    audio_paths = [os.path.join(src, name) for name in sorted(os.listdir(src))]
+
+    with JsonArrayWriter(os.path.join(dst, "submission.json")) as writer:
+        batches = iter_prefetched_batches(
+            predictor,
+            audio_paths,
+            batch_size=batch_size,
+            prefetch_batches=prefetch_batches,
+            num_workers=num_workers,
+        )
+        for batch_paths, batch_waveforms in batches:
+            for result in predictor.predict_batch(batch_paths, batch_waveforms):
+                writer.write(result)
+        return writer.count
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Get submission.")
     parser.add_argument(
@@ -44,15 +183,29 @@ if __name__ == "__main__":
         type=str,
         help="Path to the output submission.",
     )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=16,
+        help="Number of files passed to the model at once.",
+    )
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=2,
+        help="Number of batches decoded ahead of the model.",
+    )
+    parser.add_argument(
+        "--num-workers",
+        type=int,
+        default=4,
+        help="Number of decoding threads.",
+    )
     args = parser.parse_args()
-    predictor = Predictor()
-
-    results = []
-    for audio_path in os.listdir(args.src):
-        result = predictor(os.path.join(args.src, audio_path))
-        results.append(result)
-
-    with open(
-        os.path.join(args.dst, "submission.json"), "w", encoding="utf-8"
-    ) as outfile:
-        json.dump(results, outfile)
+    write_submission(
+        args.src,
+        args.dst,
+        batch_size=args.batch_size,
+        prefetch_batches=args.prefetch,
+        num_workers=args.num_workers,
+    )
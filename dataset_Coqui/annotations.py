@@ -0,0 +1,277 @@
+import json
+import os
+
+import numpy as np
+
+# Наборы данных ESC_DATASET_v1.2: аннотация annotation/{набор}.json,
+# спикеры (только hr_bot) - annotation/extra/{набор}_speakers.json
+ANNOTATION_DATASETS = ['hr_bot_clear', 'hr_bot_noise', 'hr_bot_synt', 'luga']
+# Имя файла снимка хранилища в папке кэша или результатов (не в папке исходных данных)
+SNAPSHOT_NAME = 'annotations.npz'
+# Версия формата снимка
+SNAPSHOT_VERSION = 1
+# Колонки с обратными индексами (значение -> строки)
+INDEXED_COLUMNS = ['dataset', 'label', 'attribute', 'speaker']
+
+
+# Пути к файлам аннотаций набора: (аннотация, спикеры)
+def annotation_paths(annotations_dir, dataset):
+    return (
+        os.path.join(annotations_dir, f'{dataset}.json'),
+        os.path.join(annotations_dir, 'extra', f'{dataset}_speakers.json'),
+    )
+
+
+# Размер и mtime исходных файлов: по ним проверяется актуальность снимка
+def _source_stamps(sources):
+    stamps = []
+    for path in sources:
+        if os.path.exists(path):
+            stat = os.stat(path)
+            stamps.append(f'{path}:{stat.st_size}:{stat.st_mtime_ns}')
+        else:
+            stamps.append(f'{path}:-')
+    return np.asarray(stamps)
+
+
+# Обратный индекс колонки: строки, упорядоченные по значению, и границы групп
+def _build_inverted(values):
+    order = np.argsort(values, kind='stable')
+    keys, starts = np.unique(values[order], return_index=True)
+    bounds = np.append(starts, len(values)).astype(np.int64)
+    return order.astype(np.int64), keys, bounds
+
+
+class AnnotationStore:
+    """
+    Аннотации всех наборов в памяти в виде колонок numpy.
+
+    Записи четырёх JSON-файлов аннотаций объединяются в общие колонки
+    (id, путь, текст, класс, атрибут, набор, спикер). Спикер берётся из
+    extra/*_speakers.json; номера кластеров спикеров свои в каждом наборе,
+    поэтому спикер хранится кодом в общем списке speaker_names вида
+    'hr_bot_clear/11' (-1 - спикер неизвестен, например для luga).
+
+    Поиск по id и пути к аудио - через словари, выборка по набору, классу,
+    атрибуту и спикеру - через обратные индексы: строки отсортированы по
+    значению, границы групп хранятся отдельно. Колонки и индексы
+    сохраняются в снимок .npz (save), чтение которого не разбирает JSON.
+
+    Строки создаются через from_json или load_annotations.
+    """
+
+    def __init__(self, columns, indexes=None):
+        self.ids = columns['ids']
+        self.paths = columns['paths']
+        self.texts = columns['texts']
+        self.labels = columns['labels']
+        self.attributes = columns['attributes']
+        self.datasets = columns['datasets']
+        self.speakers = columns['speakers']
+        self.dataset_names = columns['dataset_names']
+        self.speaker_names = columns['speaker_names']
+        self.source_stamps = columns.get('source_stamps', np.zeros(0, dtype=str))
+
+        self.indexes = indexes or {name: _build_inverted(self.column(name)) for name in INDEXED_COLUMNS}
+        self._groups = {
+            name: {key.item(): i for i, key in enumerate(keys)}
+            for name, (_, keys, _) in self.indexes.items()
+        }
+        self._dataset_codes = {str(name): i for i, name in enumerate(self.dataset_names)}
+        self._speaker_codes = {str(name): i for i, name in enumerate(self.speaker_names)}
+        self._id_to_row = {str(clip_id): i for i, clip_id in enumerate(self.ids)}
+        self._path_to_row = {
+            f'{self.dataset_names[dataset]}/{path}': i
+            for i, (dataset, path) in enumerate(zip(self.datasets, self.paths))
+        }
+
+    @classmethod
+    def from_json(cls, annotations_dir, datasets=None):
+        """
+        Разбор JSON-файлов аннотаций и спикеров.
+
+        :param annotations_dir: Папка annotation набора ESC_DATASET_v1.2.
+        :param datasets: Имена наборов (по умолчанию ANNOTATION_DATASETS); файлы без аннотации пропускаются.
+        """
+        rows = {'ids': [], 'paths': [], 'texts': [], 'labels': [], 'attributes': [], 'datasets': [], 'speakers': []}
+        dataset_names, speaker_names, speaker_codes, sources = [], [], {}, []
+        for dataset in datasets or ANNOTATION_DATASETS:
+            json_path, speakers_path = annotation_paths(annotations_dir, dataset)
+            sources += [json_path, speakers_path]
+            if not os.path.exists(json_path):
+                continue
+            with open(json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            clusters = {}
+            if os.path.exists(speakers_path):
+                with open(speakers_path, 'r', encoding='utf-8') as f:
+                    clusters = {entry['id']: entry['cluster'] for entry in json.load(f)}
+
+            code = len(dataset_names)
+            dataset_names.append(dataset)
+            for entry in data:
+                cluster = clusters.get(entry['id'])
+                speaker = -1
+                if cluster is not None:
+                    name = f'{dataset}/{cluster}'
+                    if name not in speaker_codes:
+                        speaker_codes[name] = len(speaker_names)
+                        speaker_names.append(name)
+                    speaker = speaker_codes[name]
+                rows['ids'].append(entry['id'])
+                rows['paths'].append(entry['audio_filepath'])
+                rows['texts'].append(entry['text'])
+                rows['labels'].append(entry['label'])
+                rows['attributes'].append(entry.get('attribute', -1))
+                rows['datasets'].append(code)
+                rows['speakers'].append(speaker)
+
+        columns = {
+            'ids': np.asarray(rows['ids'], dtype=str),
+            'paths': np.asarray(rows['paths'], dtype=str),
+            'texts': np.asarray(rows['texts'], dtype=str),
+            'labels': np.asarray(rows['labels'], dtype=np.int32),
+            'attributes': np.asarray(rows['attributes'], dtype=np.int32),
+            'datasets': np.asarray(rows['datasets'], dtype=np.int8),
+            'speakers': np.asarray(rows['speakers'], dtype=np.int32),
+            'dataset_names': np.asarray(dataset_names, dtype=str),
+            'speaker_names': np.asarray(speaker_names, dtype=str),
+            'source_stamps': _source_stamps(sources),
+        }
+        return cls(columns)
+
+    def save(self, snapshot_path):
+        """Снимок колонок и обратных индексов в .npz (без pickle)."""
+        arrays = {
+            'version': np.int64(SNAPSHOT_VERSION),
+            'ids': self.ids, 'paths': self.paths, 'texts': self.texts,
+            'labels': self.labels, 'attributes': self.attributes,
+            'datasets': self.datasets, 'speakers': self.speakers,
+            'dataset_names': self.dataset_names, 'speaker_names': self.speaker_names,
+            'source_stamps': self.source_stamps,
+        }
+        for name, (order, keys, bounds) in self.indexes.items():
+            arrays[f'index_{name}_order'] = order
+            arrays[f'index_{name}_keys'] = keys
+            arrays[f'index_{name}_bounds'] = bounds
+        tmp_path = snapshot_path + '.tmp.npz'
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, snapshot_path)
+
+    @classmethod
+    def load(cls, snapshot_path):
+        with np.load(snapshot_path) as data:
+            if int(data['version']) != SNAPSHOT_VERSION:
+                raise ValueError(f"Снимок {snapshot_path} другой версии: {int(data['version'])}")
+            columns = {name: data[name] for name in (
+                'ids', 'paths', 'texts', 'labels', 'attributes', 'datasets', 'speakers',
+                'dataset_names', 'speaker_names', 'source_stamps',
+            )}
+            indexes = {
+                name: (data[f'index_{name}_order'], data[f'index_{name}_keys'], data[f'index_{name}_bounds'])
+                for name in INDEXED_COLUMNS
+            }
+        return cls(columns, indexes)
+
+    def __len__(self):
+        return len(self.ids)
+
+    # Колонка по имени индекса: dataset, label, attribute, speaker
+    def column(self, name):
+        return {'dataset': self.datasets, 'label': self.labels,
+                'attribute': self.attributes, 'speaker': self.speakers}[name]
+
+    # Номер строки по id записи (None - нет в аннотации)
+    def row_by_id(self, clip_id):
+        return self._id_to_row.get(clip_id)
+
+    # Номер строки по пути к аудио: '{набор}/{audio_filepath}' (как в папке ESC_DATASET_v1.2)
+    def row_by_path(self, path):
+        return self._path_to_row.get(path.replace(os.sep, '/'))
+
+    def rows(self, name, value):
+        """
+        Строки с заданным значением колонки (через обратный индекс, без просмотра колонки).
+
+        Набор и спикер можно передавать по имени ('luga', 'hr_bot_clear/11').
+        """
+        if name == 'dataset' and isinstance(value, str):
+            value = self._dataset_codes.get(value, -2)
+        elif name == 'speaker' and isinstance(value, str):
+            value = self._speaker_codes.get(value, -2)
+        order, _, bounds = self.indexes[name]
+        group = self._groups[name].get(int(value))
+        if group is None:
+            return np.zeros(0, dtype=np.int64)
+        return order[bounds[group]:bounds[group + 1]]
+
+    def select(self, **conditions):
+        """
+        Строки, удовлетворяющие всем условиям, например select(dataset='luga', label=17).
+
+        :return: Отсортированный массив номеров строк.
+        """
+        result = None
+        for name, value in conditions.items():
+            rows = self.rows(name, value)
+            result = np.sort(rows) if result is None else np.intersect1d(result, rows, assume_unique=True)
+        return np.arange(len(self)) if result is None else result
+
+    # Количество записей по значениям колонки: словарь значение -> количество
+    def counts(self, name, rows=None):
+        if rows is None:
+            _, keys, bounds = self.indexes[name]
+            return dict(zip(keys.tolist(), np.diff(bounds).tolist()))
+        keys, counts = np.unique(self.column(name)[rows], return_counts=True)
+        return dict(zip(keys.tolist(), counts.tolist()))
+
+    # Имя спикера строки ('hr_bot_clear/11') или None
+    def speaker_name(self, row):
+        speaker = self.speakers[row]
+        return None if speaker < 0 else str(self.speaker_names[speaker])
+
+    def record(self, row):
+        """Запись в виде словаря, как в JSON аннотации, плюс набор и спикер."""
+        return {
+            'audio_filepath': str(self.paths[row]),
+            'id': str(self.ids[row]),
+            'text': str(self.texts[row]),
+            'label': int(self.labels[row]),
+            'attribute': int(self.attributes[row]),
+            'dataset': str(self.dataset_names[self.datasets[row]]),
+            'speaker': self.speaker_name(row),
+        }
+
+    # Записи набора в исходном порядке JSON
+    def records(self, dataset):
+        for row in self.select(dataset=dataset):
+            yield self.record(row)
+
+
+def load_annotations(annotations_dir, snapshot_path=None, datasets=None):
+    """
+    Хранилище аннотаций со снимком: JSON разбирается, только если снимка нет
+    или исходные файлы изменились (по размеру и mtime), после чего снимок обновляется.
+
+    :param annotations_dir: Папка annotation набора ESC_DATASET_v1.2.
+    :param snapshot_path: Путь к снимку, например {папка результатов}/annotations.npz (None или False -
+                          без снимка). Папка исходных данных может быть только для чтения,
+                          поэтому снимок рядом с JSON не создаётся.
+    :param datasets: Имена наборов (по умолчанию ANNOTATION_DATASETS).
+    """
+    if not snapshot_path:
+        return AnnotationStore.from_json(annotations_dir, datasets)
+    sources = [path for dataset in datasets or ANNOTATION_DATASETS for path in annotation_paths(annotations_dir, dataset)]
+    if os.path.exists(snapshot_path):
+        try:
+            store = AnnotationStore.load(snapshot_path)
+            if np.array_equal(store.source_stamps, _source_stamps(sources)):
+                return store
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Снимок аннотаций {snapshot_path} не прочитан, разбор JSON: {e}")
+    store = AnnotationStore.from_json(annotations_dir, datasets)
+    try:
+        store.save(snapshot_path)
+    except OSError as e:
+        print(f"Не удалось сохранить снимок аннотаций {snapshot_path}: {e}")
+    return store
@@ -0,0 +1,120 @@
+import os
+import threading
+from collections import OrderedDict
+
+import librosa
+import numpy as np
+
+from converter import RESAMPLERS, decode_mono
+
+# Размер кэша декодированных записей по умолчанию: записей и байт
+CACHE_ITEMS = 8
+CACHE_BYTES = 256 * 1024 ** 2
+
+
+class AudioCache:
+    """
+    Небольшой LRU-кэш декодированных записей в памяти процесса.
+
+    Ключ - путь, размер и mtime файла, частота и качество ресемплинга, поэтому
+    изменённый файл декодируется заново. Буферы в кэше только для чтения.
+    Кэш общий для потоков (например, потоков чтения pipeline.py).
+
+    :param max_items: Наибольшее количество записей.
+    :param max_bytes: Наибольший суммарный размер буферов.
+    """
+
+    def __init__(self, max_items=CACHE_ITEMS, max_bytes=CACHE_BYTES):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, y, sr):
+        if y.nbytes > self.max_bytes:
+            return
+        y.flags.writeable = False
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = (y, sr)
+            self._bytes += y.nbytes
+            while len(self._entries) > self.max_items or self._bytes > self.max_bytes:
+                _, (old, _) = self._entries.popitem(last=False)
+                self._bytes -= old.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+# Кэш процесса по умолчанию (в каждом процессе пула - свой)
+_cache = AudioCache()
+
+
+def decode_audio(path, sr=None, quality='balanced'):
+    """
+    Декодирование MP3/WAV (и других форматов) сразу в моно float32 без промежуточных файлов.
+
+    Сначала soundfile, для форматов, которые он не читает, - librosa
+    (converter.decode_mono); при sr, отличном от исходной частоты, -
+    ресемплинг с качеством quality (converter.RESAMPLERS).
+
+    :return: Кортеж (сигнал float32, частота дискретизации).
+    """
+    y, native_sr = decode_mono(path)
+    if sr is not None and sr != native_sr:
+        y = librosa.resample(y, orig_sr=native_sr, target_sr=sr, res_type=RESAMPLERS[quality])
+        return np.ascontiguousarray(y, dtype=np.float32), sr
+    return y, native_sr
+
+
+def load_audio(path, sr=None, quality='balanced', cache=True, writable=True):
+    """
+    Загрузка записи с кэшем декодированных буферов.
+
+    Заменяет librosa.load(path, sr=sr) во всех этапах анализа и шумоподавления:
+    тот же моно float32, но MP3 не конвертируется во временный WAV, а этапы,
+    которые обращаются к одной записи несколько раз, декодируют её один раз.
+
+    :param sr: Целевая частота (None - исходная).
+    :param cache: Использовать кэш процесса (False - всегда декодировать, например
+                  в потоках чтения конвейера, где каждая запись читается один раз).
+    :param writable: True - вернуть собственный буфер, который можно менять на месте
+                     (например, bandpass_filter с out=): при промахе - только что
+                     декодированный сигнал без копии и без записи в кэш, при
+                     попадании - копия; False - общий буфер кэша только для чтения.
+    :return: Кортеж (сигнал float32, частота дискретизации).
+    """
+    if not cache:
+        return decode_audio(path, sr, quality)
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns, sr, quality)
+    cached = _cache.get(key)
+    if cached is not None:
+        y, out_sr = cached
+        return (y.copy() if writable else y), out_sr
+    y, out_sr = decode_audio(path, sr, quality)
+    # Изменяемый буфер отдаётся вызывающему целиком: кэшировать его нельзя, копировать незачем
+    if not writable:
+        _cache.put(key, y, out_sr)
+    return y, out_sr
+
+
+# Кэш процесса по умолчанию: для статистики попаданий и очистки
+def audio_cache():
+    return _cache
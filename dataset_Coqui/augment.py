@@ -0,0 +1,186 @@
+import os
+
+import numpy as np
+
+from corpus import PackedCorpus, corpus_paths
+
+# Диапазон SNR смешивания по умолчанию (дБ)
+SNR_RANGE = (0.0, 20.0)
+
+
+def pack_noise(noise_dir, prefix, sample_rate=16000):
+    """
+    Упаковывает записи шума (luga/noise) в один файл int16 в формате corpus.py.
+
+    Записи декодируются один раз (MP3/WAV, моно, sample_rate) и пишутся подряд
+    в {prefix}.pcm; индекс совместим с PackedCorpus, вместо текста хранится
+    имя исходного файла. Дальше шум читается только через memmap.
+
+    :param noise_dir: Папка с записями шума.
+    :param prefix: Префикс путей выходных файлов.
+    :return: Количество упакованных записей.
+    """
+    import librosa  # декодирование MP3 нужно только при упаковке
+
+    blob_path, index_path = corpus_paths(prefix)
+    offsets, lengths, ids, names = [], [], [], []
+    position = 0
+    with open(blob_path, 'wb') as blob:
+        for root, _, files in os.walk(noise_dir):
+            for file_name in sorted(files):
+                if not (file_name.endswith('.wav') or file_name.endswith('.mp3')):
+                    continue
+                try:
+                    y, _ = librosa.load(os.path.join(root, file_name), sr=sample_rate)
+                except Exception as e:
+                    print(f"Ошибка чтения файла {file_name}: {e}")
+                    continue
+                if not len(y):
+                    continue
+                audio = (np.clip(y, -1.0, 32767 / 32768) * 32768).astype(np.int16)
+                blob.write(audio.tobytes())
+                offsets.append(position)
+                lengths.append(len(audio))
+                ids.append(os.path.splitext(file_name)[0])
+                names.append(file_name)
+                position += len(audio)
+
+    np.savez(
+        index_path,
+        offsets=np.asarray(offsets, dtype=np.int64),
+        lengths=np.asarray(lengths, dtype=np.int64),
+        ids=np.asarray(ids),
+        texts=np.asarray(names),
+        sample_rate=np.int64(sample_rate),
+    )
+    print(f"Упаковано {len(offsets)} записей шума ({position / sample_rate / 60:.1f} мин) в {blob_path}")
+    return len(offsets)
+
+
+class NoiseAugmentedLoader:
+    """
+    Загрузчик батчей с подмешиванием шума на лету.
+
+    Чистые записи (упакованные hr_bot_clear / hr_bot_synt, см. corpus.pack_split)
+    и шум (pack_noise) отображаются в память один раз. Для каждого батча
+    записи собираются в дополненную нулями матрицу [батч, время], для каждой
+    строки выбираются случайный отрезок шума и целевой SNR, и смешивание
+    выполняется векторно по всему батчу: мощности сигнала и шума считаются
+    только по сэмплам записи (без дополнения), усиление шума подбирается
+    под SNR. Строки, которые после смешивания выходят за [-1, 1), ослабляются
+    целиком. Зашумлённая копия набора на диске при этом не нужна.
+
+    Шум всех записей рассматривается как одна длинная кольцевая запись:
+    отрезок может захватить конец одной записи шума и начало следующей.
+
+    :param clean: PackedCorpus или список PackedCorpus с чистыми записями.
+    :param noise: PackedCorpus с шумом.
+    :param batch_size: Размер батча.
+    :param snr_db: Диапазон SNR (дБ), из которого равномерно выбирается значение для строки.
+    :param noise_prob: Доля строк, в которые подмешивается шум (остальные остаются чистыми).
+    :param seed: Начальное значение генератора случайных чисел.
+    """
+
+    def __init__(self, clean, noise, batch_size=16, snr_db=SNR_RANGE, noise_prob=1.0, seed=None):
+        corpora = [clean] if isinstance(clean, PackedCorpus) else list(clean)
+        for corpus in corpora:
+            if corpus.sample_rate != noise.sample_rate:
+                raise ValueError(f"Частота шума {noise.sample_rate} Гц не совпадает с частотой записей {corpus.sample_rate} Гц")
+        self.corpora = corpora
+        self.noise = noise.samples
+        if not len(self.noise):
+            raise ValueError("Пустой набор шума")
+        self.sample_rate = noise.sample_rate
+        self.batch_size = batch_size
+        self.snr_db = snr_db
+        self.noise_prob = noise_prob
+        self.rng = np.random.default_rng(seed)
+
+        # Сквозная нумерация записей всех наборов: номер набора и номер записи в нём
+        self.sources = np.concatenate([np.full(len(c), i, dtype=np.int64) for i, c in enumerate(corpora)])
+        self.items = np.concatenate([np.arange(len(c), dtype=np.int64) for c in corpora])
+
+    def __len__(self):
+        return -(-len(self.items) // self.batch_size)
+
+    # Дополненная нулями матрица чистых записей [батч, время] и длины записей
+    def _gather_clean(self, order):
+        lengths = np.empty(len(order), dtype=np.int64)
+        starts = np.empty(len(order), dtype=np.int64)
+        for i, corpus in enumerate(self.corpora):
+            rows = self.sources[order] == i
+            lengths[rows] = corpus.lengths[self.items[order][rows]]
+            starts[rows] = corpus.offsets[self.items[order][rows]]
+        positions = np.arange(lengths.max())
+        mask = positions[None, :] < lengths[:, None]
+        batch = np.zeros(mask.shape, dtype=np.float32)
+        for i, corpus in enumerate(self.corpora):
+            rows = np.flatnonzero(self.sources[order] == i)
+            if not len(rows):
+                continue
+            # Индексы за концом записи прижимаются к последнему сэмплу и затем зануляются маской
+            index = starts[rows, None] + np.minimum(positions[None, :], lengths[rows, None] - 1)
+            batch[rows] = corpus.samples[index]
+        batch *= mask.astype(np.float32) / np.float32(32768.0)
+        return batch, lengths, mask
+
+    def mix(self, clean, mask, snr_db):
+        """
+        Смешивание дополненного батча [батч, время] со случайными отрезками шума.
+
+        :param mask: Маска сэмплов записей (True - сэмпл записи, False - дополнение).
+        :param snr_db: SNR (дБ) для каждой строки; NaN - строка остаётся чистой.
+        :return: Зашумлённый батч float32 той же формы.
+        """
+        n_rows, width = clean.shape
+        starts = self.rng.integers(0, len(self.noise), size=n_rows)
+        index = (starts[:, None] + np.arange(width)[None, :]) % len(self.noise)
+        noise = self.noise[index].astype(np.float32) * (mask.astype(np.float32) / np.float32(32768.0))
+
+        counts = np.maximum(mask.sum(axis=1), 1)
+        clean_power = (clean ** 2).sum(axis=1) / counts
+        noise_power = (noise ** 2).sum(axis=1) / counts
+        gain = np.sqrt(clean_power / (np.maximum(noise_power, 1e-12) * 10.0 ** (np.nan_to_num(snr_db) / 10.0)))
+        gain[np.isnan(snr_db)] = 0.0
+
+        mixed = clean + gain[:, None].astype(np.float32) * noise
+        peak = np.abs(mixed).max(axis=1)
+        mixed /= np.maximum(peak / np.float32(32767 / 32768), 1.0)[:, None].astype(np.float32)
+        return mixed
+
+    def batch(self, order):
+        """
+        Батч по номерам записей (сквозная нумерация по всем наборам).
+
+        :return: Словарь: audio [батч, время] float32, lengths, texts, snr_db (NaN - без шума).
+        """
+        order = np.asarray(order, dtype=np.int64)
+        clean, lengths, mask = self._gather_clean(order)
+        snr_db = self.rng.uniform(self.snr_db[0], self.snr_db[1], size=len(order))
+        snr_db[self.rng.random(len(order)) >= self.noise_prob] = np.nan
+        texts = [str(self.corpora[s].texts[i]) for s, i in zip(self.sources[order], self.items[order])]
+        return {
+            'audio': self.mix(clean, mask, snr_db),
+            'lengths': lengths,
+            'texts': texts,
+            'snr_db': snr_db,
+        }
+
+    def iter_epoch(self, shuffle=True, sort_by_length=False):
+        """
+        Генератор батчей по всем записям, каждый раз с новым шумом и SNR.
+
+        sort_by_length=True - записи близкой длины попадают в один батч
+        (меньше дополнения), порядок батчей при этом перемешивается.
+        """
+        order = np.arange(len(self.items))
+        if shuffle:
+            self.rng.shuffle(order)
+        if sort_by_length:
+            lengths = np.concatenate([c.lengths for c in self.corpora])
+            order = order[np.argsort(lengths[order], kind='stable')]
+        batches = [order[i:i + self.batch_size] for i in range(0, len(order), self.batch_size)]
+        if shuffle and sort_by_length:
+            self.rng.shuffle(batches)
+        for batch_order in batches:
+            yield self.batch(batch_order)
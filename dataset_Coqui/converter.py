@@ -0,0 +1,103 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import librosa
+import numpy as np
+import soundfile as sf
+
+# Режимы ресемплинга: скорость или качество (res_type для librosa.resample)
+RESAMPLERS = {
+    'fast': 'soxr_lq',
+    'balanced': 'soxr_hq',
+    'quality': 'soxr_vhq',
+}
+
+# Настройки, закреплённые за процессом-обработчиком (задаются один раз в _init_worker)
+_worker_config = {'target_sr': 16000, 'res_type': RESAMPLERS['balanced']}
+
+
+def _init_worker(target_sr, res_type):
+    _worker_config['target_sr'] = target_sr
+    _worker_config['res_type'] = res_type
+
+
+# Декодирование в моно float32: soundfile напрямую, librosa - для остальных форматов
+def decode_mono(path):
+    try:
+        audio, sr = sf.read(path, dtype='float32', always_2d=True)
+        audio = audio.mean(axis=1) if audio.shape[1] > 1 else audio[:, 0]
+    except RuntimeError:
+        audio, sr = librosa.load(path, sr=None, mono=True)
+    return np.ascontiguousarray(audio, dtype=np.float32), sr
+
+
+def convert_file(source, output, target_sr=16000, res_type=RESAMPLERS['balanced']):
+    """
+    Конвертирует один файл в WAV PCM_16 моно с нужной частотой.
+
+    :param target_sr: Целевая частота (None - оставить исходную).
+    :return: Длительность исходной записи (сек).
+    """
+    audio, sr = decode_mono(source)
+    duration = len(audio) / sr
+    if target_sr is not None and sr != target_sr:
+        audio = librosa.resample(audio, orig_sr=sr, target_sr=target_sr, res_type=res_type)
+        sr = target_sr
+    sf.write(output, audio, sr, subtype='PCM_16')
+    return duration
+
+
+# Задача для пула: настройки ресемплера берутся из конфигурации процесса
+def _convert_job(job):
+    source, output = job
+    try:
+        duration = convert_file(source, output, _worker_config['target_sr'], _worker_config['res_type'])
+        return job, duration, None
+    except Exception as e:
+        return job, 0.0, str(e)
+
+
+def convert_files(jobs, target_sr=16000, workers=None, quality='balanced', chunksize=None):
+    """
+    Параллельная конвертация списка файлов в пуле процессов.
+
+    Каждый процесс получает одну конфигурацию ресемплера на всё время работы.
+    По окончании выводятся скорость (файлов/сек) и фактор реального времени
+    (секунд аудио на секунду работы).
+
+    :param jobs: Список пар (исходный файл, файл результата).
+    :param target_sr: Целевая частота (None - без ресемплинга).
+    :param workers: Количество процессов (по умолчанию - по числу ядер).
+    :param quality: 'fast', 'balanced' или 'quality' (см. RESAMPLERS).
+    :return: Список (job, длительность, ошибка или None) в исходном порядке.
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return []
+    res_type = RESAMPLERS[quality]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if chunksize is None:
+        chunksize = max(1, len(jobs) // (workers * 4))
+
+    start_time = time.time()
+    if workers == 1:
+        _init_worker(target_sr, res_type)
+        results = [_convert_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(target_sr, res_type)) as executor:
+            results = list(executor.map(_convert_job, jobs, chunksize=chunksize))
+    elapsed = max(time.time() - start_time, 1e-9)
+
+    for (source, output), _, error in results:
+        if error is not None:
+            print(f"Ошибка при конвертации файла {source}: {error}")
+    failed = sum(error is not None for _, _, error in results)
+    converted = len(jobs) - failed
+    audio_seconds = sum(duration for _, duration, error in results if error is None)
+    print(
+        f"Конвертировано {converted} файлов, ошибок {failed}, за {elapsed:.2f} сек: "
+        f"{converted / elapsed:.1f} файлов/сек, фактор реального времени {audio_seconds / elapsed:.1f}x "
+        f"({workers} процессов, ресемплер {res_type})"
+    )
+    return results
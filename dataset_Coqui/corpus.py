@@ -0,0 +1,119 @@
+import csv
+import os
+
+import numpy as np
+import soundfile as sf
+
+
+# Пути к файлам упакованной выборки: сплошной блок сэмплов и индекс
+def corpus_paths(prefix):
+    return prefix + '.pcm', prefix + '.index.npz'
+
+
+def pack_split(csv_file, prefix, sample_rate=16000, speech_index=None):
+    """
+    Упаковывает выборку (train.csv / dev.csv / test.csv) в один файл int16.
+
+    Все записи пишутся подряд в {prefix}.pcm, а в {prefix}.index.npz
+    сохраняются смещение и длина каждой записи (в сэмплах), её id (имя
+    файла без расширения) и текст. Файлы читаются по очереди, в памяти
+    держится только одна запись.
+
+    :param csv_file: CSV со строками (путь к WAV, текст), как в split_data.
+    :param prefix: Префикс путей выходных файлов.
+    :param sample_rate: Ожидаемая частота дискретизации записей.
+    :param speech_index: Индекс речевых участков (vad.SpeechIndex): начальная
+                         и конечная тишина не читаются и не упаковываются.
+    :return: Количество упакованных записей.
+    """
+    blob_path, index_path = corpus_paths(prefix)
+    offsets, lengths, ids, texts = [], [], [], []
+    position = 0
+
+    with open(csv_file, 'r', encoding='utf-8') as f, open(blob_path, 'wb') as blob:
+        for row in csv.reader(f):
+            audio_path, text = row[0], row[1]
+            try:
+                if speech_index is not None:
+                    audio, sr = speech_index.read(audio_path, dtype='int16')
+                else:
+                    audio, sr = sf.read(audio_path, dtype='int16', always_2d=True)
+                    audio = audio.mean(axis=1).astype(np.int16) if audio.shape[1] > 1 else audio[:, 0]
+            except Exception as e:
+                print(f"Ошибка чтения файла {audio_path}: {e}")
+                continue
+            if sr != sample_rate:
+                print(f"Пропуск файла {audio_path}: частота {sr} Гц вместо {sample_rate} Гц")
+                continue
+            if not len(audio):
+                print(f"Пропуск файла {audio_path}: речь не найдена")
+                continue
+
+            blob.write(np.ascontiguousarray(audio).tobytes())
+            offsets.append(position)
+            lengths.append(len(audio))
+            ids.append(os.path.splitext(os.path.basename(audio_path))[0])
+            texts.append(text)
+            position += len(audio)
+
+    np.savez(
+        index_path,
+        offsets=np.asarray(offsets, dtype=np.int64),
+        lengths=np.asarray(lengths, dtype=np.int64),
+        ids=np.asarray(ids),
+        texts=np.asarray(texts),
+        sample_rate=np.int64(sample_rate),
+    )
+    print(f"Упаковано {len(offsets)} записей ({position / sample_rate / 3600:.2f} ч) в {blob_path}")
+    return len(offsets)
+
+
+class PackedCorpus:
+    """
+    Чтение упакованной выборки (см. pack_split).
+
+    Сэмплы отображаются в память через np.memmap, поэтому обращение к записи
+    по индексу или id возвращает срез без копирования, открытия файлов
+    и декодирования.
+
+    :param prefix: Префикс путей, переданный в pack_split.
+    """
+
+    def __init__(self, prefix):
+        blob_path, index_path = corpus_paths(prefix)
+        index = np.load(index_path)
+        self.offsets = index['offsets']
+        self.lengths = index['lengths']
+        self.ids = index['ids']
+        self.texts = index['texts']
+        self.sample_rate = int(index['sample_rate'])
+        self.samples = np.memmap(blob_path, dtype=np.int16, mode='r')
+        self._id_to_index = {str(clip_id): i for i, clip_id in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.offsets)
+
+    # Сэмплы записи int16 (срез memmap)
+    def __getitem__(self, i):
+        start = self.offsets[i]
+        return self.samples[start:start + self.lengths[i]]
+
+    def index_of(self, clip_id):
+        return self._id_to_index[clip_id]
+
+    # Запись и её текст по id
+    def get(self, clip_id):
+        i = self.index_of(clip_id)
+        return self[i], str(self.texts[i])
+
+    # Запись в float32 в диапазоне [-1, 1), как при загрузке через librosa
+    def as_float(self, i):
+        return self[i].astype(np.float32) / 32768.0
+
+    def iter_epoch(self, shuffle=True, seed=None):
+        """Генератор (сэмплы, текст) по всей выборке в случайном или исходном порядке."""
+        order = np.arange(len(self))
+        if shuffle:
+            np.random.default_rng(seed).shuffle(order)
+        for i in order:
+            yield self[i], str(self.texts[i])
@@ -1,42 +1,64 @@
-import json
 import os
 import csv
-import librosa
-import soundfile as sf
 import time
 import psutil
-from sklearn.model_selection import train_test_split
-import shutil
 
-# Функция для конвертации MP3 или других файлов в WAV формат (16 кГц, моно)
-def convert_to_wav(input_dir, output_dir):
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+from manifest import MANIFEST_NAME, ConversionManifest, print_plan_summary
+
+# Имя сконвертированного файла: MP3 сохраняются как WAV с тем же именем
+def converted_name(file_name):
+    return file_name.replace('.mp3', '.wav')
 
+# Функция для конвертации MP3 или других файлов в WAV формат (16 кГц, моно)
+# Уже сконвертированные и не изменившиеся файлы пропускаются по манифесту (manifest.py);
+# при dry_run=True только выводится сводка предстоящей работы
+def convert_to_wav(input_dir, output_dir, target_sr=16000, dry_run=False, workers=None, quality='balanced'):
+    jobs = []
     for root, _, files in os.walk(input_dir):
         for file_name in files:
             if file_name.endswith('.mp3') or file_name.endswith('.wav'):
                 file_path = os.path.join(root, file_name)
-                output_path = os.path.join(output_dir, file_name.replace('.mp3', '.wav'))
+                output_path = os.path.join(output_dir, converted_name(file_name))
+                jobs.append((file_path, output_path))
+
+    manifest = ConversionManifest(os.path.join(output_dir, MANIFEST_NAME))
+    plan = manifest.plan(jobs, target_sr)
+    print_plan_summary(plan, title=f"{input_dir}: ")
+    if dry_run:
+        return plan
 
-                try:
-                    # Загружаем аудиофайл с помощью librosa
-                    audio, sr = librosa.load(file_path, sr=16000, mono=True)  # Приводим к 16 кГц и моно
-                    sf.write(output_path, audio, 16000)  # Сохраняем файл в WAV формате
-                    print(f"Конвертирован {file_path} в {output_path}")
-                except Exception as e:
-                    print(f"Ошибка при конвертации файла {file_path}: {e}")
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    manifest.remove_orphans(plan['orphans'])
+    from converter import convert_files  # librosa/soundfile загружаются только при конвертации
+    # Конвертация в пуле процессов (converter.py): 16 кГц, моно, PCM_16
+    results = convert_files(plan['new'] + plan['stale'], target_sr=target_sr, workers=workers, quality=quality)
+    for (file_path, output_path), _, error in results:
+        if error is None:
+            manifest.record(file_path, output_path, target_sr)
+    manifest.save()
+    return plan
 
 # Функция для создания CSV файла из JSON аннотаций, исключая шумы
-def create_csv_from_json(json_path, audio_base_dir, csv_file, noise_dir=None):
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+# store - общее хранилище аннотаций (annotations.py); без него разбирается только json_path.
+# Наличие файлов проверяется по описи папки (inventory.py), без обращения к диску на каждую запись.
+# audio_base_dir - папка сконвертированных файлов, поэтому записи .mp3 из аннотации ищутся как .wav.
+# Возвращает количество строк CSV
+def create_csv_from_json(json_path, audio_base_dir, csv_file, noise_dir=None, store=None):
+    from annotations import load_annotations
+    from inventory import AudioInventory
+
+    dataset = os.path.splitext(os.path.basename(json_path))[0]
+    if store is None:
+        store = load_annotations(os.path.dirname(json_path), snapshot_path=False, datasets=[dataset])
+    inventory = AudioInventory(audio_base_dir)
+    written = missing = 0
 
     with open(csv_file, mode='w', newline='', encoding='utf-8') as csvfile:
         writer = csv.writer(csvfile)
         
-        for entry in data:
-            audio_file = entry['audio_filepath']
+        for entry in store.records(dataset):
+            audio_file = converted_name(entry['audio_filepath'])
             transcription = entry['text']
 
             # Полный путь к аудиофайлу
@@ -48,13 +70,19 @@ def create_csv_from_json(json_path, audio_base_dir, csv_file, noise_dir=None):
                 continue
 
             # Проверяем наличие аудиофайла
-            if os.path.exists(audio_path):
+            if audio_file in inventory:
                 writer.writerow([audio_path, transcription])
+                written += 1
             else:
                 print(f"Файл не найден: {audio_path}")
+                missing += 1
+    if missing:
+        print(f"{dataset}: пропущено {missing} записей без аудио в {audio_base_dir} (в описи {len(inventory)} файлов)")
+    return written
 
 # Функция для обработки папки luga с учетом структуры
-def process_luga(luga_dir, output_dir, noise_dir):
+# workers, quality - процессы и качество ресемплинга, как у convert_to_wav
+def process_luga(luga_dir, output_dir, noise_dir, dry_run=False, workers=None, quality='balanced'):
     # Обрабатываем каждую датированную папку
     for folder in os.listdir(luga_dir):
         folder_path = os.path.join(luga_dir, folder)
@@ -65,28 +93,15 @@ def process_luga(luga_dir, output_dir, noise_dir):
         
         output_folder = os.path.join(output_dir, folder)
         print(f"Конвертация аудио для папки {folder}")
-        convert_to_wav(folder_path, output_folder)
+        convert_to_wav(folder_path, output_folder, dry_run=dry_run, workers=workers, quality=quality)
 
 # Разделение данных на обучающую, валидационную и тестовую выборки
-def split_data(csv_file, train_csv, dev_csv, test_csv, test_size=0.2, dev_size=0.1):
-    with open(csv_file, 'r', encoding='utf-8') as f:
-        data = [row for row in csv.reader(f)]
-    
-    train_data, test_data = train_test_split(data, test_size=test_size)
-    train_data, dev_data = train_test_split(train_data, test_size=dev_size)
-    
-    # Сохраняем результаты
-    with open(train_csv, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerows(train_data)
-    
-    with open(dev_csv, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerows(dev_data)
-    
-    with open(test_csv, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerows(test_data)
+# Детерминированно по хешу id записи (или группы: group_by='speaker'/'date'), за один проход (splits.py)
+def split_data(csv_file, train_csv, dev_csv, test_csv, test_size=0.2, dev_size=0.1, group_by=None, store=None):
+    from splits import split_csv
+
+    return split_csv(csv_file, (train_csv, dev_csv, test_csv), test_size=test_size, dev_size=dev_size,
+                     group_by=group_by, store=store)
 
 # Метрика времени выполнения и использования памяти
 def get_performance_metrics():
@@ -95,52 +110,116 @@ def get_performance_metrics():
     cpu_time = time.process_time()  # Время CPU
     return mem, cpu_time
 
-# Пути к папкам с аннотациями и аудиофайлами
-annotations_dir = "/Users/daniil/Хакатоны/ЦП СВФО/Data-work/data/ржд 1/ESC_DATASET_v1.2/annotation"
-audio_dirs = {
-    'hr_bot_clear.json': "/Users/daniil/Хакатоны/ЦП СВФО/Data-work/data/ржд 1/ESC_DATASET_v1.2/hr_bot_clearr",
-    'hr_bot_noise.json': "/Users/daniil/Хакатоны/ЦП СВФО/Data-work/data/ржд 1/ESC_DATASET_v1.2/hr_bot_noise",
-    'hr_bot_synt.json': "/Users/daniil/Хакатоны/ЦП СВФО/Data-work/data/ржд 1/ESC_DATASET_v1.2/hr_bot_synt",
-    'luga.json': "/Users/daniil/Хакатоны/ЦП СВФО/Data-work/data/ржд 1/ESC_DATASET_v1.2/luga"
-}
-
-# Папка с шумами
-noise_dir = "/path/to/ESC_DATASET_v1.2/luga/noise"
-
-# Папка для сохранения конвертированных файлов
-output_dirs = {
-    'hr_bot_clear.json': "/Users/daniil/Хакатоны/ЦП СВФО/Data-work/dataset_Coqui/dataset/hr_bot_clear_converted",
-    'hr_bot_noise.json': "/Users/daniil/Хакатоны/ЦП СВФО/Data-work/dataset_Coqui/dataset/hr_bot_noise_converted",
-    'hr_bot_synt.json': "/Users/daniil/Хакатоны/ЦП СВФО/Data-work/dataset_Coqui/dataset/hr_bot_synt_converted",
-    'luga.json': "/Users/daniil/Хакатоны/ЦП СВФО/Data-work/dataset_Coqui/dataset/luga_converted"
+# Папки наборов данных: имя файла аннотаций -> подпапка ESC_DATASET_v1.2
+DATASETS = {
+    'hr_bot_clear.json': 'hr_bot_clear',
+    'hr_bot_noise.json': 'hr_bot_noise',
+    'hr_bot_synt.json': 'hr_bot_synt',
+    'luga.json': 'luga',
 }
+# Чистые наборы, в которые шум подмешивается на лету, и заранее зашумлённая копия
+CLEAN_DATASETS = ['hr_bot_clear.json', 'hr_bot_synt.json']
+NOISY_DATASETS = ['hr_bot_noise.json']
+
+
+def main(base_dir="/Users/daniil/Хакатоны/ЦП СВФО/Data-work/data/ржд 1/ESC_DATASET_v1.2",
+         output_root="/Users/daniil/Хакатоны/ЦП СВФО/Data-work/dataset_Coqui/dataset",
+         csv_dir='.', dry_run=False, workers=None, quality='balanced', trim_silence=True, augment=True):
+    """
+    Полная подготовка датасета: конвертация, CSV, признаки, разбиение и упаковка.
+
+    :param base_dir: Папка ESC_DATASET_v1.2 (annotation/, hr_bot_*/, luga/).
+    :param output_root: Папка для сконвертированных файлов и хранилища признаков.
+    :param csv_dir: Папка для CSV файлов и упакованных выборок.
+    :param dry_run: Только вывести сводку предстоящей конвертации.
+    :param trim_silence: Строить индекс речи (vad.py) и не читать начальную и конечную тишину
+                         при расчёте признаков и упаковке выборок.
+    :param augment: Шум подмешивается на лету (augment.py): вместо конвертации зашумлённой
+                    копии hr_bot_noise упаковываются записи luga/noise и чистые hr_bot_clear, hr_bot_synt.
+    """
+    # Модули с тяжёлыми зависимостями загружаются только при запуске
+    from annotations import SNAPSHOT_NAME, load_annotations
+    from corpus import pack_split
+    from feature_store import build_feature_store
+    from vad import SpeechIndex, build_speech_index
+
+    annotations_dir = os.path.join(base_dir, 'annotation')
+    # Папка с шумами
+    noise_dir = os.path.join(base_dir, 'luga', 'noise')
+    # Папка хранилища признаков
+    feature_store_dir = os.path.join(output_root, 'features')
+    os.makedirs(csv_dir, exist_ok=True)
+    os.makedirs(output_root, exist_ok=True)
+    # Аннотации всех наборов читаются один раз (из снимка в output_root, если JSON не менялись)
+    store = load_annotations(annotations_dir, snapshot_path=os.path.join(output_root, SNAPSHOT_NAME))
+
+    # Создаем CSV файлы и конвертируем аудиофайлы
+    output_dirs = {}
+    for json_file, folder in DATASETS.items():
+        if augment and json_file in NOISY_DATASETS:
+            print(f"Пропуск {json_file}: шум подмешивается при обучении (augment.py)")
+            continue
+        json_path = os.path.join(annotations_dir, json_file)
+        audio_dir = os.path.join(base_dir, folder)
+        output_dir = output_dirs[json_file] = os.path.join(output_root, f'{folder}_converted')
+        output_csv = os.path.join(csv_dir, json_file.replace('.json', '.csv'))
+
+        # Конвертируем файлы в WAV
+        if json_file == 'luga.json':
+            print(f"Обработка папки luga")
+            process_luga(audio_dir, output_dir, noise_dir, dry_run=dry_run, workers=workers, quality=quality)
+        else:
+            print(f"Конвертация аудио для {json_file}")
+            convert_to_wav(audio_dir, output_dir, dry_run=dry_run, workers=workers, quality=quality)
+        if dry_run:
+            continue
 
-# Создаем CSV файлы и конвертируем аудиофайлы
-for json_file in audio_dirs.keys():
-    json_path = os.path.join(annotations_dir, json_file)
-    audio_dir = audio_dirs[json_file]
-    output_dir = output_dirs[json_file]
-    output_csv = json_file.replace('.json', '.csv')
-
-    # Конвертируем файлы в WAV
-    if json_file == 'luga.json':
-        print(f"Обработка папки luga")
-        process_luga(audio_dir, output_dir, noise_dir)
-    else:
-        print(f"Конвертация аудио для {json_file}")
-        convert_to_wav(audio_dir, output_dir)
-
-    # Создаем CSV файлы, игнорируя шумы
-    if json_file == 'luga.json':
-        create_csv_from_json(json_path, output_dir, output_csv, noise_dir=noise_dir)
-    else:
-        create_csv_from_json(json_path, output_dir, output_csv)
-    
-    print(f"CSV файл для {json_file} создан: {output_csv}")
-
-# Разделение на обучающую, валидационную и тестовую выборки
-split_data('luga.csv', 'train.csv', 'dev.csv', 'test.csv')
-
-# Печать метрик
-memory, cpu_time = get_performance_metrics()
-print(f"Использование памяти: {memory:.2f} МБ, Время CPU: {cpu_time:.2f} секунд")
+        # Создаем CSV файлы, игнорируя шумы
+        if json_file == 'luga.json':
+            rows = create_csv_from_json(json_path, output_dir, output_csv, noise_dir=noise_dir, store=store)
+        else:
+            rows = create_csv_from_json(json_path, output_dir, output_csv, store=store)
+        
+        print(f"CSV файл для {json_file} создан: {output_csv} ({rows} записей)")
+    if dry_run:
+        return
+
+    # Расчёт лог-мел признаков по манифестам сконвертированных папок (feature_store.py)
+    manifest_paths = [
+        os.path.join(root, MANIFEST_NAME)
+        for output_dir in output_dirs.values()
+        for root, _, files in os.walk(output_dir)
+        if MANIFEST_NAME in files
+    ]
+    # Индекс речевых участков рядом с каждым манифестом (vad.py), пересчитываются только новые файлы
+    speech_index = None
+    if trim_silence:
+        speech_index = SpeechIndex([build_speech_index(path, workers=workers) for path in manifest_paths])
+    build_feature_store(manifest_paths, feature_store_dir, params={'trim_silence': trim_silence})
+
+    # Разделение на обучающую, валидационную и тестовую выборки
+    split_paths = {split: os.path.join(csv_dir, f'{split}.csv') for split in ('train', 'dev', 'test')}
+    split_data(os.path.join(csv_dir, 'luga.csv'), split_paths['train'], split_paths['dev'], split_paths['test'])
+
+    # Упаковка выборок в сплошные файлы int16 с индексом для чтения через memmap (corpus.py)
+    for split, split_csv in split_paths.items():
+        if not pack_split(split_csv, os.path.join(csv_dir, split), speech_index=speech_index):
+            raise RuntimeError(f"В выборке {split} не упаковано ни одной записи: проверьте {split_csv}")
+
+    # Чистые записи и шум для загрузчика с подмешиванием шума на лету (augment.py)
+    if augment:
+        from augment import pack_noise
+        for json_file in CLEAN_DATASETS:
+            clean_csv = os.path.join(csv_dir, json_file.replace('.json', '.csv'))
+            # Пустой чистый набор - почти всегда ошибка путей, обучение без него молча теряет данные
+            if not pack_split(clean_csv, os.path.join(csv_dir, DATASETS[json_file]), speech_index=speech_index):
+                raise RuntimeError(f"В наборе {json_file} не упаковано ни одной записи: проверьте {clean_csv}")
+        pack_noise(noise_dir, os.path.join(csv_dir, 'noise'))
+
+    # Печать метрик
+    memory, cpu_time = get_performance_metrics()
+    print(f"Использование памяти: {memory:.2f} МБ, Время CPU: {cpu_time:.2f} секунд")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+
+import librosa
+import numpy as np
+import soundfile as sf
+
+from manifest import ConversionManifest
+from vad import VAD_PARAMS, SpeechIndex, speech_index_path
+
+# Версия формата хранилища: увеличивать при изменении способа расчёта признаков
+FEATURE_STORE_VERSION = 1
+
+# Параметры признаков по умолчанию (16 кГц: окно 25 мс, шаг 10 мс)
+DEFAULT_PARAMS = {
+    'sample_rate': 16000,
+    'n_fft': 400,
+    'hop_length': 160,
+    'n_mels': 80,
+    'n_mfcc': 0,  # 0 - MFCC не сохраняются
+    'trim_silence': False,  # True - только от первого до последнего речевого участка (vad.py)
+}
+
+
+# Ключ хранилища по параметрам: разные параметры - разные папки.
+# При обрезке тишины в ключ входят и параметры детектора речи: другие участки - другие признаки
+def params_key(params):
+    payload = {'version': FEATURE_STORE_VERSION, **params}
+    if params.get('trim_silence'):
+        payload['vad'] = VAD_PARAMS
+    payload = json.dumps(payload, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+
+# Лог-мел спектр (и при необходимости MFCC) одной записи, кадры по строкам
+def compute_features(audio, params):
+    mel = librosa.feature.melspectrogram(
+        y=audio,
+        sr=params['sample_rate'],
+        n_fft=params['n_fft'],
+        hop_length=params['hop_length'],
+        n_mels=params['n_mels'],
+    )
+    log_mel = librosa.power_to_db(mel)
+    mfcc = None
+    if params['n_mfcc']:
+        mfcc = librosa.feature.mfcc(S=log_mel, n_mfcc=params['n_mfcc']).T.astype(np.float16)
+    return log_mel.T.astype(np.float16), mfcc
+
+
+# Записи всех манифестов конвертации: (id, путь к WAV, хеш исходника)
+def manifest_clips(manifest_paths):
+    clips = []
+    for manifest_path in manifest_paths:
+        for source, entry in sorted(ConversionManifest(manifest_path).entries.items()):
+            clip_id = os.path.splitext(os.path.basename(entry['output']))[0]
+            clips.append((clip_id, entry['output'], entry['digest']))
+    return clips
+
+
+def build_feature_store(manifest_paths, store_root, params=None):
+    """
+    Рассчитывает признаки для всех записей из манифестов конвертации.
+
+    Лог-мел кадры всех записей пишутся подряд в один файл float16
+    ({store_dir}/log_mel.f16), в index.npz хранятся смещение и число кадров
+    каждой записи, её id и хеш исходника из манифеста. Папка хранилища
+    определяется параметрами признаков; если хранилище с такими параметрами
+    уже построено по тем же исходникам, пересчёт не выполняется.
+    С trim_silence=True читаются только участки между началом и концом
+    речи по индексам vad.py рядом с манифестами (файлы без индекса - целиком).
+    Записи без речи и записи, которые не удалось прочитать, пропускаются;
+    хранилище с ошибками чтения при следующем запуске строится заново.
+
+    :param manifest_paths: Пути к манифестам (manifest.py) сконвертированных папок.
+    :param store_root: Корневая папка хранилищ признаков.
+    :param params: Параметры признаков (по умолчанию DEFAULT_PARAMS).
+    :return: Путь к папке хранилища.
+    """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    store_dir = os.path.join(store_root, params_key(params))
+    clips = manifest_clips(manifest_paths)
+    digests = np.asarray([digest for _, _, digest in clips])
+
+    index_path = os.path.join(store_dir, 'index.npz')
+    if os.path.exists(index_path):
+        with np.load(index_path) as index:
+            # Хранилище с ошибками чтения строится заново: ошибки могли быть временными
+            failed = int(index['failed']) if 'failed' in index else 0
+            if np.array_equal(index['digests'], digests) and not failed:
+                print(f"Хранилище признаков {store_dir} актуально")
+                return store_dir
+
+    os.makedirs(store_dir, exist_ok=True)
+    if os.path.exists(index_path):
+        os.remove(index_path)
+    speech_index = None
+    if params['trim_silence']:
+        speech_index = SpeechIndex([
+            speech_index_path(path) for path in manifest_paths if os.path.exists(speech_index_path(path))
+        ])
+    offsets, n_frames, ids = [], [], []
+    position = failed = empty = 0
+    mfcc_file = open(os.path.join(store_dir, 'mfcc.f16'), 'wb') if params['n_mfcc'] else None
+    with open(os.path.join(store_dir, 'log_mel.f16'), 'wb') as log_mel_file:
+        for clip_id, wav_path, _ in clips:
+            # Ошибка одной записи не останавливает расчёт: запись пропускается, как в pack_split
+            try:
+                if speech_index is not None:
+                    audio, sr = speech_index.read(wav_path)
+                else:
+                    audio, sr = sf.read(wav_path, dtype='float32', always_2d=True)
+                    audio = audio.mean(axis=1)
+                if not len(audio):
+                    print(f"Пропуск файла {wav_path}: речь не найдена")
+                    empty += 1
+                    continue
+                if sr != params['sample_rate']:
+                    audio = librosa.resample(audio, orig_sr=sr, target_sr=params['sample_rate'])
+                log_mel, mfcc = compute_features(audio, params)
+            except Exception as e:
+                print(f"Ошибка расчёта признаков {wav_path}: {e}")
+                failed += 1
+                continue
+            log_mel_file.write(log_mel.tobytes())
+            if mfcc_file is not None:
+                mfcc_file.write(mfcc.tobytes())
+            offsets.append(position)
+            n_frames.append(len(log_mel))
+            ids.append(clip_id)
+            position += len(log_mel)
+    if mfcc_file is not None:
+        mfcc_file.close()
+
+    with open(os.path.join(store_dir, 'params.json'), 'w', encoding='utf-8') as f:
+        json.dump({'version': FEATURE_STORE_VERSION, **params, **({'vad': VAD_PARAMS} if params['trim_silence'] else {})},
+                  f, indent=1)
+    # Индекс пишется последним: его наличие означает, что хранилище построено полностью
+    np.savez(
+        index_path,
+        offsets=np.asarray(offsets, dtype=np.int64),
+        n_frames=np.asarray(n_frames, dtype=np.int64),
+        ids=np.asarray(ids),
+        digests=digests,
+        failed=np.int64(failed),
+    )
+    print(f"Рассчитаны признаки для {len(ids)} записей ({position} кадров) в {store_dir}")
+    if failed or empty:
+        print(f"Пропущено записей: {failed} с ошибками, {empty} без речи")
+    return store_dir
+
+
+class FeatureStore:
+    """
+    Чтение хранилища признаков (см. build_feature_store).
+
+    Файлы признаков отображаются в память, выборка признаков записи по id
+    или номеру - срез memmap без копирования и без пересчёта.
+
+    :param store_dir: Папка хранилища.
+    """
+
+    def __init__(self, store_dir):
+        with open(os.path.join(store_dir, 'params.json'), 'r', encoding='utf-8') as f:
+            self.params = json.load(f)
+        index = np.load(os.path.join(store_dir, 'index.npz'))
+        self.offsets = index['offsets']
+        self.n_frames = index['n_frames']
+        self.ids = index['ids']
+        self._id_to_index = {str(clip_id): i for i, clip_id in enumerate(self.ids)}
+        self.log_mel = self._map(store_dir, 'log_mel.f16', self.params['n_mels'])
+        self.mfcc = None
+        if self.params['n_mfcc']:
+            self.mfcc = self._map(store_dir, 'mfcc.f16', self.params['n_mfcc'])
+
+    @staticmethod
+    def _map(store_dir, name, width):
+        path = os.path.join(store_dir, name)
+        if os.path.getsize(path) == 0:
+            return np.zeros((0, width), dtype=np.float16)
+        return np.memmap(path, dtype=np.float16, mode='r').reshape(-1, width)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def _slice(self, array, i):
+        start = self.offsets[i]
+        return array[start:start + self.n_frames[i]]
+
+    # Лог-мел кадры записи [кадры, n_mels] по номеру или id
+    def get(self, key):
+        i = self._id_to_index[key] if isinstance(key, str) else key
+        return self._slice(self.log_mel, i)
+
+    def get_mfcc(self, key):
+        if self.mfcc is None:
+            raise ValueError("MFCC не сохранялись (n_mfcc=0)")
+        i = self._id_to_index[key] if isinstance(key, str) else key
+        return self._slice(self.mfcc, i)
@@ -0,0 +1,116 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import librosa
+import soundfile as sf
+
+# Расширения аудиофайлов набора данных
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.flac', '.ogg')
+# Потоков для чтения заголовков: работа упирается в диск, а не в процессор
+PROBE_WORKERS = 16
+
+
+def scan_tree(root, extensions=AUDIO_EXTENSIONS):
+    """
+    Один проход по папке через os.scandir.
+
+    :return: Словарь относительный путь ('папка/файл.wav', через '/') -> размер файла.
+    """
+    files = {}
+    stack = [('', root)]
+    while stack:
+        prefix, directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((prefix + entry.name + '/', entry.path))
+                    elif entry.name.lower().endswith(extensions):
+                        files[prefix + entry.name] = entry.stat().st_size
+        except OSError as e:
+            print(f"Ошибка чтения папки {directory}: {e}")
+    return files
+
+
+# Заголовок одного файла: длительность, частота, каналы (без декодирования сэмплов).
+# Если soundfile не читает формат (например, MP3 на libsndfile без его поддержки),
+# файл декодируется через librosa, как при прежнем расчёте длительности
+def probe_header(path):
+    try:
+        info = sf.info(path)
+    except Exception:
+        return decode_header(path)
+    duration = info.frames / info.samplerate if info.samplerate else 0.0
+    return {'duration': duration, 'sample_rate': info.samplerate, 'channels': info.channels,
+            'frames': info.frames}, None
+
+
+# Те же сведения по декодированному сигналу (медленно, только когда заголовок не прочитан)
+def decode_header(path):
+    try:
+        y, sample_rate = librosa.load(path, sr=None, mono=False)
+    except Exception as e:
+        # Ошибки audioread бывают без текста
+        return None, str(e) or repr(e)
+    frames = y.shape[-1]
+    return {'duration': frames / sample_rate, 'sample_rate': sample_rate, 'channels': 1 if y.ndim == 1 else y.shape[0],
+            'frames': frames}, None
+
+
+class AudioInventory:
+    """
+    Опись аудиофайлов папки набора данных.
+
+    Папка сканируется один раз (scan_tree), после чего проверка наличия
+    файла - поиск в словаре без обращения к диску. Длительность, частота
+    и число каналов читаются из заголовков (soundfile.info) в пуле потоков
+    и запоминаются, поэтому повторные запросы не читают файлы.
+
+    :param root: Корневая папка (например, ESC_DATASET_v1.2/luga).
+    :param workers: Количество потоков чтения заголовков.
+    """
+
+    def __init__(self, root, workers=PROBE_WORKERS):
+        self.root = root
+        self.workers = workers
+        self.files = scan_tree(root)
+        self._headers = {}
+
+    def __len__(self):
+        return len(self.files)
+
+    def __iter__(self):
+        return iter(self.files)
+
+    # Относительный путь к файлу ('папка/файл.wav'); пути вне root возвращаются как есть
+    def relative(self, path):
+        if os.path.isabs(path) or path.startswith(self.root):
+            path = os.path.relpath(path, self.root)
+        return path.replace(os.sep, '/')
+
+    def __contains__(self, path):
+        return self.relative(path) in self.files
+
+    def probe(self, paths=None):
+        """
+        Заголовки файлов (по умолчанию - всех найденных при сканировании).
+
+        :param paths: Пути относительно root или полные пути внутри root; отсутствующие пропускаются.
+        :return: Словарь относительный путь -> {'duration', 'sample_rate', 'channels', 'frames'}
+                 (None, если заголовок не прочитан).
+        """
+        relative = list(self.files) if paths is None else [self.relative(path) for path in paths]
+        relative = [path for path in relative if path in self.files]
+        todo = [path for path in dict.fromkeys(relative) if path not in self._headers]
+        if todo:
+            full_paths = [os.path.join(self.root, *path.split('/')) for path in todo]
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(todo))) as executor:
+                for path, (header, error) in zip(todo, executor.map(probe_header, full_paths)):
+                    if error is not None:
+                        print(f"Ошибка чтения заголовка {path}: {error}")
+                    self._headers[path] = header
+        return {path: self._headers[path] for path in relative}
+
+    # Заголовок одного файла (None - файла нет или заголовок не прочитан)
+    def header(self, path):
+        return self.probe([path]).get(self.relative(path))
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+
+# Имя файла манифеста в папке с результатами конвертации
+MANIFEST_NAME = 'conversion_manifest.json'
+
+
+# Хеш содержимого файла (читаем блоками по 1 МБ)
+def file_digest(path):
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ConversionManifest:
+    """
+    Манифест конвертации: для каждого исходного файла хранит путь, размер,
+    mtime, хеш содержимого, целевую частоту и путь к результату.
+
+    По манифесту определяется, какие файлы нужно конвертировать (новые,
+    изменённые, с пропавшим результатом или другой частотой), какие можно
+    пропустить, и какие результаты остались без исходников.
+
+    :param path: Путь к JSON-файлу манифеста.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    # Исходный файл уже сконвертирован с теми же параметрами и не менялся
+    def is_up_to_date(self, source, output, target_sr):
+        entry = self.entries.get(source)
+        if entry is None or entry['output'] != output or entry['target_sr'] != target_sr:
+            return False
+        if not os.path.exists(output):
+            return False
+        stat = os.stat(source)
+        if stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime_ns']:
+            return True
+        # Файл мог быть перезаписан без изменений (например, скопирован заново)
+        if stat.st_size == entry['size'] and file_digest(source) == entry['digest']:
+            entry['mtime_ns'] = stat.st_mtime_ns
+            return True
+        return False
+
+    def plan(self, jobs, target_sr):
+        """
+        Разбивает задания конвертации на группы.
+
+        :param jobs: Список пар (исходный файл, файл результата).
+        :param target_sr: Целевая частота дискретизации.
+        :return: Словарь со списками 'new', 'stale', 'unchanged' (пары путей)
+                 и 'orphans' (исходные файлы из манифеста, которых больше нет в jobs).
+        """
+        plan = {'new': [], 'stale': [], 'unchanged': [], 'orphans': []}
+        for source, output in jobs:
+            if source not in self.entries:
+                plan['new'].append((source, output))
+            elif self.is_up_to_date(source, output, target_sr):
+                plan['unchanged'].append((source, output))
+            else:
+                plan['stale'].append((source, output))
+        current = {source for source, _ in jobs}
+        plan['orphans'] = [source for source in self.entries if source not in current]
+        return plan
+
+    # Запись о выполненной конвертации
+    def record(self, source, output, target_sr):
+        # Если результат теперь пишется в другое место, старый файл больше не нужен
+        old = self.entries.get(source)
+        if old is not None and old['output'] != output and os.path.exists(old['output']):
+            os.remove(old['output'])
+        stat = os.stat(source)
+        self.entries[source] = {
+            'source': source,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'digest': file_digest(source),
+            'target_sr': target_sr,
+            'output': output,
+        }
+
+    # Удаление результатов, у которых больше нет исходного файла
+    def remove_orphans(self, orphans):
+        outputs_in_use = {entry['output'] for source, entry in self.entries.items() if source not in orphans}
+        for source in orphans:
+            output = self.entries.pop(source)['output']
+            if output not in outputs_in_use and os.path.exists(output):
+                os.remove(output)
+                print(f"Удалён устаревший файл {output}")
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+
+# Сводка плана конвертации (для пробного запуска)
+def print_plan_summary(plan, title=''):
+    to_convert = plan['new'] + plan['stale']
+    size_mb = sum(os.path.getsize(source) for source, _ in to_convert) / 1024 ** 2
+    print(
+        f"{title}Новых: {len(plan['new'])}, изменённых: {len(plan['stale'])}, "
+        f"без изменений: {len(plan['unchanged'])}, устаревших результатов: {len(plan['orphans'])}. "
+        f"К конвертации {len(to_convert)} файлов ({size_mb:.1f} МБ)"
+    )
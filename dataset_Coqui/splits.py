@@ -0,0 +1,116 @@
+import csv
+import hashlib
+import os
+import re
+
+# Выборки в порядке выходных файлов
+SPLITS = ('train', 'dev', 'test')
+# Способы группировки записей: все записи группы попадают в одну выборку
+GROUP_BY = ('speaker', 'date')
+
+# Дата записи luga: по имени файла (2023_11_21__09_54_58) или по папке (21_11_2023)
+_FILE_DATE = re.compile(r'^(\d{4})_(\d{2})_(\d{2})__')
+_FOLDER_DATE = re.compile(r'^(\d{2})_(\d{2})_(\d{4})$')
+
+
+# Равномерное число в [0, 1) по ключу: не зависит от запуска, порядка строк и других записей
+def stable_fraction(key, salt=''):
+    digest = hashlib.blake2b(f'{salt}{key}'.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') / 2.0 ** 64
+
+
+def assign_split(key, test_size=0.2, dev_size=0.1, salt=''):
+    """
+    Выборка для ключа записи или группы.
+
+    Доли как у train_test_split в прежнем split_data: test_size от всех
+    записей, dev_size - от оставшейся обучающей части.
+    """
+    fraction = stable_fraction(key, salt)
+    if fraction < test_size:
+        return 'test'
+    if fraction < test_size + (1.0 - test_size) * dev_size:
+        return 'dev'
+    return 'train'
+
+
+# Id записи по пути к аудио (имя файла без расширения, как в аннотациях)
+def clip_id(audio_path):
+    return os.path.splitext(os.path.basename(audio_path))[0]
+
+
+# Дата записи в виде ГГГГ-ММ-ДД или None
+def recording_date(audio_path):
+    match = _FILE_DATE.match(clip_id(audio_path))
+    if match:
+        return '-'.join(match.groups())
+    match = _FOLDER_DATE.match(os.path.basename(os.path.dirname(audio_path)))
+    if match:
+        day, month, year = match.groups()
+        return f'{year}-{month}-{day}'
+    return None
+
+
+def group_key(audio_path, group_by=None, store=None):
+    """
+    Ключ, по которому выбирается выборка записи.
+
+    group_by='speaker' - спикер из хранилища аннотаций (annotations.py),
+    group_by='date' - дата записи; записи без спикера или даты
+    распределяются по собственному id.
+    """
+    key = clip_id(audio_path)
+    if group_by == 'speaker':
+        row = store.row_by_id(key)
+        speaker = None if row is None else store.speaker_name(row)
+        return key if speaker is None else f'speaker:{speaker}'
+    if group_by == 'date':
+        date = recording_date(audio_path)
+        return key if date is None else f'date:{date}'
+    return key
+
+
+def split_csv(csv_file, output_paths, test_size=0.2, dev_size=0.1, group_by=None, store=None, salt=''):
+    """
+    Потоковое детерминированное разбиение CSV на train/dev/test.
+
+    Каждая строка (путь к WAV, текст) относится к выборке по хешу своего id
+    (или ключа группы), поэтому разбиение одинаково при каждом запуске,
+    а новые записи не меняют выборку уже существующих - производные
+    артефакты (признаки, упакованные выборки, кэши) остаются действительными.
+    CSV читается за один проход, строки сразу пишутся в три файла.
+
+    :param csv_file: Входной CSV.
+    :param output_paths: Словарь выборка -> путь или кортеж путей (train, dev, test).
+    :param group_by: None, 'speaker' или 'date' (см. group_key).
+    :param store: Хранилище аннотаций (annotations.py), нужно для group_by='speaker'.
+    :param salt: Строка, добавляемая к ключу: другая соль - другое разбиение.
+    :return: Словарь выборка -> количество строк.
+    """
+    if group_by is not None and group_by not in GROUP_BY:
+        raise ValueError(f"Неизвестная группировка: {group_by} (доступны: {', '.join(GROUP_BY)})")
+    if group_by == 'speaker' and store is None:
+        raise ValueError("Для группировки по спикерам нужно хранилище аннотаций (store)")
+    if not isinstance(output_paths, dict):
+        output_paths = dict(zip(SPLITS, output_paths))
+
+    counts = dict.fromkeys(SPLITS, 0)
+    files = {split: open(output_paths[split], 'w', newline='', encoding='utf-8') for split in SPLITS}
+    try:
+        writers = {split: csv.writer(f) for split, f in files.items()}
+        with open(csv_file, 'r', encoding='utf-8') as f:
+            for row in csv.reader(f):
+                if not row:
+                    continue
+                split = assign_split(group_key(row[0], group_by, store), test_size, dev_size, salt)
+                writers[split].writerow(row)
+                counts[split] += 1
+    finally:
+        for f in files.values():
+            f.close()
+
+    total = max(sum(counts.values()), 1)
+    print(f"Разбиение {csv_file}: " + ", ".join(
+        f"{split} {counts[split]} ({100.0 * counts[split] / total:.1f}%)" for split in SPLITS
+    ))
+    return counts
@@ -0,0 +1,261 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import soundfile as sf
+
+from manifest import ConversionManifest
+
+# Имя файла индекса речевых участков: лежит рядом с манифестом конвертации
+SPEECH_INDEX_NAME = 'speech_index.npz'
+
+# Параметры детектора по умолчанию
+FRAME_MS = 20.0
+MARGIN_DB = 10.0
+MIN_SPEECH_MS = 100.0
+MIN_SILENCE_MS = 300.0
+PAD_MS = 100.0
+# Параметры, с которыми строится индекс речи (build_speech_index): входят в ключи производных данных
+VAD_PARAMS = {
+    'frame_ms': FRAME_MS,
+    'margin_db': MARGIN_DB,
+    'min_speech_ms': MIN_SPEECH_MS,
+    'min_silence_ms': MIN_SILENCE_MS,
+    'pad_ms': PAD_MS,
+    'lowcut': 300.0,
+    'highcut': 3400.0,
+}
+# Кадров в одном блоке БПФ (ограничивает память на длинных записях)
+FRAMES_PER_BLOCK = 4096
+
+
+def frame_energy_db(y, sample_rate, frame_ms=FRAME_MS, lowcut=300.0, highcut=3400.0):
+    """
+    Энергия непересекающихся кадров в речевой полосе (дБ).
+
+    Кадры - окна по frame_ms без перекрытия; энергия считается по бинам
+    rfft между lowcut и highcut, поэтому низкочастотный гул и шипение
+    выше речевой полосы не поднимают уровень тишины.
+    """
+    frame = max(1, int(sample_rate * frame_ms / 1000.0))
+    n_frames = -(-len(y) // frame)
+    padded = np.zeros(n_frames * frame, dtype=np.float32)
+    padded[:len(y)] = y
+    frames = padded.reshape(n_frames, frame)
+    freqs = np.fft.rfftfreq(frame, 1.0 / sample_rate)
+    band = (freqs >= lowcut) & (freqs <= highcut)
+    window = np.hanning(frame).astype(np.float32)
+
+    energy = np.empty(n_frames)
+    for start in range(0, n_frames, FRAMES_PER_BLOCK):
+        block = np.fft.rfft(frames[start:start + FRAMES_PER_BLOCK] * window, axis=1)[:, band]
+        energy[start:start + len(block)] = (block.real ** 2 + block.imag ** 2).sum(axis=1) / frame
+    return 10.0 * np.log10(energy + 1e-12)
+
+
+def detect_speech(y, sample_rate, frame_ms=FRAME_MS, margin_db=MARGIN_DB, min_speech_ms=MIN_SPEECH_MS,
+                  min_silence_ms=MIN_SILENCE_MS, pad_ms=PAD_MS, energy_db=None):
+    """
+    Речевые участки записи по энергии кадров.
+
+    Порог - уровень шума (10-й перцентиль энергии кадров) плюс margin_db.
+    Паузы короче min_silence_ms склеиваются, участки короче min_speech_ms
+    отбрасываются, оставшиеся расширяются на pad_ms с каждой стороны.
+
+    :param energy_db: Уже посчитанная энергия кадров (frame_energy_db с тем же frame_ms).
+    :return: Массив int64 [участки, 2] с началом и концом (не включая) в сэмплах.
+    """
+    frame = max(1, int(sample_rate * frame_ms / 1000.0))
+    if energy_db is None:
+        energy_db = frame_energy_db(y, sample_rate, frame_ms)
+    if not len(energy_db):
+        return np.zeros((0, 2), dtype=np.int64)
+    active = energy_db > np.percentile(energy_db, 10) + margin_db
+
+    # Границы серий активных кадров
+    edges = np.diff(np.concatenate([[0], active.astype(np.int8), [0]]))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    # Склейка коротких пауз и отбрасывание коротких участков
+    if len(starts) > 1:
+        long_gap = (starts[1:] - ends[:-1]) * frame_ms >= min_silence_ms
+        starts = starts[np.concatenate([[True], long_gap])]
+        ends = ends[np.concatenate([long_gap, [True]])]
+    long_speech = (ends - starts) * frame_ms >= min_speech_ms
+    starts, ends = starts[long_speech], ends[long_speech]
+
+    pad = int(sample_rate * pad_ms / 1000.0)
+    spans = np.stack([
+        np.maximum(starts * frame - pad, 0),
+        np.minimum(ends * frame + pad, len(y)),
+    ], axis=1).astype(np.int64)
+    # После расширения соседние участки могут пересечься
+    if len(spans) > 1:
+        separate = spans[1:, 0] > spans[:-1, 1]
+        spans = np.stack([
+            spans[np.concatenate([[True], separate]), 0],
+            spans[np.concatenate([separate, [True]]), 1],
+        ], axis=1)
+    return spans
+
+
+def speech_index_path(manifest_path):
+    return os.path.join(os.path.dirname(manifest_path), SPEECH_INDEX_NAME)
+
+
+# Задача для пула: речевые участки одного файла
+def _detect_job(path):
+    try:
+        audio, sr = sf.read(path, dtype='float32', always_2d=True)
+        audio = audio.mean(axis=1) if audio.shape[1] > 1 else audio[:, 0]
+        return path, (sr, len(audio), detect_speech(audio, sr)), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def _load_entries(index_path):
+    entries = {}
+    if not os.path.exists(index_path):
+        return entries
+    with np.load(index_path) as index:
+        offsets = index['offsets']
+        for i, path in enumerate(index['paths']):
+            entries[str(path)] = (
+                int(index['sizes'][i]), int(index['mtimes_ns'][i]), int(index['sample_rates'][i]),
+                int(index['lengths'][i]), index['spans'][offsets[i]:offsets[i + 1]],
+            )
+    return entries
+
+
+def _save_entries(index_path, entries):
+    paths = sorted(entries)
+    spans = [entries[path][4] for path in paths]
+    offsets = np.concatenate([[0], np.cumsum([len(s) for s in spans])]).astype(np.int64)
+    tmp_path = index_path + '.tmp.npz'
+    np.savez(
+        tmp_path,
+        paths=np.asarray(paths),
+        sizes=np.asarray([entries[path][0] for path in paths], dtype=np.int64),
+        mtimes_ns=np.asarray([entries[path][1] for path in paths], dtype=np.int64),
+        sample_rates=np.asarray([entries[path][2] for path in paths], dtype=np.int64),
+        lengths=np.asarray([entries[path][3] for path in paths], dtype=np.int64),
+        offsets=offsets,
+        spans=np.concatenate(spans) if spans else np.zeros((0, 2), dtype=np.int64),
+    )
+    os.replace(tmp_path, index_path)
+
+
+def build_speech_index(manifest_path, workers=None, chunksize=None):
+    """
+    Строит индекс речевых участков для всех сконвертированных файлов манифеста.
+
+    Индекс ({папка манифеста}/speech_index.npz) хранит для каждого WAV его
+    размер и mtime, частоту, длину и речевые участки в сэмплах. При повторном
+    запуске детектор запускается только для новых и изменившихся файлов,
+    записи удалённых файлов убираются.
+
+    :param manifest_path: Путь к манифесту конвертации (manifest.py).
+    :param workers: Количество процессов (по умолчанию - по числу ядер).
+    :return: Путь к индексу.
+    """
+    index_path = speech_index_path(manifest_path)
+    outputs = sorted({entry['output'] for entry in ConversionManifest(manifest_path).entries.values()})
+    old_entries = _load_entries(index_path)
+
+    entries, todo = {}, []
+    for path in outputs:
+        if not os.path.exists(path):
+            continue
+        stat = os.stat(path)
+        old = old_entries.get(path)
+        if old is not None and old[0] == stat.st_size and old[1] == stat.st_mtime_ns:
+            entries[path] = old
+        else:
+            todo.append(path)
+
+    start_time = time.time()
+    if todo:
+        workers = min(workers or os.cpu_count() or 1, len(todo))
+        if workers == 1:
+            results = [_detect_job(path) for path in todo]
+        else:
+            if chunksize is None:
+                chunksize = max(1, len(todo) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_detect_job, todo, chunksize=chunksize))
+        for path, result, error in results:
+            if error is not None:
+                print(f"Ошибка при поиске речи в файле {path}: {error}")
+                continue
+            stat = os.stat(path)
+            entries[path] = (stat.st_size, stat.st_mtime_ns) + result
+
+    _save_entries(index_path, entries)
+    total = sum(entry[3] for entry in entries.values())
+    speech = sum(int((entry[4][:, 1] - entry[4][:, 0]).sum()) for entry in entries.values())
+    print(
+        f"Индекс речи {index_path}: {len(todo)} файлов обработано за {time.time() - start_time:.2f} сек, "
+        f"{len(entries) - len(todo)} без изменений; речь - {100.0 * speech / max(total, 1):.1f}% сэмплов"
+    )
+    return index_path
+
+
+class SpeechIndex:
+    """
+    Чтение индексов речевых участков (см. build_speech_index).
+
+    Можно передать несколько индексов (например, по папкам luga), поиск
+    идёт по пути WAV-файла. Файлы, которых нет в индексе, читаются целиком.
+
+    :param index_paths: Путь к индексу или список путей.
+    """
+
+    def __init__(self, index_paths):
+        if isinstance(index_paths, str):
+            index_paths = [index_paths]
+        self.entries = {}
+        for index_path in index_paths:
+            self.entries.update(_load_entries(index_path))
+
+    def __contains__(self, path):
+        return path in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    # Речевые участки файла [участки, 2] в сэмплах (None - файла нет в индексе)
+    def spans(self, path):
+        entry = self.entries.get(path)
+        return None if entry is None else entry[4]
+
+    def bounds(self, path):
+        """Диапазон [начало, конец) от начала первого до конца последнего речевого участка."""
+        entry = self.entries.get(path)
+        if entry is None:
+            return None
+        spans = entry[4]
+        if not len(spans):
+            return 0, 0
+        return int(spans[0, 0]), int(spans[-1, 1])
+
+    def read(self, path, dtype='float32', trim_only=True):
+        """
+        Чтение файла без начальной и конечной тишины (моно).
+
+        trim_only=False - склеить только речевые участки, без пауз между ними.
+        :return: Кортеж (сэмплы, частота дискретизации).
+        """
+        bounds = self.bounds(path)
+        if bounds is None:
+            audio, sr = sf.read(path, dtype=dtype, always_2d=True)
+        else:
+            audio, sr = sf.read(path, start=bounds[0], stop=bounds[1], dtype=dtype, always_2d=True)
+            if not trim_only and len(self.spans(path)) > 1:
+                audio = np.concatenate([audio[start - bounds[0]:stop - bounds[0]] for start, stop in self.spans(path)])
+        if audio.shape[1] > 1:
+            audio = audio.mean(axis=1).astype(audio.dtype)
+        else:
+            audio = audio[:, 0]
+        return audio, sr
@@ -1,17 +1,22 @@
 import os
-import librosa
 import soundfile as sf
 import noisereduce as nr
 import time
 import psutil
-from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from executor import run_batch
+
+# Общий загрузчик аудио: MP3 и WAV декодируются сразу в память (dataset_Coqui/audio_io.py)
+import coqui_path  # noqa: F401
+from audio_io import load_audio
 
 # Функция для очистки аудиофайла с использованием noisereduce
 def clean_audio(audio_file, output_file, sr=None, noise_threshold=0.005):
     try:
         start_time = time.time()  # Замер времени начала
         process = psutil.Process(os.getpid())  # Текущий процесс для замеров памяти
-        y, sr = librosa.load(audio_file, sr=sr)
+        y, sr = load_audio(audio_file, sr=sr)
         cleaned_data = nr.reduce_noise(y=y, sr=sr, prop_decrease=0.9, time_mask_smooth_ms=200)
         sf.write(output_file, cleaned_data, sr)
         end_time = time.time()
@@ -22,22 +27,21 @@ def clean_audio(audio_file, output_file, sr=None, noise_threshold=0.005):
     except Exception as e:
         print(f"Error processing {audio_file}: {e}")
 
-# Функция для многопоточной обработки всех файлов
+# Очистка одного файла с сохранением в выходную папку
+def clean_audio_to_dir(audio_file, output_dir):
+    filename = os.path.basename(audio_file)
+    output_file = os.path.join(output_dir, 'cleaned_' + filename)
+    clean_audio(audio_file, output_file)
+
+# Функция для параллельной обработки всех файлов
 def process_all_files(audio_files, output_dir, max_workers=4):
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
     
-    # Используем ThreadPoolExecutor для многопоточной обработки
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = []
-        for audio_file in audio_files:
-            filename = os.path.basename(audio_file)
-            output_file = os.path.join(output_dir, 'cleaned_' + filename)
-            futures.append(executor.submit(clean_audio, audio_file, output_file))
-        
-        # Ожидаем завершения всех потоков
-        for future in futures:
-            future.result()  # Получаем результат обработки каждого файла
+    # Используем пул процессов: filtfilt и noisereduce упираются в GIL при работе в потоках
+    task = partial(clean_audio_to_dir, output_dir=output_dir)
+    for _ in run_batch(task, audio_files, workers=max_workers):
+        pass  # clean_audio сам выводит результат и ошибки по каждому файлу
 
 # Основная функция для запуска обработки
 def main():
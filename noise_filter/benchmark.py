@@ -0,0 +1,334 @@
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import psutil
+import soundfile as sf
+from scipy.signal import correlate, correlation_lags, lfilter
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Длительности (сек) и частоты дискретизации тестовых сигналов
+DURATIONS = [2, 30, 600]
+SAMPLE_RATES = [16000, 48000]
+# Отношение сигнал/шум на входе (дБ) и зерно генератора
+INPUT_SNR_DB = 5.0
+SEED = 0
+# Тишина в начале сигнала: main.py и treshold.py берут профиль шума из первой секунды
+LEADING_SILENCE = 1.0
+
+
+# Варианты шумоподавления: имя -> функция (входной WAV, папка результатов) -> путь к результату.
+# Модули импортируются только в процессе замера, чтобы их зависимости не влияли на другие варианты
+def _run_main(audio_file, output_dir):
+    return importlib.import_module('main').process_audio_file(audio_file, output_dir)
+
+
+def _run_treshold(audio_file, output_dir):
+    return importlib.import_module('treshold').process_audio_file(audio_file, output_dir, plot=False)
+
+
+def _run_noise_filter(audio_file, output_dir):
+    output_file = os.path.join(output_dir, 'segments_' + os.path.basename(audio_file))
+    importlib.import_module('noise_filter').clean_audio_file(audio_file, output_file, mode='segments')
+    return output_file
+
+
+def _run_noise_filter_1(audio_file, output_dir):
+    output_file = os.path.join(output_dir, 'wiener_' + os.path.basename(audio_file))
+    importlib.import_module('noise_filter_1').clean_audio(audio_file, output_file)
+    return output_file
+
+
+def _run_1(audio_file, output_dir):
+    output_file = os.path.join(output_dir, 'cleaned_' + os.path.basename(audio_file))
+    importlib.import_module('1').clean_audio(audio_file, output_file)
+    return output_file
+
+
+VARIANTS = {
+    'main': _run_main,
+    'treshold': _run_treshold,
+    'noise_filter': _run_noise_filter,
+    'noise_filter_1': _run_noise_filter_1,
+    '1': _run_1,
+}
+# Что входит во время варианта кроме шумоподавления: чтение и запись файлов, графики.
+# Все варианты сейчас читают вход и пишут результат сами; графики treshold.py отключены (plot=False)
+VARIANT_SCOPE = {
+    'main': {'includes_io': True, 'includes_plots': False},
+    'treshold': {'includes_io': True, 'includes_plots': False},
+    'noise_filter': {'includes_io': True, 'includes_plots': False},
+    'noise_filter_1': {'includes_io': True, 'includes_plots': False},
+    '1': {'includes_io': True, 'includes_plots': False},
+}
+
+
+def synthetic_speech(duration, sr, rng):
+    """
+    Детерминированный «речеподобный» сигнал: слоги из гармоник основного тона
+    (до 3400 Гц) с плавающей частотой 100-200 Гц, паузы между слогами и фразами.
+    """
+    n = int(duration * sr)
+    t = np.arange(n) / sr
+    f0 = 150.0 + 40.0 * np.sin(2 * np.pi * 0.3 * t + rng.uniform(0, 2 * np.pi)) + 10.0 * np.sin(2 * np.pi * 2.1 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    del t
+
+    voiced = np.zeros(n, dtype=np.float32)
+    for k in range(1, int(3400 // 190) + 1):
+        voiced += (np.sin(k * phase) / k).astype(np.float32)
+    del phase
+
+    # Огибающая слогов: окна Ханна 0.12-0.35 с, паузы 0.05-0.3 с, иногда паузы между фразами
+    envelope = np.zeros(n, dtype=np.float32)
+    position = int(LEADING_SILENCE * sr)
+    while position < n:
+        length = int(rng.uniform(0.12, 0.35) * sr)
+        stop = min(position + length, n)
+        envelope[position:stop] = np.hanning(length)[:stop - position] * rng.uniform(0.5, 1.0)
+        pause = rng.uniform(0.4, 1.2) if rng.random() < 0.1 else rng.uniform(0.05, 0.3)
+        position = stop + int(pause * sr)
+    voiced *= envelope
+    return voiced / np.max(np.abs(voiced)) * 0.5
+
+
+# Стационарный шум: розоватый (фильтрованный белый) шум и сетевая наводка 50 Гц с гармоникой
+def synthetic_noise(n, sr, rng):
+    noise = lfilter([1.0], [1.0, -0.95], rng.standard_normal(n)).astype(np.float32)
+    t = np.arange(n) / sr
+    noise += (np.std(noise) * (0.5 * np.sin(2 * np.pi * 50 * t) + 0.2 * np.sin(2 * np.pi * 150 * t))).astype(np.float32)
+    return noise
+
+
+# Чистый и зашумлённый сигналы для одного случая (одинаковые при каждом запуске)
+def make_case(duration, sr, input_snr_db=INPUT_SNR_DB, seed=SEED):
+    rng = np.random.default_rng([seed, int(duration * 1000), sr])
+    clean = synthetic_speech(duration, sr, rng)
+    noise = synthetic_noise(len(clean), sr, rng)
+    noise *= np.sqrt(np.mean(clean ** 2) / np.mean(noise ** 2) / 10 ** (input_snr_db / 10))
+    noisy = clean + noise
+    # Запас по амплитуде, чтобы файл не ограничивался при записи
+    scale = min(1.0, 0.99 / np.max(np.abs(noisy)))
+    return clean * scale, noisy * scale
+
+
+# Отношение сигнал/шум, не зависящее от масштаба (SI-SNR), дБ
+def si_snr(reference, estimate):
+    reference = reference.astype(np.float64)
+    estimate = estimate.astype(np.float64)
+    target = np.dot(estimate, reference) / np.dot(reference, reference) * reference
+    residual = estimate - target
+    return float(10 * np.log10(np.dot(target, target) / max(np.dot(residual, residual), 1e-20)))
+
+
+def align(reference, estimate, sr, max_lag_seconds=2.0, window_seconds=5.0):
+    """
+    Совмещение результата с эталоном по максимуму взаимной корреляции начальных участков.
+
+    Нужно для вариантов, которые обрезают запись (treshold.py) или дают
+    задержку (причинный фильтр noise_filter_1.py).
+    """
+    max_lag = int(max_lag_seconds * sr)
+    window = int(window_seconds * sr) + max_lag
+    segment_ref, segment_est = reference[:window], estimate[:window]
+    correlation = correlate(segment_ref, segment_est, mode='full', method='fft')
+    lags = correlation_lags(len(segment_ref), len(segment_est), mode='full')
+    allowed = np.abs(lags) <= max_lag
+    lag = int(lags[allowed][np.argmax(correlation[allowed])])
+    if lag > 0:
+        reference = reference[lag:]
+    elif lag < 0:
+        estimate = estimate[-lag:]
+    length = min(len(reference), len(estimate))
+    return reference[:length], estimate[:length], lag
+
+
+# Пиковая память процесса (МБ): ru_maxrss в КБ на Linux и в байтах на macOS
+def peak_rss_mb():
+    if resource is None:
+        return psutil.Process(os.getpid()).memory_info().rss / 1024 ** 2
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+# Замер времени и пиковой RSS одного варианта на одном файле (выполняется в отдельном процессе).
+# tracemalloc здесь выключен: трассировка замедляет каждое выделение памяти, и тем сильнее,
+# чем больше их делает вариант на уровне Python, поэтому время вариантов стало бы несравнимым
+def _measure(variant, audio_file, output_dir):
+    base_rss = psutil.Process(os.getpid()).memory_info().rss / 1024 ** 2
+    start_time = time.perf_counter()
+    output_file = VARIANTS[variant](audio_file, output_dir)
+    wall = time.perf_counter() - start_time
+    return {
+        'output_file': output_file,
+        'wall_s': wall,
+        'base_rss_mb': base_rss,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+# Пик памяти по tracemalloc: отдельный прогон варианта (в своём процессе), время которого не учитывается
+def _measure_traced(variant, audio_file, output_dir):
+    tracemalloc.start()
+    try:
+        VARIANTS[variant](audio_file, output_dir)
+        _, traced_peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return traced_peak / 1024 ** 2
+
+
+# Вызов функции в новом процессе (spawn): память и кэши не переносятся между замерами
+def _in_fresh_process(context, func, *args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(func, *args).result()
+
+
+def run_benchmark(variants=None, durations=None, sample_rates=None, work_dir='benchmark_data', trace_memory=True):
+    """
+    Запускает варианты шумоподавления на синтетических записях.
+
+    Каждый замер выполняется в новом процессе (spawn), поэтому пиковая память
+    и кэши (например, спроектированные фильтры) не переносятся между замерами.
+    Время включает чтение и запись файлов, как при обычной обработке папки;
+    что именно входит в замер варианта, записывается в результат (VARIANT_SCOPE).
+    Время и пиковая RSS замеряются без tracemalloc; пик по tracemalloc
+    (peak_traced_mb) - во втором прогоне варианта, если trace_memory=True.
+
+    :return: Список словарей с результатами замеров.
+    """
+    variants = variants or list(VARIANTS)
+    durations = durations or DURATIONS
+    sample_rates = sample_rates or SAMPLE_RATES
+    context = multiprocessing.get_context('spawn')
+    results = []
+
+    for sr in sample_rates:
+        for duration in durations:
+            case_dir = os.path.join(work_dir, f'{duration}s_{sr}hz')
+            os.makedirs(case_dir, exist_ok=True)
+            clean, noisy = make_case(duration, sr)
+            noisy_file = os.path.join(case_dir, 'noisy.wav')
+            sf.write(noisy_file, noisy, sr, subtype='FLOAT')
+            snr_in = si_snr(clean, noisy)
+            del noisy
+
+            for variant in variants:
+                output_dir = os.path.join(case_dir, variant)
+                os.makedirs(output_dir, exist_ok=True)
+                record = {'variant': variant, 'duration_s': duration, 'sample_rate': sr, 'snr_in_db': snr_in,
+                          **VARIANT_SCOPE[variant]}
+                try:
+                    record.update(_in_fresh_process(context, _measure, variant, noisy_file, output_dir))
+                    estimate, _ = sf.read(record.pop('output_file'), dtype='float32')
+                    record['peak_traced_mb'] = None
+                    if trace_memory:
+                        record['peak_traced_mb'] = _in_fresh_process(context, _measure_traced, variant, noisy_file,
+                                                                     output_dir)
+                    reference, estimate, lag = align(clean, estimate, sr)
+                    record['realtime_factor'] = duration / record['wall_s']
+                    record['lag_samples'] = lag
+                    record['snr_out_db'] = si_snr(reference, estimate)
+                    record['snr_improvement_db'] = record['snr_out_db'] - snr_in
+                    record['error'] = None
+                except Exception as e:
+                    record['error'] = str(e)
+                results.append(record)
+                print(format_record(record))
+    return results
+
+
+def format_record(record):
+    name = f"{record['variant']:>15} {record['duration_s']:>4}s {record['sample_rate'] // 1000:>2}kHz"
+    if record['error'] is not None:
+        return f"{name}: ошибка {record['error']}"
+    traced = '-' if record['peak_traced_mb'] is None else f"{record['peak_traced_mb']:.1f}"
+    return (
+        f"{name}: {record['wall_s']:8.2f} с, {record['realtime_factor']:7.1f}x, "
+        f"RSS {record['peak_rss_mb']:7.1f} МБ, tracemalloc {traced:>7} МБ, "
+        f"SNR {record['snr_in_db']:+.1f} -> {record['snr_out_db']:+.1f} дБ ({record['snr_improvement_db']:+.1f})"
+    )
+
+
+# Сведения об окружении для сравнения результатов между коммитами
+def environment_info():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare(baseline_results, results, time_tolerance=0.1, snr_tolerance=0.5):
+    """
+    Сравнение с результатами предыдущего запуска (например, с другого коммита).
+
+    Печатает случаи, где время выросло больше чем на time_tolerance (доля)
+    или улучшение SNR упало больше чем на snr_tolerance дБ.
+    :return: Количество регрессий.
+    """
+    key = lambda record: (record['variant'], record['duration_s'], record['sample_rate'])
+    baseline = {key(record): record for record in baseline_results if record['error'] is None}
+    regressions = 0
+    for record in results:
+        old = baseline.get(key(record))
+        if old is None or record['error'] is not None:
+            continue
+        time_ratio = record['wall_s'] / old['wall_s']
+        snr_delta = record['snr_improvement_db'] - old['snr_improvement_db']
+        if time_ratio > 1 + time_tolerance or snr_delta < -snr_tolerance:
+            regressions += 1
+            print(f"Регрессия {key(record)}: время x{time_ratio:.2f}, SNR {snr_delta:+.2f} дБ")
+    print(f"Сравнение с базовым запуском: {regressions} регрессий")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сравнение вариантов шумоподавления на синтетических записях")
+    parser.add_argument('--variants', nargs='+', choices=list(VARIANTS), help="Варианты (по умолчанию все)")
+    parser.add_argument('--durations', nargs='+', type=float, help="Длительности, сек (по умолчанию 2 30 600)")
+    parser.add_argument('--rates', nargs='+', type=int, help="Частоты дискретизации (по умолчанию 16000 48000)")
+    parser.add_argument('--work-dir', default='benchmark_data', help="Папка для тестовых записей и результатов")
+    parser.add_argument('--output', default='benchmark_results.json', help="JSON с результатами")
+    parser.add_argument('--compare', help="JSON предыдущего запуска для поиска регрессий")
+    parser.add_argument('--no-tracemalloc', action='store_true',
+                        help="Без второго прогона с tracemalloc (только время и пиковая RSS)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.variants, args.durations, args.rates, args.work_dir,
+                            trace_memory=not args.no_tracemalloc)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'environment': environment_info(), 'results': results}, f, ensure_ascii=False, indent=1)
+    print(f"Результаты сохранены в {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        return compare(baseline['results'], results)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
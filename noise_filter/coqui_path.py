@@ -0,0 +1,11 @@
+import os
+import sys
+
+# Общие модули (audio_io, vad, annotations, inventory, converter) лежат в dataset_Coqui.
+# Импорт этого модуля один раз добавляет папку в sys.path, после чего они импортируются по имени:
+#     import coqui_path  # noqa: F401
+#     from audio_io import load_audio
+DATASET_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dataset_Coqui')
+
+if DATASET_DIR not in sys.path:
+    sys.path.append(DATASET_DIR)
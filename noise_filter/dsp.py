@@ -0,0 +1,103 @@
+from functools import lru_cache
+
+import numpy as np
+from scipy.signal import butter, sosfilt, sosfilt_zi
+
+# Размер блока (в сэмплах) при фильтрации на месте
+FILTER_CHUNK_SIZE = 1 << 16
+
+
+@lru_cache(maxsize=64)
+def _design_bandpass(lowcut, highcut, sample_rate, order):
+    nyquist = 0.5 * sample_rate
+    sos = butter(order, [lowcut / nyquist, highcut / nyquist], btype='band', output='sos')
+    sos.setflags(write=False)
+    return sos, sosfilt_zi(sos)
+
+
+def design_bandpass(lowcut, highcut, sample_rate, order=6, dtype=np.float64):
+    """
+    Полосовой фильтр Баттерворта в виде секций второго порядка (SOS).
+
+    Проект кэшируется по (lowcut, highcut, sample_rate, order), поэтому при
+    пакетной обработке файлов с одной частотой дискретизации фильтр
+    рассчитывается один раз.
+
+    :return: Кортеж (sos, zi) - коэффициенты секций и начальное состояние
+             для единичного входа, приведённые к dtype. Возвращаются копии:
+             проект в кэше только для чтения, а sosfilt не принимает такие массивы.
+    """
+    sos, zi = _design_bandpass(float(lowcut), float(highcut), int(sample_rate), int(order))
+    return sos.astype(dtype), zi.astype(dtype)
+
+
+# Длина нечётного продолжения краёв, как в scipy.signal.sosfiltfilt
+def _padlen(sos):
+    ntaps = 2 * sos.shape[0] + 1
+    ntaps -= min((sos[:, 2] == 0).sum(), (sos[:, 5] == 0).sum())
+    return 3 * ntaps
+
+
+# Причинная фильтрация буфера на месте, блоками, с переносом состояния фильтра
+def _sosfilt_inplace(sos, buf, zi, reverse=False):
+    n = len(buf)
+    starts = range(0, n, FILTER_CHUNK_SIZE)
+    if reverse:
+        starts = reversed(starts)
+    for start in starts:
+        stop = min(start + FILTER_CHUNK_SIZE, n)
+        if reverse:
+            chunk, zi = sosfilt(sos, buf[start:stop][::-1], zi=zi)
+            buf[start:stop] = chunk[::-1]
+        else:
+            buf[start:stop], zi = sosfilt(sos, buf[start:stop], zi=zi)
+    return zi
+
+
+def bandpass_filter(data, lowcut, highcut, sample_rate, order=6, zero_phase=True, precision='float64', out=None):
+    """
+    Применяет полосовой фильтр Баттерворта к аудиосигналу.
+
+    :param data: Входной аудиосигнал.
+    :param lowcut: Нижняя граница частоты (Гц).
+    :param highcut: Верхняя граница частоты (Гц).
+    :param sample_rate: Частота дискретизации (Гц).
+    :param order: Порядок фильтра.
+    :param zero_phase: True - двунаправленная фильтрация без фазового сдвига
+                       (аналог filtfilt), False - причинная (аналог lfilter).
+    :param precision: 'float64' или 'float32'. В режиме float32 коэффициенты,
+                      состояние и результат остаются в float32.
+    :param out: Буфер для результата (можно передать сам data, тогда
+                фильтрация выполняется на месте без копии сигнала).
+    :return: Отфильтрованный аудиосигнал.
+    """
+    dtype = np.float32 if precision == 'float32' else np.float64
+    sos, zi = design_bandpass(lowcut, highcut, sample_rate, order, dtype)
+
+    if out is None:
+        out = np.array(data, dtype=dtype)
+    elif out is not data:
+        np.copyto(out, data)
+
+    # Причинный вариант начинает с нулевого состояния, как lfilter
+    if not zero_phase:
+        _sosfilt_inplace(sos, out, np.zeros_like(zi))
+        return out
+
+    edge = _padlen(sos)
+    if len(out) <= edge:
+        raise ValueError(f"Сигнал слишком короткий для фильтрации: {len(out)} сэмплов, нужно больше {edge}")
+
+    # Нечётное продолжение краёв (как padtype='odd' в sosfiltfilt)
+    left = 2 * out[0] - out[edge:0:-1]
+    right = 2 * out[-1] - out[-2:-(edge + 2):-1]
+
+    # Прямой проход: левое продолжение (только состояние), сигнал на месте, правое продолжение
+    _, state = sosfilt(sos, left, zi=zi * left[0])
+    state = _sosfilt_inplace(sos, out, state)
+    right, _ = sosfilt(sos, right, zi=state)
+
+    # Обратный проход: с конца правого продолжения к началу сигнала
+    _, state = sosfilt(sos, right[::-1], zi=zi * right[-1])
+    _sosfilt_inplace(sos, out, state, reverse=True)
+    return out
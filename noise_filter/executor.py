@@ -0,0 +1,48 @@
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+
+# Количество процессов по умолчанию - по числу ядер
+def default_workers():
+    return os.cpu_count() or 1
+
+
+# Обёртка над задачей: ошибка одного файла не прерывает обработку остальных
+def _call_safely(func, item):
+    try:
+        return item, func(item), None
+    except Exception:
+        return item, None, traceback.format_exc()
+
+
+def run_batch(func, items, workers=1, chunksize=None):
+    """
+    Выполняет func для каждого элемента items в пуле процессов.
+
+    Задачи отправляются в пул пачками по chunksize штук, результаты
+    возвращаются в исходном порядке по мере готовности.
+
+    :param func: Функция одного аргумента (должна быть доступна для pickle,
+                 т.е. объявлена на уровне модуля или обёрнута в functools.partial).
+    :param items: Список входных элементов (например, путей к файлам).
+    :param workers: Количество процессов (1 - последовательная обработка в текущем процессе).
+    :param chunksize: Размер пачки задач; по умолчанию ~4 пачки на процесс.
+    :return: Генератор кортежей (item, result, error), где error - текст traceback или None.
+    """
+    items = list(items)
+    if workers is None:
+        workers = default_workers()
+    workers = min(workers, len(items))
+
+    if workers <= 1:
+        for item in items:
+            yield _call_safely(func, item)
+        return
+
+    if chunksize is None:
+        chunksize = max(1, len(items) // (workers * 4))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(partial(_call_safely, func), items, chunksize=chunksize)
@@ -1,97 +1,163 @@
 import os
-import librosa
 import soundfile as sf
 import noisereduce as nr
-import psutil
-import time
 import numpy as np
-from scipy.signal import butter, filtfilt
-from pydub import AudioSegment
-
-# Функция для измерения использования памяти
-def get_memory_usage():
-    process = psutil.Process(os.getpid())
-    mem = process.memory_info().rss / (1024 ** 2)  # Переводим байты в МБ
-    return mem
-
-# Полосовой фильтр Баттерворта
-def bandpass_filter(data, lowcut, highcut, sample_rate, order=6):
-    nyquist = 0.5 * sample_rate
-    low = lowcut / nyquist
-    high = highcut / nyquist
-    b, a = butter(order, [low, high], btype='band')
-    y = filtfilt(b, a, data)
-    return y
-
-# Функция для конвертации MP3 в WAV
-def convert_mp3_to_wav(mp3_file, output_dir):
-    audio = AudioSegment.from_mp3(mp3_file)
-    wav_file = os.path.join(output_dir, os.path.splitext(os.path.basename(mp3_file))[0] + '.wav')
-    audio.export(wav_file, format="wav")
-    return wav_file
+from functools import partial
+
+from blockwise import denoise_blockwise
+from dsp import bandpass_filter
+from executor import run_batch
+from noise_profiles import load_library
+from pipeline import READ_DEPTH, READERS, WRITE_DEPTH, print_pipeline_stats, run_pipeline
+from spans import disable, enable, print_summary, span
+
+# Общий загрузчик аудио лежит в dataset_Coqui: MP3 и WAV декодируются сразу в память, без временных WAV
+import coqui_path  # noqa: F401
+from audio_io import load_audio
+
+# Путь к очищенному файлу: результат всегда WAV, в том числе для MP3 на входе
+def output_path(audio_file, output_dir):
+    return os.path.join(output_dir, f'cleaned_{os.path.splitext(os.path.basename(audio_file))[0]}.wav')
 
 # Функция для обработки аудиофайла
-def process_audio_file(audio_file, output_dir, lowcut=300.0, highcut=3400.0):
-    # Загрузка аудиофайла
-    audio_data, sample_rate = librosa.load(audio_file, sr=None)
+# profiles_path - библиотека профилей шума (noise_profiles.py) вместо профиля по первой секунде файла
+def process_audio_file(audio_file, output_dir, lowcut=300.0, highcut=3400.0, block_seconds=None, profiles_path=None):
+    output_file = output_path(audio_file, output_dir)
 
-    # Применение полосового фильтра
-    filtered_audio = bandpass_filter(audio_data, lowcut, highcut, sample_rate, order=6)
+    # Длинные склеенные записи обрабатываем блоками с ограниченной памятью
+    if block_seconds is not None:
+        library = load_library(profiles_path) if profiles_path is not None else None
+        with span('blockwise'):
+            return denoise_blockwise(audio_file, output_file, lowcut, highcut, block_seconds=block_seconds,
+                                     library=library)
 
-    # Определение сегмента шума (например, первые 1 секунду)
-    noise_duration = 1.0  # секунды
-    noise_samples = int(noise_duration * sample_rate)
-    noise_clip = filtered_audio[:noise_samples]
+    # Загрузка аудиофайла
+    with span('decode'):
+        audio_data, sample_rate = load_audio(audio_file)
 
-    # Применение шумоподавления с использованием профиля шума
-    reduced_noise = nr.reduce_noise(y=filtered_audio, sr=sample_rate, y_noise=noise_clip, prop_decrease=1.0)
+    reduced_noise = denoise_audio(audio_data, sample_rate, lowcut, highcut, profiles_path)
 
     # Сохранение обработанного файла
-    output_file = os.path.join(output_dir, f'cleaned_{os.path.basename(audio_file)}')
-    sf.write(output_file, reduced_noise, sample_rate)
+    with span('write'):
+        sf.write(output_file, reduced_noise, sample_rate)
 
     # Возвращаем информацию для логов
     return output_file
 
+# Полосовой фильтр и шумоподавление уже загруженного сигнала (буфер audio_data переиспользуется)
+def denoise_audio(audio_data, sample_rate, lowcut=300.0, highcut=3400.0, profiles_path=None):
+    library = load_library(profiles_path) if profiles_path is not None else None
+
+    # Применение полосового фильтра (float32, на месте в буфере загруженного сигнала)
+    with span('bandpass'):
+        filtered_audio = bandpass_filter(audio_data, lowcut, highcut, sample_rate, order=6, precision='float32', out=audio_data)
+
+    # Применение шумоподавления с ближайшим профилем из библиотеки
+    if library is not None:
+        with span('reduce', profiles=True):
+            reduced_noise = library.denoise(filtered_audio, sample_rate)
+    else:
+        # Определение сегмента шума (например, первые 1 секунду)
+        noise_duration = 1.0  # секунды
+        noise_samples = int(noise_duration * sample_rate)
+        noise_clip = filtered_audio[:noise_samples]
+
+        # Применение шумоподавления с использованием профиля шума
+        with span('reduce'):
+            reduced_noise = nr.reduce_noise(y=filtered_audio, sr=sample_rate, y_noise=noise_clip, prop_decrease=1.0)
+    return reduced_noise
+
+# Обработка одного входного файла (MP3 или WAV) с замером времени и памяти по этапам (spans.py)
+def process_input_file(input_file, output_dir, block_seconds=None, profiles_path=None):
+    with span('file', file=input_file) as record:
+        processed_file = process_audio_file(input_file, output_dir, block_seconds=block_seconds,
+                                            profiles_path=profiles_path)
+    return processed_file, record['wall_s'], record['peak_mb']
+
+# Стадии конвейера (pipeline.py): чтение и запись в потоках, обработка - в текущем процессе или в пуле
+# Чтение: декодирование MP3 или WAV в память (каждый файл читается один раз, без кэша)
+def read_input(input_file):
+    with span('decode', file=input_file):
+        return load_audio(input_file, cache=False)
+
+# Обработка: возвращает очищенный сигнал и замеры этапа
+def denoise_input(input_file, data, profiles_path=None):
+    audio_data, sample_rate = data
+    with span('file', file=input_file) as record:
+        reduced_noise = denoise_audio(audio_data, sample_rate, profiles_path=profiles_path)
+    return reduced_noise, sample_rate, record['wall_s'], record['peak_mb']
+
+# Запись: имя результата как у process_audio_file
+def write_output(input_file, result, output_dir):
+    reduced_noise, sample_rate, execution_time, peak_mb = result
+    output_file = output_path(input_file, output_dir)
+    with span('write', file=input_file):
+        sf.write(output_file, reduced_noise, sample_rate)
+    return output_file, execution_time, peak_mb
+
+# Вывод результата одного файла (пик памяти - только при включённом журнале)
+def report_file(input_file, result, error):
+    if error is not None:
+        print(f"Ошибка при обработке файла {input_file}:\n{error}")
+        return
+    processed_file, execution_time, peak_mb = result
+    memory = f", Пик памяти: {peak_mb:.2f} МБ" if peak_mb is not None else ""
+    print(f"Файл {processed_file} обработан. Время: {execution_time:.2f} секунд{memory}")
+
 # Функция для обработки всех файлов в папке
-def process_folder(input_dir, output_dir):
+# trace_path - журнал замеров этапов (JSON-lines), по окончании выводится сводка
+# readers, read_depth, write_depth - потоки чтения и глубина очередей конвейера (pipeline.py);
+# при поблочной обработке (block_seconds) файлы читаются и пишутся внутри задачи, без конвейера
+def process_folder(input_dir, output_dir, workers=1, chunksize=None, block_seconds=None, trace_path=None,
+                   profiles_path=None, readers=READERS, read_depth=READ_DEPTH, write_depth=WRITE_DEPTH):
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
+    if trace_path is not None:
+        # Память замеряется только в однопоточном коде (spans.py): в процессах пула, но не в потоках конвейера
+        enable(trace_path)
 
+    # Собираем список файлов заранее, чтобы раздать его процессам
+    input_files = []
     for root, dirs, files in os.walk(input_dir):
         for file in files:
-            # Преобразуем MP3 в WAV, если нужно
-            if file.endswith('.mp3'):
-                mp3_file = os.path.join(root, file)
-                audio_file = convert_mp3_to_wav(mp3_file, output_dir)
-            elif file.endswith('.wav'):
-                audio_file = os.path.join(root, file)
-            else:
-                continue  # Пропускаем файлы других форматов
-
-            # Измерение памяти и времени до обработки
-            mem_before = get_memory_usage()
-            start_time = time.time()
-
-            # Обработка аудиофайла
-            processed_file = process_audio_file(audio_file, output_dir)
-
-            # Измерение времени и памяти после обработки
-            end_time = time.time()
-            mem_after = get_memory_usage()
-            mem_used = mem_after - mem_before
-            execution_time = end_time - start_time
-
-            # Вывод информации в консоль
-            print(f"Файл {processed_file} обработан. Время: {execution_time:.2f} секунд, Память: {mem_used:.2f} МБ")
+            if file.endswith('.mp3') or file.endswith('.wav'):
+                input_files.append(os.path.join(root, file))
+            # Файлы других форматов пропускаем
+
+    if block_seconds is not None:
+        # Результаты приходят в исходном порядке файлов
+        task = partial(process_input_file, output_dir=output_dir, block_seconds=block_seconds, profiles_path=profiles_path)
+        for input_file, result, error in run_batch(task, input_files, workers=workers, chunksize=chunksize):
+            report_file(input_file, result, error)
+    else:
+        # Чтение, обработка и запись перекрываются; очереди ограничены, память не растёт
+        stats = run_pipeline(
+            input_files,
+            read_input,
+            partial(denoise_input, profiles_path=profiles_path),
+            partial(write_output, output_dir=output_dir),
+            readers=readers,
+            workers=workers,
+            read_depth=read_depth,
+            write_depth=write_depth,
+            on_done=report_file,
+        )
+        print_pipeline_stats(stats)
+
+    if trace_path is not None:
+        print_summary(trace_path)
+        disable()
 
 # Основная функция
-def main():
-    input_dir = '/Users/daniil/Хакатоны/ЦП СВФО/data/ржд 1/ESC_DATASET_v1.2/hr_bot_clear'  # Папка с аудиофайлами
-    output_dir = '/Users/daniil/Хакатоны/ЦП СВФО/noise_filter/hr_bot_clear'  # Папка для сохранения очищенных аудиофайлов
-
-    # Запуск обработки всех файлов в папке
-    process_folder(input_dir, output_dir)
+# input_dir - папка с аудиофайлами, output_dir - папка для сохранения очищенных аудиофайлов
+def main(input_dir='/Users/daniil/Хакатоны/ЦП СВФО/data/ржд 1/ESC_DATASET_v1.2/hr_bot_clear',
+         output_dir='/Users/daniil/Хакатоны/ЦП СВФО/noise_filter/hr_bot_clear',
+         workers=1, block_seconds=None, trace_path=None, profiles_path=None, readers=READERS,
+         queue_depth=READ_DEPTH):
+    # Запуск обработки всех файлов в папке (по умолчанию последовательно, как раньше)
+    process_folder(input_dir, output_dir, workers=workers or 1, block_seconds=block_seconds,
+                   trace_path=trace_path, profiles_path=profiles_path, readers=readers, read_depth=queue_depth,
+                   write_depth=queue_depth)
 
 if __name__ == "__main__":
     main()
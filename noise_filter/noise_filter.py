@@ -1,8 +1,12 @@
-import librosa
 import noisereduce as nr
 import soundfile as sf
 import time
 import numpy as np
+from scipy.ndimage import uniform_filter1d
+
+# Общий загрузчик аудио: MP3 и WAV декодируются сразу в память (dataset_Coqui/audio_io.py)
+import coqui_path  # noqa: F401
+from audio_io import load_audio
 
 # Функция для разбивки аудио на фрагменты
 def split_audio(y, sr, segment_duration=0.05):
@@ -14,12 +18,50 @@ def compute_noise_level(y_segment, threshold=0.005):
     rms = np.sqrt(np.mean(np.square(y_segment)))
     return rms < threshold
 
+# Покадровый RMS одной векторной операцией (кадры - непересекающиеся сегменты)
+def frame_rms(y, frame_samples):
+    # Пустой сигнал или кадр короче сэмпла: кадров нет
+    if len(y) == 0 or frame_samples <= 0:
+        return np.zeros(0, dtype=np.float64)
+    n_frames = -(-len(y) // frame_samples)
+    padded = np.zeros(n_frames * frame_samples, dtype=y.dtype)
+    padded[:len(y)] = y
+    frames = padded.reshape(n_frames, frame_samples)
+    # Последний кадр может быть короче - делим на реальное число сэмплов
+    counts = np.full(n_frames, frame_samples)
+    counts[-1] = len(y) - (n_frames - 1) * frame_samples
+    return np.sqrt(np.einsum('ij,ij->i', frames, frames) / counts)
+
+# Шумоподавление по маске тихих сегментов: один проход noisereduce по всему сигналу,
+# затем плавное смешивание исходного и очищенного сигнала по маске
+def gated_denoise(y, sr, segment_duration=0.05, noise_threshold=0.005, crossfade_duration=0.01, prop_decrease=0.9):
+    segment_samples = int(sr * segment_duration)
+    if len(y) == 0 or segment_samples <= 0:
+        return y
+    quiet = frame_rms(y, segment_samples) < noise_threshold
+
+    reduced = nr.reduce_noise(y=y, sr=sr, prop_decrease=prop_decrease)
+
+    # Маска по сэмплам со сглаженными переходами, чтобы не было щелчков на стыках
+    mask = np.repeat(quiet.astype(np.float32), segment_samples)[:len(y)]
+    crossfade_samples = int(sr * crossfade_duration)
+    if crossfade_samples > 1:
+        mask = uniform_filter1d(mask, size=crossfade_samples)
+    return (mask * reduced + (1.0 - mask) * y).astype(y.dtype, copy=False)
+
 # Основная функция обработки
-def clean_audio_file(audio_file, output_file, segment_duration=0.05, noise_threshold=0.005):
+# mode='segments' - исходная посегментная обработка, mode='gated' - векторная (gated_denoise)
+def clean_audio_file(audio_file, output_file, segment_duration=0.05, noise_threshold=0.005, mode='segments'):
     start_time = time.time()
 
     # Загрузка аудиофайла
-    y, sr = librosa.load(audio_file, sr=None)
+    y, sr = load_audio(audio_file)
+
+    if mode == 'gated':
+        cleaned_audio = gated_denoise(y, sr, segment_duration, noise_threshold)
+        sf.write(output_file, cleaned_audio, sr)
+        print(f"Execution time: {time.time() - start_time:.2f} seconds")
+        return
 
     # Разбиваем аудио на сегменты
     segments = split_audio(y, sr, segment_duration)
@@ -46,6 +88,9 @@ def clean_audio_file(audio_file, output_file, segment_duration=0.05, noise_thres
     print(f"Execution time: {execution_time:.2f} seconds")
 
 # Запуск
-audio_file = '/Users/daniil/Хакатоны/ЦП СВФО/1/data/ржд 1/ESC_DATASET_v1.2/luga/15_11_2023/2023_11_15__09_24_51.wav'
-output_file = 'cleaned_1.wav'
-clean_audio_file(audio_file, output_file)
+def main(audio_file='/Users/daniil/Хакатоны/ЦП СВФО/1/data/ржд 1/ESC_DATASET_v1.2/luga/15_11_2023/2023_11_15__09_24_51.wav',
+         output_file='cleaned_1.wav', mode='segments'):
+    clean_audio_file(audio_file, output_file, mode=mode)
+
+if __name__ == "__main__":
+    main()
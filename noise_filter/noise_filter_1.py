@@ -1,18 +1,13 @@
 import os
-import librosa
 import soundfile as sf
 import numpy as np
-import scipy.signal as signal
 from scipy.signal import wiener
 
-# Полосовой фильтр для удаления ненужных частот
-def bandpass_filter(data, lowcut, highcut, sr, order=5):
-    nyquist = 0.5 * sr
-    low = lowcut / nyquist
-    high = highcut / nyquist
-    b, a = signal.butter(order, [low, high], btype='band')
-    filtered_data = signal.lfilter(b, a, data)
-    return filtered_data
+from dsp import bandpass_filter
+
+# Общий загрузчик аудио: MP3 и WAV декодируются сразу в память (dataset_Coqui/audio_io.py)
+import coqui_path  # noqa: F401
+from audio_io import load_audio
 
 # Адаптивный Wiener фильтр для удаления шума
 def apply_wiener_filter(data):
@@ -22,10 +17,10 @@ def apply_wiener_filter(data):
 def clean_audio(audio_file, output_file, lowcut=100, highcut=8000):
     try:
         # Загрузка аудиофайла
-        y, sr = librosa.load(audio_file, sr=None)
+        y, sr = load_audio(audio_file)
         
-        # Применение полосового фильтра
-        filtered_data = bandpass_filter(y, lowcut, highcut, sr)
+        # Применение полосового фильтра (причинный, как lfilter)
+        filtered_data = bandpass_filter(y, lowcut, highcut, sr, order=5, zero_phase=False)
         
         # Применение Wiener фильтра для адаптивного удаления шума
         cleaned_data = apply_wiener_filter(filtered_data)
@@ -0,0 +1,220 @@
+import json
+import os
+from functools import lru_cache
+
+import librosa
+import numpy as np
+from scipy.ndimage import uniform_filter
+
+from dsp import bandpass_filter
+
+# Общий загрузчик аудио: MP3 и WAV декодируются сразу в память (dataset_Coqui/audio_io.py)
+import coqui_path  # noqa: F401
+from audio_io import load_audio
+
+# Параметры STFT профилей и спектрального гейта (как у noisereduce по умолчанию)
+N_FFT = 1024
+HOP_LENGTH = 256
+# Краткая сводка спектра: уровни в логарифмических полосах
+N_BANDS = 32
+SUMMARY_FRAMES = 64
+SUMMARY_PERCENTILE = 20
+# Длина фрагмента записи шума, по которому считается один профиль (сек)
+SEGMENT_SECONDS = 2.0
+# Версия формата библиотеки
+LIBRARY_VERSION = 1
+
+
+# Границы полос сводки (номера бинов rfft), от 50 Гц до частоты Найквиста
+def band_edges(sample_rate, n_fft=N_FFT, n_bands=N_BANDS):
+    freqs = np.geomspace(50.0, sample_rate / 2, n_bands + 1)
+    edges = np.round(freqs * n_fft / sample_rate).astype(np.intp)
+    # Узкие низкие полосы должны содержать хотя бы один бин: границы строго возрастают
+    offsets = np.arange(n_bands + 1)
+    return np.maximum.accumulate(np.maximum(edges, 1) - offsets) + offsets
+
+
+def spectral_summary(y, sample_rate, n_fft=N_FFT, max_frames=SUMMARY_FRAMES):
+    """
+    Дешёвая сводка спектра шума: уровни в n_bands полосах (дБ).
+
+    Берётся не больше max_frames равномерно расставленных кадров, и для каждой
+    полосы - низкий перцентиль по кадрам, чтобы речь почти не влияла на оценку
+    (оценка шума по минимальной статистике).
+    """
+    if len(y) < n_fft:
+        y = np.pad(y, (0, n_fft - len(y)))
+    starts = np.linspace(0, len(y) - n_fft, min(max_frames, 1 + (len(y) - n_fft) // HOP_LENGTH)).astype(np.intp)
+    frames = y[starts[:, None] + np.arange(n_fft)] * np.hanning(n_fft)
+    power = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+    edges = band_edges(sample_rate, n_fft)
+    bands = np.add.reduceat(power, edges[:-1], axis=1)
+    return np.percentile(10 * np.log10(bands + 1e-10), SUMMARY_PERCENTILE, axis=0)
+
+
+# Спектр в дБ [частоты, кадры]
+def _spectrum_db(y):
+    return 20 * np.log10(np.abs(librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH)) + 1e-10)
+
+
+# k-средних с детерминированной инициализацией k-means++
+def kmeans(x, k, n_iter=50, seed=0):
+    rng = np.random.default_rng(seed)
+    k = min(k, len(x))
+    centers = [x[rng.integers(len(x))]]
+    for _ in range(1, k):
+        distances = np.min([((x - c) ** 2).sum(axis=1) for c in centers], axis=0)
+        total = distances.sum()
+        centers.append(x[rng.choice(len(x), p=distances / total)] if total > 0 else x[rng.integers(len(x))])
+    centers = np.array(centers)
+    for _ in range(n_iter):
+        labels = ((x[:, None, :] - centers[None]) ** 2).sum(axis=2).argmin(axis=1)
+        updated = np.array([x[labels == i].mean(axis=0) if np.any(labels == i) else centers[i] for i in range(k)])
+        if np.allclose(updated, centers):
+            break
+        centers = updated
+    return centers, labels
+
+
+def build_profile_library(noise_dir, output_path, n_clusters=8, sample_rate=16000,
+                          lowcut=300.0, highcut=3400.0):
+    """
+    Строит библиотеку профилей шума по записям из noise_dir (luga/noise).
+
+    Записи режутся на фрагменты по SEGMENT_SECONDS, для каждого фрагмента
+    считаются среднее и разброс спектра в дБ по частотам (после того же
+    полосового фильтра, что и при очистке) и краткая сводка. Фрагменты
+    группируются k-средних по сводке, профиль кластера - среднее и
+    общий разброс его фрагментов. Библиотека сохраняется в один .npz
+    (float16, несколько десятков КБ).
+
+    :param noise_dir: Папка с записями шума.
+    :param output_path: Путь к .npz библиотеки.
+    :param n_clusters: Количество профилей.
+    :return: Количество профилей.
+    """
+    means, variances, summaries = [], [], []
+    segment = int(SEGMENT_SECONDS * sample_rate)
+    for root, _, files in os.walk(noise_dir):
+        for file_name in sorted(files):
+            if not (file_name.endswith('.wav') or file_name.endswith('.mp3')):
+                continue
+            try:
+                y, _ = load_audio(os.path.join(root, file_name), sr=sample_rate, cache=False)
+            except Exception as e:
+                print(f"Ошибка чтения файла {file_name}: {e}")
+                continue
+            y = bandpass_filter(y, lowcut, highcut, sample_rate, precision='float32', out=y)
+            for start in range(0, max(len(y) - segment // 2, 1), segment):
+                piece = y[start:start + segment]
+                if len(piece) < N_FFT:
+                    continue
+                spectrum_db = _spectrum_db(piece)
+                means.append(spectrum_db.mean(axis=1))
+                variances.append(spectrum_db.var(axis=1))
+                summaries.append(spectral_summary(piece, sample_rate))
+    if not means:
+        raise ValueError(f"В папке {noise_dir} нет записей шума")
+
+    means, variances, summaries = np.array(means), np.array(variances), np.array(summaries)
+    centers, labels = kmeans(summaries, n_clusters)
+    profile_means, profile_stds = [], []
+    for i in range(len(centers)):
+        members = labels == i
+        mean = means[members].mean(axis=0)
+        # Общий разброс: разброс внутри фрагментов + разброс средних между фрагментами
+        variance = variances[members].mean(axis=0) + means[members].var(axis=0)
+        profile_means.append(mean)
+        profile_stds.append(np.sqrt(variance))
+
+    np.savez_compressed(
+        output_path,
+        means=np.array(profile_means, dtype=np.float16),
+        stds=np.array(profile_stds, dtype=np.float16),
+        summaries=centers.astype(np.float32),
+        counts=np.bincount(labels, minlength=len(centers)),
+        params=json.dumps({
+            'version': LIBRARY_VERSION, 'sample_rate': sample_rate, 'n_fft': N_FFT,
+            'hop_length': HOP_LENGTH, 'lowcut': lowcut, 'highcut': highcut,
+        }),
+    )
+    print(f"Библиотека шума: {len(centers)} профилей по {len(means)} фрагментам, сохранена в {output_path}")
+    return len(centers)
+
+
+def spectral_gate(y, sample_rate, noise_mean_db, noise_std_db, n_std_thresh=1.5, prop_decrease=1.0,
+                  freq_smooth_hz=500.0, time_smooth_ms=50.0):
+    """
+    Спектральный гейт с готовым профилем шума (стационарный режим noisereduce).
+
+    Полосы, где спектр выше среднего шума на n_std_thresh разбросов, сохраняются,
+    остальные ослабляются на prop_decrease; маска сглаживается по частоте и времени.
+    """
+    stft = librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH)
+    spectrum_db = 20 * np.log10(np.abs(stft) + 1e-10)
+    mask = (spectrum_db > (noise_mean_db + n_std_thresh * noise_std_db)[:, None]).astype(np.float32)
+    freq_size = max(1, int(round(freq_smooth_hz * N_FFT / sample_rate)))
+    time_size = max(1, int(round(time_smooth_ms / 1000.0 * sample_rate / HOP_LENGTH)))
+    mask = uniform_filter(mask, size=(freq_size, time_size))
+    stft *= 1.0 - prop_decrease * (1.0 - mask)
+    return librosa.istft(stft, hop_length=HOP_LENGTH, length=len(y)).astype(y.dtype, copy=False)
+
+
+class NoiseProfileLibrary:
+    """
+    Библиотека профилей шума (см. build_profile_library).
+
+    Для сигнала (файла или блока) по краткой сводке спектра выбирается
+    ближайший профиль, и шумоподавление выполняется спектральным гейтом
+    с этим профилем - без оценки профиля по началу каждого файла.
+
+    :param path: Путь к .npz библиотеки.
+    """
+
+    def __init__(self, path):
+        with np.load(path) as data:
+            self.means = data['means'].astype(np.float32)
+            self.stds = data['stds'].astype(np.float32)
+            self.summaries = data['summaries']
+            self.counts = data['counts']
+            self.params = json.loads(str(data['params']))
+        self.freqs = np.fft.rfftfreq(self.params['n_fft'], 1.0 / self.params['sample_rate'])
+
+    def __len__(self):
+        return len(self.means)
+
+    # Номер ближайшего профиля по сводке спектра сигнала
+    def select(self, y, sample_rate):
+        summary = spectral_summary(y, sample_rate)
+        if sample_rate != self.params['sample_rate']:
+            # Полосы сводки привязаны к частоте Найквиста: сравниваем по общим частотам
+            bands = np.geomspace(50.0, sample_rate / 2, N_BANDS + 1)
+            library_bands = np.geomspace(50.0, self.params['sample_rate'] / 2, N_BANDS + 1)
+            summary = np.interp(library_bands[:-1], bands[:-1], summary)
+        return int(((self.summaries - summary) ** 2).sum(axis=1).argmin())
+
+    # Профиль (среднее и разброс в дБ) на сетке частот STFT для нужной частоты дискретизации
+    @lru_cache(maxsize=64)
+    def profile(self, index, sample_rate):
+        if sample_rate == self.params['sample_rate']:
+            return self.means[index], self.stds[index]
+        freqs = np.fft.rfftfreq(N_FFT, 1.0 / sample_rate)
+        return np.interp(freqs, self.freqs, self.means[index]), np.interp(freqs, self.freqs, self.stds[index])
+
+    def denoise(self, y, sample_rate, prop_decrease=1.0):
+        mean_db, std_db = self.profile(self.select(y, sample_rate), sample_rate)
+        return spectral_gate(y, sample_rate, mean_db, std_db, prop_decrease=prop_decrease)
+
+
+# Библиотека загружается один раз на процесс (в том числе в процессах пула)
+@lru_cache(maxsize=4)
+def load_library(path):
+    return NoiseProfileLibrary(path)
+
+
+def main(noise_dir='/Users/daniil/Хакатоны/ЦП СВФО/1/data/ржд 1/ESC_DATASET_v1.2/luga/noise',
+         output_path='noise_profiles.npz', n_clusters=8):
+    build_profile_library(noise_dir, output_path, n_clusters=n_clusters)
+
+if __name__ == "__main__":
+    main()
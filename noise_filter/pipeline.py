@@ -0,0 +1,250 @@
+import queue
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from executor import default_workers
+
+# Глубина очередей между стадиями по умолчанию (элементов)
+READ_DEPTH = 4
+WRITE_DEPTH = 4
+# Количество потоков чтения по умолчанию
+READERS = 2
+
+# Маркер конца потока элементов в очереди
+_DONE = object()
+
+
+class StageStats:
+    """
+    Загрузка одной стадии конвейера.
+
+    busy_s - время внутри функции стадии, starved_s - ожидание входных данных
+    (предыдущая стадия не успевает), blocked_s - ожидание места в выходной
+    очереди (следующая стадия не успевает, срабатывает обратное давление).
+    Для стадии обработки в пуле busy_s - сумма времени по процессам.
+    """
+
+    def __init__(self, name, threads):
+        self.name = name
+        self.threads = threads
+        self.items = 0
+        self.errors = 0
+        self.busy_s = 0.0
+        self.starved_s = 0.0
+        self.blocked_s = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, busy=0.0, starved=0.0, blocked=0.0, items=0, errors=0):
+        with self._lock:
+            self.busy_s += busy
+            self.starved_s += starved
+            self.blocked_s += blocked
+            self.items += items
+            self.errors += errors
+
+    def utilization(self, wall_s):
+        return self.busy_s / max(wall_s * self.threads, 1e-9)
+
+    def as_dict(self, wall_s):
+        return {
+            'items': self.items, 'errors': self.errors, 'threads': self.threads,
+            'busy_s': self.busy_s, 'starved_s': self.starved_s, 'blocked_s': self.blocked_s,
+            'utilization': self.utilization(wall_s),
+        }
+
+
+# Вызов функции стадии с перехватом ошибки и замером времени
+def _timed_call(func, *args):
+    start_time = time.perf_counter()
+    try:
+        result, error = func(*args), None
+    except Exception:
+        result, error = None, traceback.format_exc()
+    return result, error, time.perf_counter() - start_time
+
+
+# Ожидание с учётом времени: get/put очереди, возвращает (значение, время ожидания)
+def _timed_get(q):
+    start_time = time.perf_counter()
+    value = q.get()
+    return value, time.perf_counter() - start_time
+
+
+def _timed_put(q, value):
+    start_time = time.perf_counter()
+    q.put(value)
+    return time.perf_counter() - start_time
+
+
+def run_pipeline(items, read, compute, write, readers=READERS, workers=1, read_depth=READ_DEPTH,
+                 write_depth=WRITE_DEPTH, on_done=None):
+    """
+    Конвейер чтение -> обработка -> запись с ограниченными очередями.
+
+    Потоки чтения (readers) вызывают read(item) и кладут результат в очередь
+    глубиной read_depth; стадия обработки вызывает compute(item, data) в
+    текущем процессе (workers=1) или в пуле процессов, держа в работе не
+    больше workers + read_depth элементов; поток записи вызывает
+    write(item, result). Очереди ограничены, поэтому быстрая стадия
+    останавливается, когда следующая не успевает, и память не растёт,
+    а диск и процессор заняты одновременно.
+
+    Ошибка в любой стадии относится только к своему элементу: он пропускает
+    оставшиеся стадии и передаётся в on_done с текстом traceback.
+    Потоки чтения завершаются в любом порядке, но обработка, запись и on_done
+    получают элементы в исходном порядке: прочитанные раньше своей очереди
+    ждут в буфере, размер которого ограничен readers + read_depth элементами.
+
+    :param items: Входные элементы (например, пути к файлам).
+    :param read: Функция чтения одного элемента (выполняется в потоке).
+    :param compute: Функция обработки (для пула - объявлена на уровне модуля или functools.partial).
+    :param write: Функция записи (выполняется в потоке записи), её результат - итог элемента.
+    :param on_done: Вызывается в потоке записи для каждого элемента: on_done(item, output, error);
+                    его исключения печатаются и не прерывают конвейер.
+    :return: Словарь статистики стадий ('read', 'compute', 'write') и 'wall_s'.
+    """
+    items = list(items)
+    if workers is None:
+        workers = default_workers()
+    workers = max(1, min(workers, len(items) or 1))
+    readers = max(1, min(readers, len(items) or 1))
+    stats = {
+        'read': StageStats('read', readers),
+        'compute': StageStats('compute', workers),
+        'write': StageStats('write', 1),
+    }
+    read_queue = queue.Queue(maxsize=read_depth)
+    write_queue = queue.Queue(maxsize=write_depth)
+    pending_items = enumerate(items)
+    items_lock = threading.Lock()
+    # Элементов, взятых на чтение, но ещё не переданных в обработку (вместе с буфером порядка)
+    slots = threading.Semaphore(readers + read_depth)
+    start_time = time.perf_counter()
+
+    def reader():
+        while True:
+            # Ожидание места в буфере порядка - тоже обратное давление от обработки
+            wait_start = time.perf_counter()
+            slots.acquire()
+            blocked = time.perf_counter() - wait_start
+            with items_lock:
+                entry = next(pending_items, None)
+            if entry is None:
+                slots.release()
+                break
+            index, item = entry
+            data, error, busy = _timed_call(read, item)
+            blocked += _timed_put(read_queue, (index, item, data, error))
+            stats['read'].add(busy=busy, blocked=blocked, items=1, errors=error is not None)
+        read_queue.put(_DONE)
+
+    def writer():
+        while True:
+            entry, starved = _timed_get(write_queue)
+            stats['write'].add(starved=starved)
+            if entry is _DONE:
+                break
+            item, result, error = entry
+            output, busy = None, 0.0
+            if error is None:
+                output, error, busy = _timed_call(write, item, result)
+                stats['write'].add(busy=busy, items=1, errors=error is not None)
+            if on_done is not None:
+                # Ошибка в on_done не должна останавливать поток записи: иначе обработка
+                # ждала бы места в очереди записи бесконечно
+                try:
+                    on_done(item, output, error)
+                except Exception:
+                    print(f"Ошибка on_done для {item}:\n{traceback.format_exc()}")
+
+    # Следующий по порядку прочитанный элемент: (item, data, ошибка чтения) или None в конце
+    def next_input():
+        nonlocal finished_readers, next_index
+        while True:
+            if next_index in reordered:
+                entry = reordered.pop(next_index)
+                next_index += 1
+                slots.release()
+                return entry
+            if finished_readers == readers:
+                return None
+            entry, starved = _timed_get(read_queue)
+            stats['compute'].add(starved=starved)
+            if entry is _DONE:
+                finished_readers += 1
+                continue
+            index, item, data, error = entry
+            reordered[index] = (item, data, error)
+
+    finished_readers = 0
+    next_index = 0
+    reordered = {}
+    threads = [threading.Thread(target=reader, daemon=True) for _ in range(readers)]
+    threads.append(threading.Thread(target=writer, daemon=True))
+    for thread in threads:
+        thread.start()
+
+    completed = False
+    try:
+        if workers == 1:
+            while True:
+                entry = next_input()
+                if entry is None:
+                    break
+                item, data, error = entry
+                # Элемент с ошибкой чтения передаётся в запись как ошибка, на своём месте
+                result = None
+                if error is None:
+                    result, error, busy = _timed_call(compute, item, data)
+                    stats['compute'].add(busy=busy, items=1, errors=error is not None)
+                stats['compute'].add(blocked=_timed_put(write_queue, (item, result, error)))
+        else:
+            # В пул отправляется не больше max_in_flight элементов, результаты забираются по порядку;
+            # элементы с ошибкой чтения ждут в той же очереди без задачи (future=None)
+            max_in_flight = workers + read_depth
+            in_flight = deque()
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                exhausted = False
+                while in_flight or not exhausted:
+                    head_ready = in_flight and (in_flight[0][1] is None or in_flight[0][1].done())
+                    if not exhausted and len(in_flight) < max_in_flight and not head_ready:
+                        entry = next_input()
+                        if entry is None:
+                            exhausted = True
+                        else:
+                            item, data, error = entry
+                            future = None if error is not None else executor.submit(_timed_call, compute, item, data)
+                            in_flight.append((item, future, error))
+                        continue
+                    item, future, error = in_flight.popleft()
+                    result = None
+                    if future is not None:
+                        result, error, busy = future.result()
+                        stats['compute'].add(busy=busy, items=1, errors=error is not None)
+                    stats['compute'].add(blocked=_timed_put(write_queue, (item, result, error)))
+        completed = True
+    finally:
+        write_queue.put(_DONE)
+        # После ошибки потоки чтения могут ждать места в очереди: ждём только запись
+        for thread in threads if completed else threads[-1:]:
+            thread.join()
+
+    wall_s = time.perf_counter() - start_time
+    summary = {name: stage.as_dict(wall_s) for name, stage in stats.items()}
+    summary['wall_s'] = wall_s
+    return summary
+
+
+def print_pipeline_stats(summary):
+    print(f"Конвейер: {summary['wall_s']:.2f} сек")
+    print(f"{'стадия':<10} {'N':>6} {'ошибки':>7} {'потоки':>7} {'работа, с':>10} {'загрузка':>9} "
+          f"{'ждёт вход, с':>13} {'ждёт выход, с':>14}")
+    for name in ('read', 'compute', 'write'):
+        stage = summary[name]
+        print(
+            f"{name:<10} {stage['items']:>6} {stage['errors']:>7} {stage['threads']:>7} {stage['busy_s']:>10.2f} "
+            f"{100 * stage['utilization']:>8.1f}% {stage['starved_s']:>13.2f} {stage['blocked_s']:>14.2f}"
+        )
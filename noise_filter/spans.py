@@ -0,0 +1,176 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Путь к журналу замеров передаётся через окружение, чтобы его видели процессы пула (executor.py)
+TRACE_ENV = 'NOISE_FILTER_TRACE'
+
+# Стек открытых замеров текущего потока
+_local = threading.local()
+
+# Открытый журнал процесса: один дескриптор на процесс, запись строк под блокировкой
+_log_lock = threading.Lock()
+_log = {'path': None, 'pid': None, 'file': None}
+
+
+def enable(log_path, trace_memory=True):
+    """
+    Включает запись замеров этапов в журнал JSON-lines (файл перезаписывается).
+
+    Вызывается до создания пула процессов: обработчики наследуют окружение
+    и дописывают свои записи в тот же файл.
+
+    :param log_path: Путь к журналу.
+    :param trace_memory: Замерять пиковую память через tracemalloc (замедляет выделение памяти в Python).
+    """
+    _close_log()
+    open(log_path, 'w').close()
+    os.environ[TRACE_ENV] = json.dumps({'path': os.path.abspath(log_path), 'memory': trace_memory})
+
+
+def disable():
+    os.environ.pop(TRACE_ENV, None)
+    _close_log()
+
+
+def _close_log():
+    with _log_lock:
+        if _log['file'] is not None and _log['pid'] == os.getpid():
+            _log['file'].close()
+        _log.update(path=None, pid=None, file=None)
+
+
+# Дозапись строки в журнал: файл открывается один раз на процесс (после fork - заново)
+def _write_record(path, record):
+    line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+    with _log_lock:
+        if _log['file'] is None or _log['path'] != path or _log['pid'] != os.getpid():
+            if _log['file'] is not None and _log['pid'] == os.getpid():
+                _log['file'].close()
+            _log.update(path=path, pid=os.getpid(), file=open(path, 'a', encoding='utf-8'))
+        # Строка сбрасывается сразу целиком: процессы пула пишут в тот же файл в режиме дозаписи
+        _log['file'].write(line)
+        _log['file'].flush()
+
+
+def _settings():
+    value = os.environ.get(TRACE_ENV)
+    return json.loads(value) if value else None
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Замер этапа обработки: время (wall и CPU процесса) и пиковая память tracemalloc.
+
+    Замеры вкладываются друг в друга: запись получает путь вида 'file/reduce',
+    атрибуты родителя (например, имя файла) наследуются. Пик памяти этапа -
+    прирост относительно памяти на входе в этап, с учётом вложенных этапов.
+    Словарь, который возвращает span, после выхода содержит wall_s, cpu_s
+    и peak_mb (None, если память не замеряется), даже когда журнал выключен.
+
+    tracemalloc общий для всего процесса, поэтому память замеряется только
+    в однопоточном коде: внешний замер должен открываться, когда в процессе
+    один поток (например, в обработчике пула процессов), вложенные замеры
+    наследуют это решение. В потоках конвейера (pipeline.py) и в основном
+    потоке, пока они работают, peak_mb равен None.
+    """
+    settings = _settings()
+    stack = _stack()
+    parent = stack[-1] if stack else None
+    record = {
+        'name': name,
+        'path': f"{parent['path']}/{name}" if parent else name,
+        'depth': len(stack),
+        **(parent['attrs'] if parent else {}),
+        **attrs,
+    }
+    frame = {'path': record['path'], 'attrs': {**(parent['attrs'] if parent else {}), **attrs}, 'peak': 0}
+
+    trace_memory = settings is not None and settings['memory'] and (
+        parent['memory'] if parent is not None else threading.active_count() == 1
+    )
+    frame['memory'] = trace_memory
+    if trace_memory:
+        # tracemalloc запускается внешним замером и останавливается при его завершении
+        frame['owns_tracing'] = not tracemalloc.is_tracing()
+        if frame['owns_tracing']:
+            tracemalloc.start()
+        current, peak = tracemalloc.get_traced_memory()
+        if parent is not None:
+            parent['peak'] = max(parent['peak'], peak)
+        tracemalloc.reset_peak()
+        frame['start_memory'] = current
+
+    stack.append(frame)
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    finally:
+        record['wall_s'] = time.perf_counter() - start_wall
+        record['cpu_s'] = time.process_time() - start_cpu
+        stack.pop()
+        record['peak_mb'] = None
+        if trace_memory:
+            peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+            record['peak_mb'] = (peak - frame['start_memory']) / 1024 ** 2
+            if parent is not None:
+                parent['peak'] = max(parent['peak'], peak)
+            tracemalloc.reset_peak()
+            if frame['owns_tracing']:
+                tracemalloc.stop()
+        if settings is not None:
+            record['pid'] = os.getpid()
+            record['ts'] = time.time()
+            _write_record(settings['path'], record)
+
+
+def load_records(log_path):
+    with open(log_path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(records):
+    """
+    Сводка по этапам: количество, суммарное и среднее время, CPU, максимум пика памяти.
+
+    :return: Словарь путь этапа -> показатели, в порядке убывания суммарного времени.
+    """
+    stages = {}
+    for record in records:
+        stage = stages.setdefault(record['path'], {'count': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'peak_mb': None, 'walls': []})
+        stage['count'] += 1
+        stage['wall_s'] += record['wall_s']
+        stage['cpu_s'] += record['cpu_s']
+        stage['walls'].append(record['wall_s'])
+        if record['peak_mb'] is not None:
+            stage['peak_mb'] = max(stage['peak_mb'] or 0.0, record['peak_mb'])
+    for stage in stages.values():
+        walls = sorted(stage.pop('walls'))
+        stage['mean_s'] = stage['wall_s'] / stage['count']
+        stage['p95_s'] = walls[min(len(walls) - 1, int(0.95 * len(walls)))]
+    return dict(sorted(stages.items(), key=lambda item: -item[1]['wall_s']))
+
+
+def print_summary(log_path):
+    stages = summarize(load_records(log_path))
+    # Доля считается от времени корневых замеров (обычно 'file')
+    total = sum(stage['wall_s'] for path, stage in stages.items() if '/' not in path) or 1e-9
+    print(f"Сводка по этапам ({log_path}):")
+    print(f"{'этап':<24} {'N':>6} {'всего, с':>10} {'доля':>6} {'ср., с':>9} {'p95, с':>9} {'CPU, с':>9} {'пик, МБ':>9}")
+    for path, stage in stages.items():
+        peak = f"{stage['peak_mb']:9.1f}" if stage['peak_mb'] is not None else f"{'-':>9}"
+        print(
+            f"{path:<24} {stage['count']:>6} {stage['wall_s']:>10.2f} {100 * stage['wall_s'] / total:>5.1f}% "
+            f"{stage['mean_s']:>9.3f} {stage['p95_s']:>9.3f} {stage['cpu_s']:>9.2f} {peak}"
+        )
+    return stages
@@ -0,0 +1,198 @@
+import os
+import time
+
+import numpy as np
+import soundfile as sf
+from scipy.signal import sosfilt
+
+from dsp import design_bandpass
+
+# Общий загрузчик аудио: MP3 и WAV декодируются сразу в память (dataset_Coqui/audio_io.py)
+import coqui_path  # noqa: F401
+from audio_io import load_audio
+
+
+class StreamingDenoiser:
+    """
+    Потоковое шумоподавление для звука с пульта: полосовой фильтр и спектральный
+    гейт, как в main.py::process_audio_file, но по кадрам по мере поступления.
+
+    Сигнал обрабатывается шагами по frame_ms (10-20 мс): причинный полосовой
+    фильтр с переносом состояния, затем STFT с окном window_frames шагов
+    (корень из окна Ханна на анализе и синтезе, сложение с перекрытием).
+    Алгоритмическая задержка - (window_frames - 1) шагов и не зависит от длины
+    записи; если она больше max_latency_ms, конструктор выдаёт ошибку.
+
+    Профиль шума (среднее и разброс спектра в дБ по частотам) набирается
+    по первым noise_seconds, как y_noise в main.py, а затем обновляется
+    с экспоненциальным забыванием по кадрам, где почти нет полос выше порога.
+    Маска гейта сглаживается по частоте (окно freq_smooth_hz) и причинно
+    по времени (постоянная time_smooth_ms), чтобы не добавлять задержку.
+
+    :param sample_rate: Частота дискретизации (Гц).
+    :param frame_ms: Шаг обработки (мс).
+    :param window_frames: Длина окна STFT в шагах (2 - перекрытие 50%).
+    :param max_latency_ms: Допустимая алгоритмическая задержка (мс).
+    :param n_std_thresh: Порог гейта: среднее шума + n_std_thresh стандартных отклонений (дБ).
+    :param prop_decrease: Доля подавления полос ниже порога (1.0 - полностью, как в main.py).
+    :param noise_time_constant: Постоянная времени обновления профиля шума (сек).
+    """
+
+    def __init__(self, sample_rate, frame_ms=10.0, window_frames=2, max_latency_ms=20.0,
+                 lowcut=300.0, highcut=3400.0, order=6, noise_seconds=1.0, n_std_thresh=1.5,
+                 prop_decrease=1.0, freq_smooth_hz=500.0, time_smooth_ms=50.0,
+                 noise_time_constant=2.0, speech_fraction=0.1):
+        self.sample_rate = sample_rate
+        self.hop = int(round(sample_rate * frame_ms / 1000.0))
+        self.n_fft = self.hop * window_frames
+        self.latency = self.n_fft - self.hop
+        if self.latency_ms > max_latency_ms:
+            raise ValueError(
+                f"Задержка {self.latency_ms:.1f} мс больше допустимой {max_latency_ms:.1f} мс "
+                f"(шаг {frame_ms} мс, окно {window_frames} шагов)"
+            )
+
+        # Причинный полосовой фильтр: состояние переносится между кадрами
+        self.sos, _ = design_bandpass(lowcut, highcut, sample_rate, order)
+        self.zi = np.zeros((self.sos.shape[0], 2))
+
+        # Корень из периодического окна Ханна: произведение окон анализа и синтеза даёт
+        # окно Ханна, сумма которого при перекрытии 50% (и кратных) постоянна
+        window = np.sqrt(0.5 - 0.5 * np.cos(2 * np.pi * np.arange(self.n_fft) / self.n_fft))
+        self.window = window * np.sqrt(2.0 / window_frames)
+        self.in_buffer = np.zeros(self.n_fft)
+        self.out_buffer = np.zeros(self.n_fft)
+        self.pending = np.zeros(0)
+
+        n_bins = self.n_fft // 2 + 1
+        bin_hz = sample_rate / self.n_fft
+        smooth_bins = max(1, int(round(freq_smooth_hz / bin_hz)))
+        kernel = np.bartlett(2 * smooth_bins + 1)[1:-1] if smooth_bins > 1 else np.ones(1)
+        self.freq_kernel = kernel / kernel.sum()
+        frame_seconds = self.hop / sample_rate
+        self.mask_decay = np.exp(-frame_seconds / (time_smooth_ms / 1000.0))
+        self.noise_decay = np.exp(-frame_seconds / noise_time_constant)
+        self.noise_frames = max(1, int(noise_seconds / frame_seconds))
+        self.n_std_thresh = n_std_thresh
+        self.prop_decrease = prop_decrease
+        self.speech_fraction = speech_fraction
+
+        # Профиль шума: количество кадров, среднее и средний квадрат спектра в дБ
+        self.noise_count = 0
+        self.noise_mean = np.zeros(n_bins)
+        self.noise_sq = np.zeros(n_bins)
+        self.mask = np.ones(n_bins)
+        self.frame_times = []
+
+    @property
+    def latency_ms(self):
+        return 1000.0 * self.latency / self.sample_rate
+
+    def _update_noise(self, spectrum_db):
+        if self.noise_count < self.noise_frames:
+            # Набор начального профиля: обычное среднее
+            self.noise_count += 1
+            weight = 1.0 / self.noise_count
+        else:
+            weight = 1.0 - self.noise_decay
+        self.noise_mean += weight * (spectrum_db - self.noise_mean)
+        self.noise_sq += weight * (spectrum_db ** 2 - self.noise_sq)
+
+    # Обработка одного шага в hop сэмплов: возвращает hop готовых сэмплов с задержкой latency
+    def _process_hop(self, samples):
+        filtered, self.zi = sosfilt(self.sos, samples, zi=self.zi)
+        self.in_buffer[:-self.hop] = self.in_buffer[self.hop:]
+        self.in_buffer[-self.hop:] = filtered
+
+        spectrum = np.fft.rfft(self.in_buffer * self.window)
+        spectrum_db = 20.0 * np.log10(np.abs(spectrum) + 1e-10)
+
+        if self.noise_count < self.noise_frames:
+            self._update_noise(spectrum_db)
+        std = np.sqrt(np.maximum(self.noise_sq - self.noise_mean ** 2, 0.0))
+        above = (spectrum_db > self.noise_mean + self.n_std_thresh * std).astype(np.float64)
+        if self.noise_count >= self.noise_frames and above.mean() < self.speech_fraction:
+            self._update_noise(spectrum_db)
+
+        # Сглаживание маски по частоте и причинно по времени
+        above = np.convolve(above, self.freq_kernel, mode='same')
+        self.mask = self.mask_decay * self.mask + (1.0 - self.mask_decay) * above
+        gain = 1.0 - self.prop_decrease * (1.0 - self.mask)
+
+        self.out_buffer += np.fft.irfft(spectrum * gain, n=self.n_fft) * self.window
+        output = self.out_buffer[:self.hop].copy()
+        self.out_buffer[:-self.hop] = self.out_buffer[self.hop:]
+        self.out_buffer[-self.hop:] = 0.0
+        return output
+
+    def process(self, frame):
+        """
+        Принимает очередной кадр (обычно hop сэмплов) и возвращает готовые сэмплы.
+
+        Кадры другой длины накапливаются во внутреннем буфере, поэтому
+        возвращается столько полных шагов, сколько набралось (возможно, ни одного).
+        Время обработки каждого шага сохраняется в frame_times.
+        """
+        frame = np.asarray(frame, dtype=np.float64)
+        if len(self.pending):
+            frame = np.concatenate([self.pending, frame])
+        n_hops = len(frame) // self.hop
+        outputs = []
+        for i in range(n_hops):
+            start_time = time.perf_counter()
+            outputs.append(self._process_hop(frame[i * self.hop:(i + 1) * self.hop]))
+            self.frame_times.append(time.perf_counter() - start_time)
+        self.pending = frame[n_hops * self.hop:]
+        return np.concatenate(outputs) if outputs else np.zeros(0)
+
+    # Досылка нулей, чтобы получить хвост сигнала, задержанный на latency
+    def flush(self):
+        tail = self.latency + len(self.pending)
+        padding = -(-tail // self.hop) * self.hop - len(self.pending)
+        return self.process(np.zeros(padding))[:tail]
+
+    def timing_stats(self):
+        """Время обработки шага (мс): среднее, медиана, 99-й перцентиль, максимум и доля от длительности шага."""
+        times = np.asarray(self.frame_times) * 1000.0
+        if not len(times):
+            return {}
+        frame_ms = 1000.0 * self.hop / self.sample_rate
+        return {
+            'frames': len(times),
+            'frame_ms': frame_ms,
+            'latency_ms': self.latency_ms,
+            'mean_ms': float(times.mean()),
+            'median_ms': float(np.median(times)),
+            'p99_ms': float(np.percentile(times, 99)),
+            'max_ms': float(times.max()),
+            'realtime_load': float(times.mean() / frame_ms),
+            'overruns': int((times > frame_ms).sum()),
+        }
+
+
+def stream_file(audio_file, output_file=None, frame_ms=10.0, **params):
+    """
+    Прогон файла (WAV или MP3) через StreamingDenoiser кадрами по frame_ms, как при живом потоке.
+
+    Результат выравнивается по задержке (совпадает по длине и времени со входом)
+    и при необходимости сохраняется в output_file.
+
+    :return: Кортеж (очищенный сигнал, статистика времени обработки кадров).
+    """
+    audio, sample_rate = load_audio(audio_file, writable=False)
+    denoiser = StreamingDenoiser(sample_rate, frame_ms=frame_ms, **params)
+    outputs = []
+    for start in range(0, len(audio), denoiser.hop):
+        outputs.append(denoiser.process(audio[start:start + denoiser.hop]))
+    outputs.append(denoiser.flush())
+    cleaned = np.concatenate(outputs)[denoiser.latency:].astype(np.float32)
+
+    stats = denoiser.timing_stats()
+    if output_file is not None:
+        sf.write(output_file, cleaned, sample_rate)
+    print(
+        f"{audio_file}: {stats.get('frames', 0)} кадров по {frame_ms} мс, задержка {denoiser.latency_ms:.1f} мс, "
+        f"обработка кадра {stats.get('mean_ms', 0.0):.3f} мс (p99 {stats.get('p99_ms', 0.0):.3f} мс, "
+        f"макс. {stats.get('max_ms', 0.0):.3f} мс), нагрузка {100 * stats.get('realtime_load', 0.0):.1f}%"
+    )
+    return cleaned, stats
@@ -3,28 +3,25 @@ import librosa
 import soundfile as sf
 import matplotlib.pyplot as plt
 import noisereduce as nr
-from scipy.signal import butter, filtfilt
-from scipy.ndimage import uniform_filter1d
-import time
 import librosa.display
-import psutil
 import os
-from pydub import AudioSegment
-
-# Функция для измерения использования памяти
-def get_memory_usage():
-    process = psutil.Process(os.getpid())
-    mem = process.memory_info().rss / (1024 ** 2)  # Переводим байты в МБ
-    return mem
-
-# Полосовой фильтр Баттерворта
-def bandpass_filter(data, lowcut, highcut, sample_rate, order=6):
-    nyquist = 0.5 * sample_rate
-    low = lowcut / nyquist
-    high = highcut / nyquist
-    b, a = butter(order, [low, high], btype='band')
-    y = filtfilt(b, a, data)
-    return y
+from functools import partial
+from scipy.ndimage import uniform_filter1d
+
+from dsp import bandpass_filter
+from noise_profiles import load_library
+from pipeline import READ_DEPTH, READERS, WRITE_DEPTH, print_pipeline_stats, run_pipeline
+from spans import disable, enable, print_summary, span
+
+# Детектор речи и загрузчик аудио общие с подготовкой датасета (dataset_Coqui/vad.py, audio_io.py)
+import coqui_path  # noqa: F401
+from audio_io import load_audio
+from vad import FRAME_MS, detect_speech, frame_energy_db
+
+# Способы обрезки: по порогу нормированной огибающей (по умолчанию) или по речевым участкам (vad.py)
+TRIM_MODES = ('envelope', 'speech')
+# Порог огибающей по умолчанию (доля максимума)
+ENVELOPE_THRESHOLD = 0.2
 
 # Функция для вычисления огибающей сигнала
 def calculate_envelope(signal, frame_size=1024, smooth_factor=100):
@@ -33,8 +30,11 @@ def calculate_envelope(signal, frame_size=1024, smooth_factor=100):
     return smoothed_envelope
 
 # Функция для обрезки аудиосигнала по огибающей
-def trim_audio_by_envelope(audio, envelope, threshold=0.02):
-    normalized_envelope = envelope / np.max(envelope)
+def trim_audio_by_envelope(audio, envelope, threshold=ENVELOPE_THRESHOLD):
+    peak = np.max(envelope) if len(envelope) else 0.0
+    if peak <= 0:
+        return audio, 0, len(audio)
+    normalized_envelope = envelope / peak
     speech_indices = np.where(normalized_envelope > threshold)[0]
     if len(speech_indices) > 0:
         start_idx = speech_indices[0]
@@ -43,111 +43,209 @@ def trim_audio_by_envelope(audio, envelope, threshold=0.02):
     else:
         return audio, 0, len(audio)
 
-# Функция для конвертации MP3 в WAV
-def convert_mp3_to_wav(mp3_file, output_dir):
-    audio = AudioSegment.from_mp3(mp3_file)
-    wav_file = os.path.join(output_dir, os.path.splitext(os.path.basename(mp3_file))[0] + '.wav')
-    audio.export(wav_file, format="wav")
-    return wav_file
+# Проверка способа обрезки до начала обработки
+def _check_trim(trim):
+    if trim not in TRIM_MODES:
+        raise ValueError(f"Неизвестный способ обрезки: {trim} (доступны: {', '.join(TRIM_MODES)})")
+
+# Функция для обрезки аудиосигнала по речевым участкам (от начала первого до конца последнего)
+def trim_audio_by_speech(audio, sample_rate, energy_db, margin_db=10.0):
+    spans = detect_speech(audio, sample_rate, margin_db=margin_db, energy_db=energy_db)
+    if len(spans) > 0:
+        start_idx = spans[0, 0]
+        end_idx = spans[-1, 1]
+        return audio[start_idx:end_idx], start_idx, end_idx
+    else:
+        return audio, 0, len(audio)
+
+# Путь к очищенному файлу: результат всегда WAV, в том числе для MP3 на входе
+def output_path(audio_file, output_dir):
+    return os.path.join(output_dir, f'trimmed_filtered_{os.path.splitext(os.path.basename(audio_file))[0]}.wav')
 
 # Основная функция обработки аудиофайла
-def process_audio_file(audio_file, output_dir, lowcut=300.0, highcut=3400.0, threshold=0.2):
+# profiles_path - библиотека профилей шума (noise_profiles.py) вместо профиля по первой секунде
+# margin_db - превышение энергии кадра над уровнем шума, при котором кадр считается речью
+# trim - 'envelope' (по огибающей с порогом threshold, по умолчанию) или 'speech' (по речевым участкам, vad.py)
+# plot=False - без графиков этапов (например, для замеров скорости в benchmark.py)
+def process_audio_file(audio_file, output_dir, lowcut=300.0, highcut=3400.0, margin_db=10.0, profiles_path=None,
+                       trim='envelope', threshold=ENVELOPE_THRESHOLD, plot=True):
+    _check_trim(trim)
     # Загрузка аудиофайла
-    audio_data, sample_rate = librosa.load(audio_file, sr=None)
-
-    # Применение полосового фильтра
-    filtered_audio = bandpass_filter(audio_data, lowcut, highcut, sample_rate, order=6)
-
-    # Вычисление огибающей сигнала
-    envelope = calculate_envelope(filtered_audio)
+    with span('decode'):
+        audio_data, sample_rate = load_audio(audio_file)
 
-    # Сохранение графика огибающей
-    plt.figure(figsize=(14, 4))
-    plt.plot(envelope)
-    plt.title('Огибающая сигнала')
-    plt.xlabel('Фреймы')
-    plt.ylabel('Амплитуда')
-    plt.grid(True)
-    envelope_image = os.path.join(output_dir, f'{os.path.basename(audio_file)}_envelope.png')
-    plt.savefig(envelope_image)
-    plt.close()
+    reduced_noise = trim_and_denoise(audio_file, audio_data, sample_rate, output_dir, lowcut, highcut, margin_db,
+                                     profiles_path, trim=trim, threshold=threshold, plot=plot)
 
-    # Обрезка аудиосигнала по огибающей
-    trimmed_audio, start_idx, end_idx = trim_audio_by_envelope(filtered_audio, envelope, threshold=threshold)
+    # Сохранение обработанного аудиофайла
+    output_file = output_path(audio_file, output_dir)
+    with span('write'):
+        sf.write(output_file, reduced_noise, sample_rate)
+
+    return output_file
+
+# Фильтрация, обрезка и шумоподавление уже загруженного сигнала с сохранением графиков этапов (plot=True)
+def trim_and_denoise(audio_file, audio_data, sample_rate, output_dir, lowcut=300.0, highcut=3400.0, margin_db=10.0,
+                     profiles_path=None, trim='envelope', threshold=ENVELOPE_THRESHOLD, plot=True):
+    # Применение полосового фильтра (float32, на месте в буфере загруженного сигнала)
+    with span('bandpass'):
+        filtered_audio = bandpass_filter(audio_data, lowcut, highcut, sample_rate, order=6, precision='float32', out=audio_data)
+
+    # Вычисление энергии кадров в речевой полосе или огибающей сигнала
+    with span('envelope'):
+        if trim == 'envelope':
+            envelope = calculate_envelope(filtered_audio)
+        else:
+            energy_db = frame_energy_db(filtered_audio, sample_rate, lowcut=lowcut, highcut=highcut)
+
+    # Сохранение графика огибающей или энергии кадров
+    if plot:
+        with span('plot', figure='envelope'):
+            plt.figure(figsize=(14, 4))
+            if trim == 'envelope':
+                plt.plot(envelope)
+                plt.title('Огибающая сигнала')
+                plt.xlabel('Фреймы')
+                plt.ylabel('Амплитуда')
+            else:
+                plt.plot(energy_db)
+                plt.title('Энергия кадров сигнала')
+                plt.xlabel(f'Кадры ({FRAME_MS:.0f} мс)')
+                plt.ylabel('Энергия (дБ)')
+            plt.grid(True)
+            envelope_image = os.path.join(output_dir, f'{os.path.basename(audio_file)}_envelope.png')
+            plt.savefig(envelope_image)
+            plt.close()
+
+    # Обрезка аудиосигнала по речевым участкам или по огибающей
+    with span('trim'):
+        if trim == 'envelope':
+            trimmed_audio, start_idx, end_idx = trim_audio_by_envelope(filtered_audio, envelope, threshold=threshold)
+        else:
+            trimmed_audio, start_idx, end_idx = trim_audio_by_speech(filtered_audio, sample_rate, energy_db, margin_db)
 
     # Сохранение графика обрезанного аудиосигнала
-    plt.figure(figsize=(14, 4))
-    librosa.display.waveshow(trimmed_audio, sr=sample_rate)
-    plt.title('Обрезанный аудиосигнал (по огибающей)')
-    plt.xlabel('Время (сек)')
-    plt.ylabel('Амплитуда')
-    plt.grid(True)
-    trimmed_image = os.path.join(output_dir, f'{os.path.basename(audio_file)}_trimmed.png')
-    plt.savefig(trimmed_image)
-    plt.close()
+    if plot:
+        with span('plot', figure='trimmed'):
+            plt.figure(figsize=(14, 4))
+            librosa.display.waveshow(trimmed_audio, sr=sample_rate)
+            plt.title('Обрезанный аудиосигнал (по огибающей)' if trim == 'envelope'
+                      else 'Обрезанный аудиосигнал (по речевым участкам)')
+            plt.xlabel('Время (сек)')
+            plt.ylabel('Амплитуда')
+            plt.grid(True)
+            trimmed_image = os.path.join(output_dir, f'{os.path.basename(audio_file)}_trimmed.png')
+            plt.savefig(trimmed_image)
+            plt.close()
 
     # Применение шумоподавления
-    noise_duration = 1.0  # секунды
-    noise_samples = int(noise_duration * sample_rate)
-    noise_clip = trimmed_audio[:noise_samples]
+    if profiles_path is not None:
+        # После обрезки по огибающей начало записи - уже речь, профиль берётся из библиотеки
+        with span('reduce', profiles=True):
+            reduced_noise = load_library(profiles_path).denoise(trimmed_audio, sample_rate)
+    else:
+        noise_duration = 1.0  # секунды
+        noise_samples = int(noise_duration * sample_rate)
+        noise_clip = trimmed_audio[:noise_samples]
 
-    # Замер времени шумоподавления
-    start_time = time.time()
-    reduced_noise = nr.reduce_noise(y=trimmed_audio, sr=sample_rate, y_noise=noise_clip, prop_decrease=1.0)
-    end_time = time.time()
-    noise_reduction_time = end_time - start_time
+        with span('reduce'):
+            reduced_noise = nr.reduce_noise(y=trimmed_audio, sr=sample_rate, y_noise=noise_clip, prop_decrease=1.0)
 
     # Сохранение графика финального аудиосигнала
-    plt.figure(figsize=(14, 4))
-    librosa.display.waveshow(reduced_noise, sr=sample_rate)
-    plt.title('Аудиосигнал после шумоподавления')
-    plt.xlabel('Время (сек)')
-    plt.ylabel('Амплитуда')
-    plt.grid(True)
-    noise_reduction_image = os.path.join(output_dir, f'{os.path.basename(audio_file)}_final.png')
-    plt.savefig(noise_reduction_image)
-    plt.close()
-
-    # Сохранение обработанного аудиофайла
-    output_file = os.path.join(output_dir, f'trimmed_filtered_{os.path.basename(audio_file)}')
-    sf.write(output_file, reduced_noise, sample_rate)
-
-    return output_file, noise_reduction_time
+    if plot:
+        with span('plot', figure='final'):
+            plt.figure(figsize=(14, 4))
+            librosa.display.waveshow(reduced_noise, sr=sample_rate)
+            plt.title('Аудиосигнал после шумоподавления')
+            plt.xlabel('Время (сек)')
+            plt.ylabel('Амплитуда')
+            plt.grid(True)
+            noise_reduction_image = os.path.join(output_dir, f'{os.path.basename(audio_file)}_final.png')
+            plt.savefig(noise_reduction_image)
+            plt.close()
+
+    return reduced_noise
+
+# Стадии конвейера (pipeline.py): чтение и запись в потоках, обработка - в текущем процессе или в пуле
+# Чтение: декодирование MP3 или WAV в память (каждый файл читается один раз, без кэша)
+def read_input(input_file):
+    with span('decode', file=input_file):
+        return load_audio(input_file, cache=False)
+
+# Обработка (вместе с графиками этапов): возвращает очищенный сигнал и замеры этапа
+def denoise_input(input_file, data, output_dir, profiles_path=None, trim='envelope', threshold=ENVELOPE_THRESHOLD):
+    audio_data, sample_rate = data
+    with span('file', file=input_file) as record:
+        reduced_noise = trim_and_denoise(input_file, audio_data, sample_rate, output_dir, profiles_path=profiles_path,
+                                         trim=trim, threshold=threshold)
+    return reduced_noise, sample_rate, record['wall_s'], record['peak_mb']
+
+# Запись: имя результата как у process_audio_file
+def write_output(input_file, result, output_dir):
+    reduced_noise, sample_rate, execution_time, peak_mb = result
+    output_file = output_path(input_file, output_dir)
+    with span('write', file=input_file):
+        sf.write(output_file, reduced_noise, sample_rate)
+    return output_file, execution_time, peak_mb
+
+# Вывод результата одного файла (пик памяти - только при включённом журнале)
+def report_file(input_file, result, error):
+    if error is not None:
+        print(f"Ошибка при обработке файла {input_file}:\n{error}")
+        return
+    processed_file, execution_time, peak_mb = result
+    memory = f", Пик памяти: {peak_mb:.2f} МБ" if peak_mb is not None else ""
+    print(f"Файл {processed_file} обработан. Время: {execution_time:.2f} секунд{memory}")
 
 # Функция для обработки всех файлов в папке
-def process_folder(input_dir, output_dir):
+# trace_path - журнал замеров этапов (JSON-lines), по окончании выводится сводка
+# readers, read_depth, write_depth - потоки чтения и глубина очередей конвейера (pipeline.py)
+# trim, threshold - способ обрезки, как у process_audio_file
+def process_folder(input_dir, output_dir, workers=1, trace_path=None, profiles_path=None,
+                   readers=READERS, read_depth=READ_DEPTH, write_depth=WRITE_DEPTH, trim='envelope',
+                   threshold=ENVELOPE_THRESHOLD):
+    _check_trim(trim)
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
+    if trace_path is not None:
+        # Память замеряется только в однопоточном коде (spans.py): в процессах пула, но не в потоках конвейера
+        enable(trace_path)
 
+    input_files = []
     for root, dirs, files in os.walk(input_dir):
         for file in files:
-            if file.endswith('.mp3'):
-                mp3_file = os.path.join(root, file)
-                audio_file = convert_mp3_to_wav(mp3_file, output_dir)
-            elif file.endswith('.wav'):
-                audio_file = os.path.join(root, file)
-            else:
-                continue  # Пропускаем файлы других форматов
-
-            mem_before = get_memory_usage()
-
-            # Обработка аудиофайла
-            processed_file, noise_reduction_time = process_audio_file(audio_file, output_dir)
-
-            # Измерение памяти после обработки
-            mem_after = get_memory_usage()
-            mem_used = mem_after - mem_before
-
-            # Вывод информации
-            print(f"Файл {processed_file} обработан. Время шумоподавления: {noise_reduction_time:.2f} секунд, Память: {mem_used:.2f} МБ")
+            if file.endswith('.mp3') or file.endswith('.wav'):
+                input_files.append(os.path.join(root, file))
+            # Файлы других форматов пропускаем
+
+    # Чтение, обработка и запись перекрываются; очереди ограничены, память не растёт
+    stats = run_pipeline(
+        input_files,
+        read_input,
+        partial(denoise_input, output_dir=output_dir, profiles_path=profiles_path, trim=trim, threshold=threshold),
+        partial(write_output, output_dir=output_dir),
+        readers=readers,
+        workers=workers,
+        read_depth=read_depth,
+        write_depth=write_depth,
+        on_done=report_file,
+    )
+    print_pipeline_stats(stats)
+
+    if trace_path is not None:
+        print_summary(trace_path)
+        disable()
 
 # Основная функция
-def main():
-    input_dir = '/Users/daniil/Хакатоны/ЦП СВФО/data/ржд 1/ESC_DATASET_v1.2/luga/02_11_2023'  # Папка с аудиофайлами
-    output_dir = '/Users/daniil/Хакатоны/ЦП СВФО/noise_filter/cleaned_aud_treshold'  # Папка для сохранения очищенных аудиофайлов
-
-    # Запуск обработки всех файлов в папке
-    process_folder(input_dir, output_dir)
+# input_dir - папка с аудиофайлами, output_dir - папка для сохранения очищенных аудиофайлов
+def main(input_dir='/Users/daniil/Хакатоны/ЦП СВФО/data/ржд 1/ESC_DATASET_v1.2/luga/02_11_2023',
+         output_dir='/Users/daniil/Хакатоны/ЦП СВФО/noise_filter/cleaned_aud_treshold',
+         workers=1, trace_path=None, profiles_path=None, readers=READERS, queue_depth=READ_DEPTH, trim='envelope',
+         threshold=ENVELOPE_THRESHOLD):
+    # Запуск обработки всех файлов в папке (по умолчанию последовательно, как раньше)
+    process_folder(input_dir, output_dir, workers=workers or 1, trace_path=trace_path,
+                   profiles_path=profiles_path, readers=readers, read_depth=queue_depth, write_depth=queue_depth,
+                   trim=trim, threshold=threshold)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Инструменты - папки со скриптами, а не пакеты: модули импортируются по имени, как в cli.py
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for tool_dir in ('noise_filter', 'dataset_Coqui'):
+    path = os.path.join(ROOT, tool_dir)
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,64 @@
+import numpy as np
+import soundfile as sf
+
+import blockwise
+from blockwise import denoise_blockwise
+from dsp import bandpass_filter
+
+SAMPLE_RATE = 16000
+
+
+# Тон 440 Гц, включающийся раз в секунду, на фоне белого шума
+def _write_noisy(path, seconds, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    tone = 0.3 * np.sin(2 * np.pi * 440 * t) * (np.sin(2 * np.pi * 0.5 * t) > 0)
+    audio = tone + 0.05 * rng.standard_normal(len(t))
+    sf.write(path, audio.astype(np.float32), SAMPLE_RATE, subtype='FLOAT')
+    return audio.astype(np.float32)
+
+
+def test_blocks_match_whole_file_filter(tmp_path, monkeypatch):
+    # noisereduce заменён тождественным преобразованием: проверяется склейка блоков с полями
+    monkeypatch.setattr(blockwise.nr, 'reduce_noise', lambda y, **kwargs: y)
+    audio = _write_noisy(tmp_path / 'in.wav', seconds=7.3)
+    output_file = str(tmp_path / 'out.wav')
+
+    denoise_blockwise(str(tmp_path / 'in.wav'), output_file, block_seconds=2.0, margin_seconds=1.0)
+    result, sr = sf.read(output_file, dtype='float32')
+
+    expected = bandpass_filter(audio, 300.0, 3400.0, SAMPLE_RATE, order=6, precision='float32')
+    assert sr == SAMPLE_RATE
+    assert len(result) == len(audio)
+    np.testing.assert_allclose(result, expected, rtol=0, atol=1e-4)
+
+
+def test_single_block_matches_whole_file(tmp_path):
+    audio = _write_noisy(tmp_path / 'in.wav', seconds=3.0)
+    output_file = str(tmp_path / 'out.wav')
+
+    # Блок длиннее записи: результат - обработка целого файла, как в main.py
+    denoise_blockwise(str(tmp_path / 'in.wav'), output_file, block_seconds=10.0)
+    result, _ = sf.read(output_file, dtype='float32')
+
+    filtered = bandpass_filter(audio, 300.0, 3400.0, SAMPLE_RATE, order=6, precision='float32')
+    expected = blockwise.nr.reduce_noise(y=filtered, sr=SAMPLE_RATE, y_noise=filtered[:SAMPLE_RATE],
+                                         prop_decrease=1.0)
+    # Результат пишется в WAV PCM_16: допуск - шаг квантования
+    np.testing.assert_allclose(result, expected, rtol=0, atol=1e-4)
+
+
+def test_blocks_close_to_whole_file_denoise(tmp_path):
+    # Маска noisereduce сглаживается по времени, поэтому с полями по умолчанию результат совпадает
+    # с обработкой целого файла приближённо: энергия расхождения - меньше 0.1% (30 дБ), см. denoise_blockwise
+    audio = _write_noisy(tmp_path / 'in.wav', seconds=20.0)
+    output_file = str(tmp_path / 'out.wav')
+
+    denoise_blockwise(str(tmp_path / 'in.wav'), output_file, block_seconds=10.0)
+    result, _ = sf.read(output_file, dtype='float32')
+
+    filtered = bandpass_filter(audio, 300.0, 3400.0, SAMPLE_RATE, order=6, precision='float32')
+    expected = blockwise.nr.reduce_noise(y=filtered, sr=SAMPLE_RATE, y_noise=filtered[:SAMPLE_RATE],
+                                         prop_decrease=1.0)
+    assert len(result) == len(expected)
+    assert np.sum((result - expected) ** 2) < 0.001 * np.sum(expected ** 2)
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from scipy.signal import butter, sosfilt, sosfiltfilt
+
+from dsp import FILTER_CHUNK_SIZE, bandpass_filter
+
+
+def _signal(n, seed=0):
+    return np.random.default_rng(seed).standard_normal(n)
+
+
+def _sos(lowcut=300.0, highcut=3400.0, sample_rate=16000, order=6):
+    nyquist = 0.5 * sample_rate
+    return butter(order, [lowcut / nyquist, highcut / nyquist], btype='band', output='sos')
+
+
+# Длина больше нескольких блоков фильтрации на месте и не кратна им
+@pytest.mark.parametrize('n', [1000, 3 * FILTER_CHUNK_SIZE + 123])
+def test_inplace_matches_sosfiltfilt(n):
+    data = _signal(n)
+    expected = sosfiltfilt(_sos(), data)
+    result = bandpass_filter(data, 300.0, 3400.0, 16000, order=6, out=data)
+    assert result is data
+    np.testing.assert_allclose(result, expected, rtol=0, atol=1e-10)
+
+
+def test_copy_leaves_input_untouched():
+    data = _signal(5000)
+    original = data.copy()
+    result = bandpass_filter(data, 300.0, 3400.0, 16000)
+    np.testing.assert_array_equal(data, original)
+    np.testing.assert_allclose(result, sosfiltfilt(_sos(), original), rtol=0, atol=1e-10)
+
+
+def test_causal_matches_sosfilt():
+    data = _signal(2 * FILTER_CHUNK_SIZE + 7)
+    result = bandpass_filter(data, 300.0, 3400.0, 16000, zero_phase=False)
+    np.testing.assert_allclose(result, sosfilt(_sos(), data), rtol=0, atol=1e-10)
+
+
+def test_float32_close_to_float64():
+    data = _signal(FILTER_CHUNK_SIZE + 500).astype(np.float32)
+    expected = sosfiltfilt(_sos(), data.astype(np.float64))
+    result = bandpass_filter(data, 300.0, 3400.0, 16000, precision='float32', out=data)
+    assert result.dtype == np.float32
+    np.testing.assert_allclose(result, expected, rtol=0, atol=1e-4)
+
+
+def test_too_short_signal_raises():
+    with pytest.raises(ValueError):
+        bandpass_filter(np.zeros(10), 300.0, 3400.0, 16000)
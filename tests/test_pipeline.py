@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from pipeline import run_pipeline
+
+ITEMS = list(range(40))
+
+
+# Стадии объявлены на уровне модуля, чтобы обработку можно было отправить в пул процессов
+def read(item):
+    if item % 7 == 3:
+        raise OSError(f"не прочитан {item}")
+    # Разная длительность чтения перемешивает порядок завершения в потоках
+    time.sleep(0.001 * (item % 3))
+    return item * 10
+
+
+def compute(item, data):
+    if item % 7 == 5:
+        raise ValueError(f"не обработан {item}")
+    return data + 1
+
+
+def write(item, result):
+    if item % 7 == 6:
+        raise OSError(f"не записан {item}")
+    return result * 2
+
+
+def _expected_error(item):
+    return {3: 'OSError', 5: 'ValueError', 6: 'OSError'}.get(item % 7)
+
+
+def _run(items, **kwargs):
+    done = []
+    stats = run_pipeline(items, read, compute, write, on_done=lambda *entry: done.append(entry), **kwargs)
+    return done, stats
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_keeps_every_item_in_order(workers):
+    done, stats = _run(ITEMS, readers=3, workers=workers, read_depth=2, write_depth=2)
+
+    assert [item for item, _, _ in done] == ITEMS
+    for item, output, error in done:
+        expected_error = _expected_error(item)
+        if expected_error is None:
+            assert error is None
+            assert output == (item * 10 + 1) * 2
+        else:
+            assert output is None
+            assert expected_error in error
+    assert stats['read']['items'] == len(ITEMS)
+    assert stats['read']['errors'] == sum(item % 7 == 3 for item in ITEMS)
+
+
+def test_empty_input():
+    done, stats = _run([])
+    assert done == []
+    assert stats['write']['items'] == 0
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_failing_on_done_does_not_stop_pipeline(workers):
+    seen = []
+
+    def on_done(item, output, error):
+        seen.append(item)
+        raise RuntimeError("ошибка обратного вызова")
+
+    run_pipeline(ITEMS, read, compute, write, readers=2, workers=workers, read_depth=1, write_depth=1,
+                 on_done=on_done)
+    assert seen == ITEMS
@@ -0,0 +1,83 @@
+import csv
+
+import pytest
+
+from splits import SPLITS, assign_split, split_csv, stable_fraction
+
+
+def _write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(rows)
+
+
+def _read_splits(out_dir):
+    result = {}
+    for split in SPLITS:
+        with open(out_dir / f'{split}.csv', 'r', encoding='utf-8') as f:
+            result[split] = [tuple(row) for row in csv.reader(f)]
+    return result
+
+
+def _rows(n, folder='21_11_2023'):
+    return [(f'luga/{folder}/2023_11_21__09_{i // 60:02d}_{i % 60:02d}.wav', f'текст {i}') for i in range(n)]
+
+
+def _split(tmp_path, name, rows, **kwargs):
+    csv_file = tmp_path / f'{name}.csv'
+    _write_csv(csv_file, rows)
+    out_dir = tmp_path / name
+    out_dir.mkdir()
+    counts = split_csv(str(csv_file), {split: str(out_dir / f'{split}.csv') for split in SPLITS}, **kwargs)
+    return counts, _read_splits(out_dir)
+
+
+def test_stable_fraction_is_fixed():
+    values = [stable_fraction(f'clip_{i}') for i in range(1000)]
+    assert values == [stable_fraction(f'clip_{i}') for i in range(1000)]
+    assert all(0.0 <= value < 1.0 for value in values)
+    assert stable_fraction('clip_1') != stable_fraction('clip_1', salt='другая')
+
+
+def test_same_split_on_every_run_and_any_row_order(tmp_path):
+    rows = _rows(500)
+    counts, first = _split(tmp_path, 'first', rows)
+    _, again = _split(tmp_path, 'again', rows)
+    _, shuffled = _split(tmp_path, 'shuffled', rows[::-1])
+
+    assert first == again
+    assert {split: set(items) for split, items in first.items()} == {
+        split: set(items) for split, items in shuffled.items()
+    }
+    assert sum(counts.values()) == len(rows)
+    # Доли как у прежнего train_test_split: test 20%, dev 10% от остатка
+    assert 0.15 < counts['test'] / len(rows) < 0.25
+    assert 0.04 < counts['dev'] / len(rows) < 0.12
+
+
+def test_new_rows_do_not_move_existing(tmp_path):
+    rows = _rows(300)
+    _, before = _split(tmp_path, 'before', rows)
+    _, after = _split(tmp_path, 'after', rows + _rows(600)[300:])
+    for split in SPLITS:
+        assert set(before[split]) <= set(after[split])
+
+
+def test_group_by_date_keeps_day_together(tmp_path):
+    rows = _rows(50, '21_11_2023') + _rows(50, '02_11_2023')
+    rows = [(path.replace('2023_11_21__', '') if '02_11' in path else path, text) for path, text in rows]
+    _, result = _split(tmp_path, 'dates', rows, group_by='date')
+    for folder in ('21_11_2023', '02_11_2023'):
+        splits = {split for split, items in result.items() for path, _ in items if folder in path}
+        assert len(splits) == 1
+
+
+def test_assign_split_matches_fraction():
+    key = 'clip_42'
+    fraction = stable_fraction(key)
+    expected = 'test' if fraction < 0.2 else 'dev' if fraction < 0.2 + 0.8 * 0.1 else 'train'
+    assert assign_split(key) == expected
+
+
+def test_speaker_grouping_needs_store(tmp_path):
+    with pytest.raises(ValueError):
+        _split(tmp_path, 'speakers', _rows(5), group_by='speaker')
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from scipy.signal import sosfilt
+
+from dsp import design_bandpass
+from streaming import StreamingDenoiser
+
+SAMPLE_RATE = 16000
+
+
+def _run(denoiser, audio, chunk_sizes):
+    outputs, position, i = [], 0, 0
+    while position < len(audio):
+        size = chunk_sizes[i % len(chunk_sizes)]
+        outputs.append(denoiser.process(audio[position:position + size]))
+        position += size
+        i += 1
+    outputs.append(denoiser.flush())
+    return np.concatenate(outputs)
+
+
+@pytest.mark.parametrize('chunk_sizes', [[160], [1], [37, 500, 160, 3]])
+def test_output_length_is_input_plus_latency(chunk_sizes):
+    audio = np.random.default_rng(0).standard_normal(SAMPLE_RATE + 123)
+    denoiser = StreamingDenoiser(SAMPLE_RATE, frame_ms=10.0)
+    output = _run(denoiser, audio, chunk_sizes)
+    assert len(output) == len(audio) + denoiser.latency
+
+
+def test_latency_alignment_without_suppression():
+    # Без подавления остаётся причинный полосовой фильтр и STFT с полным восстановлением:
+    # выход, сдвинутый на latency, совпадает с sosfilt входа
+    audio = np.random.default_rng(1).standard_normal(2 * SAMPLE_RATE + 77)
+    denoiser = StreamingDenoiser(SAMPLE_RATE, frame_ms=10.0, prop_decrease=0.0)
+    output = _run(denoiser, audio, [160])
+
+    sos, _ = design_bandpass(300.0, 3400.0, SAMPLE_RATE, 6)
+    expected = sosfilt(sos, audio)
+    assert denoiser.latency == denoiser.n_fft - denoiser.hop
+    np.testing.assert_allclose(output[denoiser.latency:], expected, rtol=0, atol=1e-9)
+
+
+def test_latency_limit():
+    assert StreamingDenoiser(SAMPLE_RATE, frame_ms=10.0, window_frames=2).latency_ms == pytest.approx(10.0)
+    with pytest.raises(ValueError):
+        StreamingDenoiser(SAMPLE_RATE, frame_ms=10.0, window_frames=4, max_latency_ms=20.0)